@@ -1,176 +1,250 @@
 import os
-import sqlite3
-import pandas as pd
+import sys
+import argparse
+import tempfile
+import multiprocessing
 import numpy as np
-from math import atan2, degrees
 
 # Configuration flags
 PAD_SEQUENCES = False  # Set to True to enable padding/truncation, False to exclude non-matching lengths
 MIN_FRAMES = 10  # Example threshold if you want to exclude sequences shorter than this if not padding
 
-def compute_angle(p1, p2, p3):
-    v1 = (p1[0]-p2[0], p1[1]-p2[1])
-    v2 = (p3[0]-p2[0], p3[1]-p2[1])
-    angle = degrees(atan2(v2[1], v2[0]) - atan2(v1[1], v1[0]))
-    return angle + 360 if angle < 0 else angle
-
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.feature_library import (
+    CHANNELS,
+    FEATURE_COLUMNS,
+    MIDSWING_FRAME_NO,
+    engineer_sequence,
+    reference_index,
+    rows_to_sequences
+)
+from utils import data_access
+from utils.sequence_dataset import DEFAULT_SHARD_SIZE, ShardedDatasetWriter
+from utils.feature_store import FeatureStore
+
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 SEQUENCE_DIR = os.path.join(DATA_DIR, 'processed', 'sequence')
 kick_db_path = os.path.join(DATA_DIR, 'kick_data.db')
 pose_db_path = os.path.join(DATA_DIR, 'pose_data.db')
+output_path = os.path.join(SEQUENCE_DIR, 'training_data_sequence')  # sharded dataset directory
+
+# Everything the cached per-kick features depend on besides landmarks and code
+FEATURE_STORE_PARAMS = {"ref_frame_no": MIDSWING_FRAME_NO, "columns": FEATURE_COLUMNS}
 
 os.makedirs(SEQUENCE_DIR, exist_ok=True)
 
-kick_conn = sqlite3.connect(kick_db_path)
-pose_conn = sqlite3.connect(pose_db_path)
-
-df_kicks = pd.read_sql_query("SELECT * FROM kicks", kick_conn)
-df_frames = pd.read_sql_query("SELECT * FROM frames", kick_conn)
-df_pose = pd.read_sql_query("SELECT * FROM pose_features", pose_conn)
-
-kick_conn.close()
-pose_conn.close()
-
-df_merged = df_frames.merge(df_pose, on='frame_id', how='inner').merge(df_kicks, on='kick_id', how='inner')
-
-# Determine maximum frames
-kick_frame_counts = df_frames.groupby('kick_id')['frame_no'].count()
-MAX_FRAMES = kick_frame_counts.max()
-
-def normalize_landmark_names(df):
-    df.columns = ['_'.join(col).strip() if col[1] else col[0] for col in df.columns]
-    visibility_cols = [c for c in df.columns if c.startswith('visibility_')]
-    df.drop(columns=visibility_cols, inplace=True, errors='ignore')
-    
-    def norm_name(col):
-        if '_' not in col:
-            return col
-        prefix, landmark = col.split('_', 1)
-        landmark = landmark.lower()
-        parts = landmark.split('_')
-        if len(parts) == 2:
-            side, joint = parts
-            landmark = f"{joint}_{side}"
-        return f"{prefix}_{landmark}"
-    df.columns = [norm_name(c) for c in df.columns]
-    return df
-
-def has_landmark(df, name, axis='x'):
-    return f"{axis}_{name}" in df.columns
-
-def compute_angles(df):
-    def add_angle_feature(df, joint_center, joint_1, joint_2, angle_name):
-        if (has_landmark(df, joint_center) and has_landmark(df, joint_1) and has_landmark(df, joint_2) and
-            has_landmark(df, joint_center, 'y') and has_landmark(df, joint_1, 'y') and has_landmark(df, joint_2, 'y')):
-            df[angle_name] = df.apply(lambda row: compute_angle(
-                (row[f'x_{joint_1}'], row[f'y_{joint_1}']),
-                (row[f'x_{joint_center}'], row[f'y_{joint_center}']),
-                (row[f'x_{joint_2}'], row[f'y_{joint_2}'])
-            ), axis=1)
-    add_angle_feature(df, 'knee_left', 'hip_left', 'ankle_left', 'angle_knee_left')
-    add_angle_feature(df, 'knee_right', 'hip_right', 'ankle_right', 'angle_knee_right')
-    add_angle_feature(df, 'elbow_left', 'shoulder_left', 'wrist_left', 'angle_elbow_left')
-    add_angle_feature(df, 'elbow_right', 'shoulder_right', 'wrist_right', 'angle_elbow_right')
-
-def normalize_frames(df, ref_frame_no=11):
-    ref_frame = df[df['frame_no'] == ref_frame_no]
-    if ref_frame.empty:
-        # Use the first frame as reference if mid-swing isn't found
-        ref_frame = df.iloc[[0]]
-    ref_row = ref_frame.iloc[0]
-    
-    def frame_has_landmark(name, axis='x'):
-        return f"{axis}_{name}" in ref_row.index
-    
-    if frame_has_landmark('mid_hip'):
-        origin_x_col, origin_y_col = 'x_mid_hip', 'y_mid_hip'
-    elif frame_has_landmark('hip_left') and frame_has_landmark('hip_right'):
-        df['x_mid_hip'] = (df['x_hip_left'] + df['x_hip_right']) / 2.0
-        df['y_mid_hip'] = (df['y_hip_left'] + df['y_hip_right']) / 2.0
-        origin_x_col, origin_y_col = 'x_mid_hip', 'y_mid_hip'
-    else:
-        origin_x_col, origin_y_col = None, None
-        if frame_has_landmark('shoulder_left') and frame_has_landmark('shoulder_right'):
-            df['x_origin'] = (df['x_shoulder_left'] + df['x_shoulder_right']) / 2.0
-            df['y_origin'] = (df['y_shoulder_left'] + df['y_shoulder_right']) / 2.0
-            origin_x_col, origin_y_col = 'x_origin', 'y_origin'
-        else:
-            candidates = ['shoulder_left', 'shoulder_right', 'nose']
-            for cj in candidates:
-                if frame_has_landmark(cj):
-                    origin_x_col, origin_y_col = f'x_{cj}', f'y_{cj}'
-                    break
-    
-    if frame_has_landmark('shoulder_left') and frame_has_landmark('shoulder_right'):
-        scale = (ref_row['x_shoulder_right'] - ref_row['x_shoulder_left'])
-        if scale == 0:
-            scale = 1e-6
-    else:
-        scale = 1.0
-    
-    if origin_x_col and origin_y_col:
-        ref_x = df[origin_x_col]
-        ref_y = df[origin_y_col]
-        for c in df.columns:
-            if c.startswith('x_'):
-                df[c] = (df[c] - ref_x) / scale
-            elif c.startswith('y_'):
-                df[c] = (df[c] - ref_y) / scale
-            elif c.startswith('z_'):
-                df[c] = df[c] / scale
-
-X_list = []
-y_list = []
-
-for kick_id in df_kicks['kick_id'].unique():
-    kick_data = df_merged[df_merged['kick_id'] == kick_id]
-    if kick_data.empty:
-        continue
-
-    frame_pivot = kick_data.pivot_table(
-        index=['frame_id', 'kick_id', 'kick_direction', 'frame_no'],
-        columns='landmark_name',
-        values=['x','y','z','visibility']
-    ).reset_index()
-
-    frame_pivot = normalize_landmark_names(frame_pivot)
-    normalize_frames(frame_pivot, ref_frame_no=11)
-    compute_angles(frame_pivot)
-
-    target = frame_pivot['kick_direction'].iloc[0]
-    non_feature_cols = ['frame_id','kick_id','kick_direction','frame_no']
-    feature_cols = [c for c in frame_pivot.columns if c not in non_feature_cols]
-
-    frame_pivot = frame_pivot.sort_values('frame_no')
-    kick_features = frame_pivot[feature_cols].values
-    num_frames = kick_features.shape[0]
+def engineer_kicks(store, kick_ids, frame_nos, lengths, landmarks, max_frames):
+    """
+    Features of a batch of kicks, (kicks, max_frames, len(FEATURE_COLUMNS)), zero past each
+    kick's length. Kicks whose fingerprint is in the feature store are taken from it;
+    only new or stale kicks are engineered (and then stored).
+    """
+    fingerprints = store.fingerprints(frame_nos, landmarks, lengths)
+    cached = store.load(kick_ids, fingerprints)
+    stale = np.array([int(k) not in cached for k in kick_ids], dtype=bool)
+
+    X = np.zeros((len(kick_ids), max_frames, len(FEATURE_COLUMNS)))
+    if stale.any():
+        # Batched normalization (mid-swing reference frame per kick) + angles
+        X_new = engineer_sequence(landmarks[stale], ref_index=reference_index(frame_nos[stale]))
+        n_new = np.minimum(lengths[stale], max_frames)
+        X_new[np.arange(max_frames)[None, :] >= n_new[:, None]] = 0.0
+        X[stale] = X_new
+        store.save(kick_ids[stale], fingerprints[stale], [x[:n] for x, n in zip(X_new, n_new)])
+
+    for i in np.flatnonzero(~stale):
+        f = cached[int(kick_ids[i])]
+        X[i, :len(f)] = f
+    return X
+
+def process_kicks(store, kick_ids, frame_nos, lengths, landmarks, labels, max_frames):
+    """
+    Normalization + angles for a batch of kicks, then padding or length filtering.
+    labels: {kick_id: kick_direction}
+    Returns (X, y) with X of shape (kicks, max_frames, len(FEATURE_COLUMNS)).
+    """
+    X = engineer_kicks(store, kick_ids, frame_nos, lengths, landmarks, max_frames)
+    y = np.array([labels[k] for k in kick_ids])
 
     if PAD_SEQUENCES:
-        # With padding/truncation
-        if num_frames < MAX_FRAMES:
-            pad_amount = MAX_FRAMES - num_frames
-            pad_array = np.zeros((pad_amount, kick_features.shape[1]))
-            kick_features = np.concatenate([kick_features, pad_array], axis=0)
-        elif num_frames > MAX_FRAMES:
-            kick_features = kick_features[:MAX_FRAMES]
-        X_list.append(kick_features)
-        y_list.append(target)
-    else:
-        # Without padding: consider only sequences that meet length criteria
-        # For example, only include those with at least MIN_FRAMES frames
-        # and at most MAX_FRAMES if you want exact length or some range.
-        # Here we require exactly MAX_FRAMES for simplicity:
-        if num_frames == MAX_FRAMES and num_frames >= MIN_FRAMES:
-            X_list.append(kick_features)
-            y_list.append(target)
-        # else discard this kick
-
-X_seq = np.stack(X_list, axis=0) if X_list else np.empty((0, MAX_FRAMES, len(feature_cols)))
-y_seq = np.array(y_list) if y_list else np.empty((0,))
-
-output_path = os.path.join(SEQUENCE_DIR, 'training_data_sequence.npz')
-np.savez(output_path, X_seq=X_seq, y_seq=y_seq)
-
-rel_path = os.path.relpath(output_path, BASE_DIR)
-print(f"Sequence training data saved to {rel_path}")
+        # With padding/truncation: frames past each kick's length are already zero
+        return X, y
+
+    # Without padding: consider only sequences that meet length criteria
+    # Here we require exactly max_frames (and at least MIN_FRAMES) frames:
+    keep = (lengths == max_frames) & (lengths >= MIN_FRAMES)
+    return X[keep], y[keep]
+
+def build_in_memory(writer, store):
+    """
+    Loads all kicks at once and builds the dataset in a single vectorized pass.
+    """
+    # Joins + landmark filter run in SQLite; only the needed pose rows reach pandas
+    conn = data_access.connect(kick_db_path, pose_db_path)
+    df_merged = data_access.load_pose_rows(conn)
+    conn.close()
+
+    # Pivot the whole dataset once: (kicks, max_frames, 33, 4), frames ordered by frame_no
+    kick_ids, frame_nos, lengths, landmarks = rows_to_sequences(
+        df_merged['kick_id'].values,
+        df_merged['frame_no'].values,
+        df_merged['landmark_name'].values,
+        df_merged[CHANNELS].values,
+        num_frames=writer.num_frames,
+        dtype=np.float64
+    )
+    labels = dict(zip(df_merged['kick_id'], df_merged['kick_direction']))
+    X, y = process_kicks(store, kick_ids, frame_nos, lengths, landmarks, labels, writer.num_frames)
+    writer.append(X, y)
+    return kick_ids
+
+def process_rows(store, labels, rows, max_frames):
+    """
+    process_kicks() for one batch of pose rows (tuples in data_access.POSE_COLUMNS order).
+    Returns (kick_ids, X, y).
+    """
+    kick_ids, frame_nos, lengths, landmarks = rows_to_sequences(
+        np.array([r[0] for r in rows]),
+        np.array([r[2] for r in rows]),
+        [r[4] for r in rows],
+        np.array([r[5:9] for r in rows], dtype=np.float64),
+        num_frames=max_frames,
+        dtype=np.float64
+    )
+    X, y = process_kicks(store, kick_ids, frame_nos, lengths, landmarks, labels, max_frames)
+    return kick_ids, X, y
+
+def build_streaming(writer, store, batch_size):
+    """
+    Streams kicks in kick_id order from the ATTACHed kick/pose DBs, 'batch_size' kicks at a time,
+    and appends each processed batch to the on-disk shards. Peak memory is one batch of kicks
+    plus one shard.
+    """
+    conn = data_access.connect(kick_db_path, pose_db_path)
+    num_samples = 0
+    seen_kick_ids = []
+
+    for labels, rows in data_access.iter_kick_batches(conn, batch_size):
+        if not rows:
+            continue
+        kick_ids, X, y = process_rows(store, labels, rows, writer.num_frames)
+        writer.append(X, y)
+        seen_kick_ids.extend(kick_ids.tolist())
+        num_samples += len(X)
+        print(f"  processed kicks up to kick_id={kick_ids[-1]} ({num_samples} sequences kept)")
+
+    conn.close()
+    return seen_kick_ids
+
+def process_kick_range(task):
+    """
+    Worker for --workers: engineers the kicks first_kick_id..last_kick_id on its own DB
+    connection and writes (X, y) to temporary .npy files instead of pickling them back.
+    Returns (kick_ids, x_path, y_path, store hits, store misses).
+    """
+    chunk_no, first_kick_id, last_kick_id, max_frames, tmp_dir = task
+    conn = data_access.connect(kick_db_path, pose_db_path)
+    labels, rows = data_access.load_kick_range(conn, first_kick_id, last_kick_id)
+    conn.close()
+    if not rows:
+        return [], None, None, 0, 0
+
+    store = FeatureStore("sequence", FEATURE_STORE_PARAMS)
+    kick_ids, X, y = process_rows(store, labels, rows, max_frames)
+    store.close()
+
+    x_path = os.path.join(tmp_dir, f"X_{chunk_no:05d}.npy")
+    y_path = os.path.join(tmp_dir, f"y_{chunk_no:05d}.npy")
+    np.save(x_path, X.astype(np.float32))
+    np.save(y_path, y)
+    return kick_ids.tolist(), x_path, y_path, store.hits, store.misses
+
+def build_parallel(writer, store, batch_size, workers):
+    """
+    Splits the kicks into kick_id-ordered chunks of 'batch_size' kicks and engineers them on
+    'workers' processes. Chunks are appended in kick_id order as they complete, so the
+    dataset is identical for any number of workers (and to --stream with the same data).
+    """
+    conn = data_access.connect(kick_db_path, pose_db_path)
+    ranges = data_access.kick_id_ranges(conn, batch_size)
+    conn.close()
+
+    num_samples = 0
+    seen_kick_ids = []
+    with tempfile.TemporaryDirectory(dir=SEQUENCE_DIR) as tmp_dir:
+        tasks = [(i, first, last, writer.num_frames, tmp_dir) for i, (first, last) in enumerate(ranges)]
+        with multiprocessing.Pool(workers) as pool:
+            # imap yields results in task order, whatever order the workers finish in
+            for kick_ids, x_path, y_path, hits, misses in pool.imap(process_kick_range, tasks):
+                store.hits += hits
+                store.misses += misses
+                if x_path is None:
+                    continue
+                writer.append(np.load(x_path), np.load(y_path))
+                os.remove(x_path)
+                os.remove(y_path)
+                seen_kick_ids.extend(kick_ids)
+                num_samples = sum(writer.label_counts.values())
+                print(f"  processed kicks up to kick_id={kick_ids[-1]} ({num_samples} sequences kept)")
+
+    return seen_kick_ids
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the sharded sequence training dataset (training_data_sequence/).")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream kicks from the DBs in batches instead of loading all pose data into memory."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=256,
+        help="Number of kicks per batch in --stream / --workers mode. Default=256."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to engineer kick batches on (> 1 enables the process pool). Default=1."
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help=f"Number of sequences per .npy shard. Default={DEFAULT_SHARD_SIZE}."
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the feature store and re-engineer every kick."
+    )
+    args = parser.parse_args()
+
+    conn = data_access.connect(kick_db_path, pose_db_path)
+    max_frames = data_access.max_frames_per_kick(conn)
+    conn.close()
+
+    store = FeatureStore("sequence", FEATURE_STORE_PARAMS)
+    if args.rebuild:
+        store.clear()
+
+    with ShardedDatasetWriter(output_path, FEATURE_COLUMNS, max_frames, args.shard_size) as writer:
+        if args.workers > 1:
+            kick_ids = build_parallel(writer, store, args.batch_size, args.workers)
+        elif args.stream:
+            kick_ids = build_streaming(writer, store, args.batch_size)
+        else:
+            kick_ids = build_in_memory(writer, store)
+
+    removed = store.prune(kick_ids)
+    print(f"Feature store: {store.hits} kicks reused, {store.misses} engineered, {removed} removed")
+    store.close()
+
+    rel_path = os.path.relpath(output_path, BASE_DIR)
+    print(f"Sequence training data saved to {rel_path}/ ({sum(writer.label_counts.values())} sequences)")
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,9 @@ def initialize_pose_data():
         )
     ''')
 
+    # Pose rows are always looked up / joined by frame_id
+    cursor.execute('CREATE INDEX idx_pose_features_frame_id ON pose_features(frame_id)')
+
     conn.commit()
     conn.close()
     print("pose_data.db deleted, recreated, and initialized with tables.")
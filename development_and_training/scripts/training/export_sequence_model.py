@@ -0,0 +1,95 @@
+import os
+import sys
+import argparse
+import numpy as np
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.numpy_lstm import two_step_predict
+from utils.model_export import EXPORT_FILENAMES, export_serving_models
+from utils.model_runtimes import RUNTIMES
+from utils.sequence_dataset import is_sharded_dataset, open_sequence_dataset
+
+MODELS_DIR = os.path.join(BASE_DIR, 'models', 'sequence_models')
+MODEL_PATH = os.path.join(MODELS_DIR, 'sequence_model.h5')
+SCALER_PATH = os.path.join(MODELS_DIR, 'sequence_scaler.pkl')
+
+DATA_DIR = os.path.join(BASE_DIR, 'data', 'processed', 'sequence')
+SEQUENCE_DATASET = os.path.join(DATA_DIR, 'training_data_sequence')
+SEQUENCE_FILE = os.path.join(DATA_DIR, 'training_data_sequence.npz')
+
+TOLERANCE = 1e-4  # max abs difference in class probabilities vs the reference paths
+
+def verification_inputs(num_samples, num_frames, num_features):
+    """
+    Up to 'num_samples' training sequences, topped up with random ones
+    (the dataset may be empty, e.g. with PAD_SEQUENCES = False).
+    """
+    X = np.empty((0, num_frames, num_features), dtype=np.float32)
+    path = SEQUENCE_DATASET if is_sharded_dataset(SEQUENCE_DATASET) else SEQUENCE_FILE
+    if os.path.exists(path):
+        dataset = open_sequence_dataset(path)
+        if len(dataset) and dataset.shape[1:] == (num_frames, num_features):
+            X, _ = dataset.take(np.arange(min(num_samples, len(dataset))))
+    rng = np.random.default_rng(0)
+    extra = rng.normal(size=(max(0, num_samples - len(X)), num_frames, num_features)).astype(np.float32)
+    return np.concatenate([X, extra], axis=0)
+
+def keras_predict(scaler, X):
+    """
+    model.predict(scaler.transform(X)) with the original .h5, or None if TensorFlow is not installed.
+    """
+    try:
+        from tensorflow.keras.models import load_model
+    except ImportError:
+        return None
+    model = load_model(MODEL_PATH)
+    b, t, f = X.shape
+    X_scaled = scaler.transform(X.reshape(b * t, f)).reshape(b, t, f)
+    return model.predict(X_scaled, verbose=0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sequence LSTM for the web backend's inference backends.")
+    parser.add_argument(
+        "--formats",
+        default=",".join(EXPORT_FILENAMES),
+        help=f"Comma-separated export formats ({', '.join(EXPORT_FILENAMES)}). Default: all."
+    )
+    parser.add_argument("--verify-samples", type=int, default=256, help="Sequences to verify each export on.")
+    args = parser.parse_args()
+
+    scaler = joblib.load(SCALER_PATH)
+    written = export_serving_models(MODEL_PATH, scaler, MODELS_DIR, args.formats.split(","))
+
+    # Verification: every export (scaler folded into the LSTM input kernel) against the
+    # two-step scaler.transform -> unfolded weights path, and that path against Keras if available
+    X = verification_inputs(args.verify_samples, 21, scaler.mean_.shape[0])
+    reference = two_step_predict(MODEL_PATH, scaler, X)
+    expected = keras_predict(scaler, X)
+    if expected is None:
+        print("TensorFlow not installed: skipped the comparison against Keras.")
+    else:
+        max_diff = float(np.abs(reference - expected).max())
+        print(f"Two-step NumPy path matches Keras on {len(X)} sequences (max abs diff {max_diff:.2e})")
+        if max_diff > TOLERANCE:
+            sys.exit(f"Reference path does not match Keras (max abs diff {max_diff:.2e} > {TOLERANCE:.0e})")
+
+    for fmt, path in written.items():
+        rel_path = os.path.relpath(path, BASE_DIR)
+        try:
+            runner = RUNTIMES[fmt](path)
+        except ImportError as e:
+            print(f"{fmt}: saved to {rel_path}; not verified ({e.name} is not installed)")
+            continue
+        max_diff = float(np.abs(runner.predict(X) - reference).max())
+        if max_diff > TOLERANCE:
+            os.remove(path)
+            sys.exit(f"{fmt} export does not match the two-step scaler + model path "
+                     f"(max abs diff {max_diff:.2e} > {TOLERANCE:.0e}); removed it.")
+        print(f"{fmt}: saved to {rel_path} ({os.path.getsize(path) / 1024:.0f} KB), "
+              f"matches the two-step path on {len(X)} sequences (max abs diff {max_diff:.2e})")
+
+if __name__ == "__main__":
+    main()
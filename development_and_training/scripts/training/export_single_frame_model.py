@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils import data_access
+from utils.feature_library import CHANNELS, FEATURE_COLUMNS, MIDSWING_FRAME_NO, engineer_frames, rows_to_landmarks
+from utils.numpy_forest import NumpyForestModel, export_forest
+
+PROCESSED_SINGLE_FRAME = os.path.join(BASE_DIR, 'data', 'processed', 'single_frame', 'training_data_single_frame.csv')
+MODELS_DIR = os.path.join(BASE_DIR, 'models', 'single_frame_models')
+MODEL_PATH = os.path.join(MODELS_DIR, 'random_forest_single_frame_model.pkl')
+SCALER_PATH = os.path.join(MODELS_DIR, 'random_forest_single_frame_scaler.pkl')
+EXPORT_PATH = os.path.join(MODELS_DIR, 'random_forest_single_frame_model.npz')
+
+TOLERANCE = 1e-6  # max abs difference in class probabilities vs sklearn
+CSV_TOLERANCE = 1e-6  # max abs difference between the training CSV and engineer_frames()
+
+def load_training_frame():
+    df = pd.read_csv(PROCESSED_SINGLE_FRAME)
+    features = [c for c in df.columns if c not in ('frame_id', 'kick_direction')]
+    return df, features
+
+def check_training_csv(df, features):
+    """
+    The web backend engineers the mid-swing frame with feature_library.engineer_frames(),
+    so the forest must have been trained on exactly that: re-engineers the CSV's frames
+    from the pose database and exits if the features differ (e.g. a CSV or model from
+    before a change to the feature formulas).
+    """
+    if features != FEATURE_COLUMNS:
+        sys.exit("Training CSV columns do not match FEATURE_COLUMNS: regenerate it with "
+                 "scripts/data_preprocessing/feature_engineering_single_frame.py and retrain")
+
+    conn = data_access.connect()
+    rows = data_access.load_pose_rows(conn, frame_no=MIDSWING_FRAME_NO)
+    conn.close()
+    frame_ids, frame_pos = np.unique(rows['frame_id'].values, return_inverse=True)
+    landmarks = rows_to_landmarks(
+        frame_pos, rows['landmark_name'].values, rows[CHANNELS].values, len(frame_ids), dtype=np.float64
+    )
+    served = pd.DataFrame(engineer_frames(landmarks), columns=FEATURE_COLUMNS, index=frame_ids)
+
+    missing = sorted(set(df['frame_id']) - set(frame_ids))
+    if missing:
+        sys.exit(f"Training CSV frames {missing[:5]} have no mid-swing pose rows in the database")
+    expected = served.loc[df['frame_id']].values
+    actual = df[features].values
+    both_nan = np.isnan(expected) & np.isnan(actual)
+    diff = np.where(both_nan, 0.0, np.abs(expected - actual))
+    max_diff = float(np.nan_to_num(diff, nan=np.inf).max())
+    if max_diff > CSV_TOLERANCE:
+        bad = int((np.nan_to_num(diff, nan=np.inf) > CSV_TOLERANCE).any(axis=1).sum())
+        sys.exit(f"Training CSV does not match engineer_frames() on {bad} of {len(df)} rows "
+                 f"(max abs diff {max_diff:.2e}): regenerate it with "
+                 f"scripts/data_preprocessing/feature_engineering_single_frame.py and retrain")
+    return max_diff
+
+def refit_scaler(df, features):
+    """
+    The StandardScaler of train_model_single_frame.py, refitted on the same split of the
+    training CSV (models trained before the script saved its scaler).
+    """
+    X_train, _, _, _ = train_test_split(df[features], df['kick_direction'], test_size=0.2, random_state=42)
+    return StandardScaler().fit(X_train)
+
+def median_ms(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the single-frame random forest into flat NumPy arrays for serving.")
+    parser.add_argument("--verify-samples", type=int, default=1000, help="Random rows to verify on, besides the training CSV.")
+    parser.add_argument("--iterations", type=int, default=200, help="Single-row predictions to time.")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    df, features = load_training_frame()
+    csv_diff = check_training_csv(df, features)
+    if os.path.exists(SCALER_PATH):
+        scaler = joblib.load(SCALER_PATH)
+    else:
+        # Deterministic: same CSV, split and random_state as the training run
+        scaler = refit_scaler(df, features)
+        print(f"{os.path.relpath(SCALER_PATH, BASE_DIR)} not found: refitted the scaler on the training split")
+
+    meta = export_forest(model, scaler, EXPORT_PATH, feature_names=features)
+
+    # Verification: the training rows plus random ones drawn around the feature means
+    rng = np.random.default_rng(0)
+    X = np.concatenate([
+        df[features].values,
+        scaler.mean_ + scaler.scale_ * rng.normal(size=(args.verify_samples, len(features))),
+    ]).astype(np.float32)
+    compiled = NumpyForestModel(EXPORT_PATH)
+    expected = model.predict_proba(scaler.transform(X))
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    if max_diff > TOLERANCE:
+        os.remove(EXPORT_PATH)
+        sys.exit(f"Compiled forest does not match sklearn (max abs diff {max_diff:.2e} > {TOLERANCE:.0e}); removed it.")
+
+    x1 = X[:1]
+    sklearn_ms = median_ms(lambda: model.predict_proba(scaler.transform(x1)), args.iterations)
+    compiled_ms = median_ms(lambda: compiled.predict_proba(x1), args.iterations)
+    load_ms = median_ms(lambda: NumpyForestModel(EXPORT_PATH), 20)
+    sklearn_load_ms = median_ms(lambda: joblib.load(MODEL_PATH), 5)
+
+    print(f"Forest compiled to {os.path.relpath(EXPORT_PATH, BASE_DIR)}: {meta['num_trees']} trees, "
+          f"{meta['num_nodes']} nodes, depth {meta['max_depth']}, classes {meta['classes']}")
+    print(f"Training CSV matches engineer_frames() (max abs diff {csv_diff:.2e})")
+    print(f"Matches sklearn on {len(X)} rows (max abs diff {max_diff:.2e})")
+    print(f"Single-row predict: {compiled_ms:.3f} ms vs {sklearn_ms:.3f} ms sklearn (scaler + predict_proba)")
+    print(f"Load: {load_ms:.1f} ms vs {sklearn_load_ms:.1f} ms unpickling")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.model_export import EXPORT_FILENAMES, QUANTIZED_FILENAMES
+from utils.model_registry import ModelRegistry
+from utils.numpy_lstm import file_sha256
+
+MODELS_DIR = os.path.join(BASE_DIR, 'models', 'sequence_models')
+MODEL_FILENAME = 'sequence_model.h5'
+SCALER_FILENAME = 'sequence_scaler.pkl'
+CLASSES_FILENAME = 'sequence_classes.json'
+
+# Same default as the web backend's PK_MODEL_REGISTRY_DIR
+REGISTRY_DIR = os.environ.get("PK_MODEL_REGISTRY_DIR", os.path.join(BASE_DIR, 'models', 'registry'))
+REGISTRY_MODEL_NAME = 'sequence'
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Publish the sequence model in models/sequence_models/ to the model registry, "
+                    "or switch the active version. Running web workers swap to it without a restart."
+    )
+    parser.add_argument("--version", help="Version name for the new version. Default: UTC time + artifact hash.")
+    parser.add_argument("--no-activate", action="store_true", help="Publish without making it the active version.")
+    parser.add_argument("--activate", metavar="VERSION", help="Only activate an already published version (e.g. roll back).")
+    parser.add_argument("--list", action="store_true", help="List the published versions and exit.")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(REGISTRY_DIR, REGISTRY_MODEL_NAME)
+
+    if args.list:
+        active = registry.active_version()
+        for manifest in registry.versions():
+            marker = "*" if manifest['version'] == active else " "
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {', '.join(manifest['files'])}")
+        return
+
+    if args.activate:
+        registry.activate(args.activate)
+        print(f"Active {REGISTRY_MODEL_NAME} version: {args.activate}")
+        return
+
+    # The .h5 + scaler, plus every serving export made from this .h5 and its class labels
+    model_path = os.path.join(MODELS_DIR, MODEL_FILENAME)
+    files = {MODEL_FILENAME: model_path, SCALER_FILENAME: os.path.join(MODELS_DIR, SCALER_FILENAME)}
+    for filename in list(EXPORT_FILENAMES.values()) + list(QUANTIZED_FILENAMES.values()) + [CLASSES_FILENAME]:
+        path = os.path.join(MODELS_DIR, filename)
+        if os.path.exists(path):
+            files[filename] = path
+
+    version = registry.publish(
+        files,
+        version=args.version,
+        metadata={"source_sha256": file_sha256(model_path)},
+        activate=not args.no_activate
+    )
+    print(f"Published {REGISTRY_MODEL_NAME} version {version} to {os.path.relpath(registry.version_dir(version), BASE_DIR)}")
+    print(f"Files: {', '.join(files)}")
+    if not args.no_activate:
+        print(f"Active {REGISTRY_MODEL_NAME} version: {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.numpy_lstm import two_step_predict
+from utils.model_export import EXPORT_FILENAMES, QUANTIZED_FILENAMES, export_serving_models
+from utils.model_runtimes import RUNTIMES
+from utils.sequence_dataset import is_sharded_dataset, open_sequence_dataset
+
+MODELS_DIR = os.path.join(BASE_DIR, 'models', 'sequence_models')
+MODEL_PATH = os.path.join(MODELS_DIR, 'sequence_model.h5')
+SCALER_PATH = os.path.join(MODELS_DIR, 'sequence_scaler.pkl')
+
+DATA_DIR = os.path.join(BASE_DIR, 'data', 'processed', 'sequence')
+SEQUENCE_DATASET = os.path.join(DATA_DIR, 'training_data_sequence')
+SEQUENCE_FILE = os.path.join(DATA_DIR, 'training_data_sequence.npz')
+
+REPORT_DIR = os.path.join(BASE_DIR, 'report', 'sequence')
+REPORT_PATH = os.path.join(REPORT_DIR, 'quantization_report_sequence.txt')
+
+# Float export each int8 variant is compared against for size / load / latency
+FLOAT_COUNTERPART = {"numpy_int8": "numpy", "onnx_int8": "onnx"}
+
+def calibration_samples(num_samples, num_frames, scaler, seed=0):
+    """
+    Up to 'num_samples' training sequences (with their labels), topped up with synthetic
+    ones drawn per feature from N(scaler.mean_, scaler.scale_) when the dataset is smaller
+    (e.g. empty with PAD_SEQUENCES = False). Returns (X, y, num_real); y covers the real rows only.
+    """
+    num_features = scaler.mean_.shape[0]
+    X = np.empty((0, num_frames, num_features), dtype=np.float32)
+    y = np.empty((0,), dtype=np.int64)
+    path = SEQUENCE_DATASET if is_sharded_dataset(SEQUENCE_DATASET) else SEQUENCE_FILE
+    if os.path.exists(path):
+        dataset = open_sequence_dataset(path)
+        if len(dataset) and dataset.shape[1:] == (num_frames, num_features):
+            rng = np.random.default_rng(seed)
+            indices = np.sort(rng.permutation(len(dataset))[:num_samples])
+            X, y = dataset.take(indices)
+    num_real = len(X)
+    rng = np.random.default_rng(seed)
+    synthetic = scaler.mean_ + scaler.scale_ * rng.normal(size=(num_samples - num_real, num_frames, num_features))
+    return np.concatenate([X, synthetic.astype(np.float32)], axis=0), y, num_real
+
+def load_and_time(fmt, path, X, iterations, loads=5):
+    """
+    Loads 'path' with its runtime and returns (runner, median load ms, p50 single-sequence predict ms).
+    The runtime's own import is paid by the first load and not counted.
+    """
+    load_timings = []
+    for _ in range(loads + 1):
+        started = time.perf_counter()
+        runner = RUNTIMES[fmt](path)
+        load_timings.append((time.perf_counter() - started) * 1000.0)
+    load_ms = float(np.median(load_timings[1:]))
+    runner.predict(X[:1])  # first call may allocate / build the graph
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        runner.predict(X[i % len(X):i % len(X) + 1])
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return runner, load_ms, float(np.median(timings))
+
+def label_accuracy(probs, y):
+    """
+    Accuracy against the dataset labels remapped like train_model_sequence.remap_labels,
+    or None when the labels present do not map onto the model's classes.
+    """
+    classes = np.unique(y)
+    if len(y) == 0 or len(classes) != probs.shape[1]:
+        return None
+    y_remapped = np.searchsorted(classes, y)
+    return float((probs.argmax(axis=1) == y_remapped).mean())
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-training int8 weight quantization of the sequence LSTM.")
+    parser.add_argument(
+        "--formats",
+        default=",".join(QUANTIZED_FILENAMES),
+        help=f"Comma-separated int8 formats ({', '.join(QUANTIZED_FILENAMES)}). Default: all."
+    )
+    parser.add_argument("--calibration-samples", type=int, default=512, help="Sequences to compare on.")
+    parser.add_argument("--max-delta", type=float, default=0.02,
+                        help="Largest class-probability difference vs the float model before an export is rejected.")
+    parser.add_argument("--iterations", type=int, default=200, help="Single-sequence predictions to time per export.")
+    args = parser.parse_args()
+
+    # 1. Quantized exports
+    scaler = joblib.load(SCALER_PATH)
+    written = export_serving_models(MODEL_PATH, scaler, MODELS_DIR, args.formats.split(","))
+
+    # 2. Calibration set and the float reference (scaler.transform -> unfolded float32 weights)
+    X, y, num_real = calibration_samples(args.calibration_samples, 21, scaler)
+    reference = two_step_predict(MODEL_PATH, scaler, X)
+    print(f"Comparing on {len(X)} sequences ({num_real} from the dataset, {len(X) - num_real} synthetic)")
+
+    lines = [
+        "Post-training int8 quantization: sequence LSTM",
+        f"Float model: {os.path.relpath(MODEL_PATH, BASE_DIR)} + {os.path.relpath(SCALER_PATH, BASE_DIR)}",
+        f"Calibration set: {len(X)} sequences ({num_real} from the dataset, {len(X) - num_real} synthetic)",
+        "Weights: symmetric int8, one scale per output column; activations stay float32",
+        "",
+    ]
+    reference_accuracy = label_accuracy(reference[:num_real], y)
+    if reference_accuracy is None:
+        lines.append("Label accuracy: skipped (no dataset labels matching the model's classes)")
+    else:
+        lines.append(f"Float model accuracy on the {num_real} dataset sequences: {reference_accuracy:.4f}")
+    lines.append("")
+
+    # 3. Accuracy delta, size, load time and latency of each int8 export vs its float counterpart
+    failed = []
+    for fmt, path in written.items():
+        rel_path = os.path.relpath(path, BASE_DIR)
+        float_fmt = FLOAT_COUNTERPART[fmt]
+        float_path = os.path.join(MODELS_DIR, EXPORT_FILENAMES[float_fmt])
+        try:
+            runner, load_ms, p50_ms = load_and_time(fmt, path, X, args.iterations)
+        except ImportError as e:
+            print(f"{fmt}: saved to {rel_path}; not evaluated ({e.name} is not installed)")
+            continue
+
+        probs = runner.predict(X)
+        delta = np.abs(probs - reference)
+        agreement = float((probs.argmax(axis=1) == reference.argmax(axis=1)).mean())
+        size_kb = os.path.getsize(path) / 1024
+
+        lines.append(f"[{fmt}] {rel_path}")
+        lines.append(f"  max abs probability delta:  {delta.max():.6f}")
+        lines.append(f"  mean abs probability delta: {delta.mean():.6f}")
+        lines.append(f"  top-1 agreement with float: {agreement:.4f}")
+        accuracy = label_accuracy(probs[:num_real], y)
+        if accuracy is not None:
+            lines.append(f"  label accuracy: {accuracy:.4f} (float {reference_accuracy:.4f})")
+        if os.path.exists(float_path):
+            _, float_load_ms, float_p50_ms = load_and_time(float_fmt, float_path, X, args.iterations)
+            float_kb = os.path.getsize(float_path) / 1024
+            lines.append(f"  size:    {size_kb:.0f} KB vs {float_kb:.0f} KB {float_fmt} ({size_kb / float_kb:.2f}x)")
+            lines.append(f"  load:    {load_ms:.1f} ms vs {float_load_ms:.1f} ms")
+            lines.append(f"  p50 single-sequence predict: {p50_ms:.3f} ms vs {float_p50_ms:.3f} ms")
+        else:
+            lines.append(f"  size: {size_kb:.0f} KB, load: {load_ms:.1f} ms, p50 predict: {p50_ms:.3f} ms")
+
+        if delta.max() > args.max_delta:
+            os.remove(path)
+            failed.append(fmt)
+            lines.append(f"  REJECTED: max delta above {args.max_delta}; export removed")
+        lines.append("")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        f.write("\n".join(lines))
+    print("\n".join(lines))
+    print(f"Report saved to: {os.path.relpath(REPORT_PATH, BASE_DIR)}")
+    if failed:
+        sys.exit(f"Rejected int8 exports: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
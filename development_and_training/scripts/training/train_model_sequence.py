@@ -1,4 +1,7 @@
 import os
+import sys
+import json
+import math
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -9,8 +12,14 @@ from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
 import joblib
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.sequence_dataset import is_sharded_dataset, open_sequence_dataset
+from utils.model_export import export_serving_models
+
 DATA_DIR = os.path.join(BASE_DIR, 'data')
-SEQUENCE_FILE = os.path.join(DATA_DIR, 'processed', 'sequence', 'training_data_sequence.npz')
+SEQUENCE_DATASET = os.path.join(DATA_DIR, 'processed', 'sequence', 'training_data_sequence')
+SEQUENCE_FILE = os.path.join(DATA_DIR, 'processed', 'sequence', 'training_data_sequence.npz')  # legacy format
 
 REPORT_DIR = os.path.join(BASE_DIR, 'report', 'sequence')
 MODELS_DIR = os.path.join(BASE_DIR, 'models', 'sequence_models')
@@ -18,11 +27,16 @@ MODELS_DIR = os.path.join(BASE_DIR, 'models', 'sequence_models')
 os.makedirs(REPORT_DIR, exist_ok=True)
 os.makedirs(MODELS_DIR, exist_ok=True)
 
-def load_data(npz_path):
-    data = np.load(npz_path)
-    X_seq = data['X_seq']
-    y_seq = data['y_seq']
-    return X_seq, y_seq
+BATCH_SIZE = 32
+VALIDATION_SPLIT = 0.2
+
+def load_dataset():
+    """
+    Opens the sharded, memory-mapped dataset if it exists, else the legacy .npz.
+    """
+    if is_sharded_dataset(SEQUENCE_DATASET):
+        return open_sequence_dataset(SEQUENCE_DATASET)
+    return open_sequence_dataset(SEQUENCE_FILE)
 
 def remap_labels(y_seq):
     # Ensure zero-based labels
@@ -32,21 +46,56 @@ def remap_labels(y_seq):
     y_new = np.array([label_map[label] for label in y_seq])
     return y_new, len(unique_labels)
 
-def scale_features(X_train, X_test):
-    num_train, num_frames, num_features = X_train.shape
-    num_test = X_test.shape[0]
-
-    X_train_2d = X_train.reshape(num_train * num_frames, num_features)
-    X_test_2d = X_test.reshape(num_test * num_frames, num_features)
-
+def save_class_labels(y_seq, path):
+    """
+    The original kick_direction of each output index (the inverse of remap_labels), so
+    consumers can tell which direction a probability belongs to.
+    """
+    classes = [int(label) for label in sorted(np.unique(y_seq))]
+    with open(path, 'w') as f:
+        json.dump({"classes": classes}, f)
+    return classes
+
+def fit_scaler(dataset, indices, batch_size=1024):
+    """
+    Per-feature StandardScaler over all frames of the given samples, fitted batch by batch
+    so the training set never has to be loaded at once.
+    """
     scaler = StandardScaler()
-    X_train_2d = scaler.fit_transform(X_train_2d)
-    X_test_2d = scaler.transform(X_test_2d)
-
-    X_train_scaled = X_train_2d.reshape(num_train, num_frames, num_features)
-    X_test_scaled = X_test_2d.reshape(num_test, num_frames, num_features)
-
-    return X_train_scaled, X_test_scaled, scaler
+    for start in range(0, len(indices), batch_size):
+        X, _ = dataset.take(np.sort(indices[start:start + batch_size]))
+        scaler.partial_fit(X.reshape(-1, X.shape[2]))
+    return scaler
+
+class ScaledBatches(tf.keras.utils.Sequence):
+    """
+    Feeds model.fit / model.predict from the dataset, reading and scaling one batch at a time.
+    """
+    def __init__(self, dataset, indices, labels, scaler, batch_size=BATCH_SIZE, shuffle=False):
+        super().__init__()
+        self.dataset = dataset
+        self.indices = np.asarray(indices)
+        self.labels = labels
+        self.scaler = scaler
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(42)
+        if shuffle:
+            self.rng.shuffle(self.indices)
+
+    def __len__(self):
+        return math.ceil(len(self.indices) / self.batch_size)
+
+    def __getitem__(self, i):
+        idx = self.indices[i * self.batch_size:(i + 1) * self.batch_size]
+        X, _ = self.dataset.take(idx)
+        b, t, f = X.shape
+        X = self.scaler.transform(X.reshape(b * t, f)).reshape(b, t, f).astype(np.float32)
+        return X, self.labels[idx]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.indices)
 
 def build_lstm_model(input_shape, num_classes):
     model = Sequential()
@@ -60,10 +109,13 @@ def build_lstm_model(input_shape, num_classes):
     return model
 
 if __name__ == "__main__":
-    X_seq, y_seq = load_data(SEQUENCE_FILE)
+    # Only the labels are loaded here; features stay memory-mapped on disk
+    dataset = load_dataset()
 
     # Remap labels to zero-based
-    y_seq, num_classes = remap_labels(y_seq)
+    labels = dataset.labels()
+    y_seq, num_classes = remap_labels(labels)
+    indices = np.arange(len(dataset))
 
     # Check class counts for stratify
     unique, counts = np.unique(y_seq, return_counts=True)
@@ -71,18 +123,25 @@ if __name__ == "__main__":
 
     if min_count < 2:
         print("Warning: Not enough samples in at least one class to stratify. Using random split.")
-        X_train, X_test, y_train, y_test = train_test_split(X_seq, y_seq, test_size=0.2, random_state=42)
+        train_idx, test_idx = train_test_split(indices, test_size=0.2, random_state=42)
     else:
-        X_train, X_test, y_train, y_test = train_test_split(X_seq, y_seq, test_size=0.2, random_state=42, stratify=y_seq)
+        train_idx, test_idx = train_test_split(indices, test_size=0.2, random_state=42, stratify=y_seq)
+
+    scaler = fit_scaler(dataset, train_idx)
 
-    X_train_scaled, X_test_scaled, scaler = scale_features(X_train, X_test)
+    # Same split as model.fit(validation_split=0.2): the last 20% of the training samples
+    split_at = int(len(train_idx) * (1 - VALIDATION_SPLIT))
+    fit_batches = ScaledBatches(dataset, train_idx[:split_at], y_seq, scaler, shuffle=True)
+    val_batches = ScaledBatches(dataset, train_idx[split_at:], y_seq, scaler)
+    test_batches = ScaledBatches(dataset, test_idx, y_seq, scaler)
 
-    input_shape = (X_train_scaled.shape[1], X_train_scaled.shape[2]) 
+    input_shape = (dataset.num_frames, dataset.num_features)
     model = build_lstm_model(input_shape, num_classes)
 
-    history = model.fit(X_train_scaled, y_train, validation_split=0.2, epochs=20, batch_size=32)
+    history = model.fit(fit_batches, validation_data=val_batches, epochs=20)
 
-    y_pred = model.predict(X_test_scaled)
+    y_test = y_seq[test_idx]
+    y_pred = model.predict(test_batches)
     y_pred_labels = np.argmax(y_pred, axis=1)
 
     print("Classification Report:")
@@ -99,10 +158,21 @@ if __name__ == "__main__":
     scaler_path = os.path.join(MODELS_DIR, 'sequence_scaler.pkl')
     joblib.dump(scaler, scaler_path)
 
+    classes_path = os.path.join(MODELS_DIR, 'sequence_classes.json')
+    save_class_labels(labels, classes_path)
+
+    # Keep the serving exports (NumPy, ONNX, TFLite) in sync with the new weights
+    exports = export_serving_models(model_path, scaler, MODELS_DIR)
+
     report_path = os.path.join(REPORT_DIR, 'classification_report_sequence.txt')
     with open(report_path, 'w') as f:
         f.write(report)
 
     print(f"Model saved to: {os.path.relpath(model_path, BASE_DIR)}")
     print(f"Scaler saved to: {os.path.relpath(scaler_path, BASE_DIR)}")
+    print(f"Class labels saved to: {os.path.relpath(classes_path, BASE_DIR)}")
+    for fmt, path in exports.items():
+        print(f"{fmt} export saved to: {os.path.relpath(path, BASE_DIR)}")
     print(f"Report saved to: {os.path.relpath(report_path, BASE_DIR)}")
+    print("Run scripts/training/quantize_sequence_model.py to refresh the int8 exports and their accuracy report,")
+    print("then scripts/training/publish_sequence_model.py to deploy this model to the web backend without a restart.")
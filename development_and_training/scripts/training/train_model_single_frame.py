@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
@@ -9,6 +10,10 @@ import joblib
 from sklearn.preprocessing import StandardScaler
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # development_and_training base directory
+sys.path.append(BASE_DIR)
+
+from utils.numpy_forest import export_forest
+
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 PROCESSED_SINGLE_FRAME = os.path.join(DATA_DIR, 'processed', 'single_frame', 'training_data_single_frame.csv')
 REPORT_DIR = os.path.join(BASE_DIR, 'report', 'single_frame')
@@ -30,8 +35,8 @@ X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_
 
 # Apply scaling
 scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+X_train_scaled = scaler.fit_transform(X_train.values)
+X_test_scaled = scaler.transform(X_test.values)
 
 model = RandomForestClassifier(n_estimators=100, random_state=42)
 model.fit(X_train_scaled, y_train)
@@ -75,3 +80,12 @@ print(f"SHAP summary plot saved to {os.path.relpath(shap_plot_path, BASE_DIR)}")
 model_path = os.path.join(MODELS_DIR, 'random_forest_single_frame_model.pkl')
 joblib.dump(model, model_path)
 print(f"Trained model saved to {os.path.relpath(model_path, BASE_DIR)}")
+
+scaler_path = os.path.join(MODELS_DIR, 'random_forest_single_frame_scaler.pkl')
+joblib.dump(scaler, scaler_path)
+print(f"Scaler saved to {os.path.relpath(scaler_path, BASE_DIR)}")
+
+# Flat-array forest with the scaler folded in, served by the web backend's single-frame mode
+export_path = os.path.join(MODELS_DIR, 'random_forest_single_frame_model.npz')
+export_forest(model, scaler, export_path, feature_names=features)
+print(f"Compiled forest saved to {os.path.relpath(export_path, BASE_DIR)}")
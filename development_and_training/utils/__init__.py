@@ -0,0 +1,6 @@
+"""
+Shared training / serving helpers (feature library, model export and runtimes).
+
+A regular package rather than a namespace one, so an installed package that is also
+named 'utils' cannot take precedence over it when this directory is first on sys.path.
+"""
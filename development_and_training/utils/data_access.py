@@ -0,0 +1,131 @@
+"""
+data_access.py
+
+SQLite access to the training databases (data/kick_data.db + data/pose_data.db).
+Both files are opened on one connection, with pose_data.db ATTACHed as 'pose',
+so filters and joins between frames/kicks and pose_features run inside SQLite
+and only the rows a feature set needs ever reach Python.
+"""
+
+import os
+import sqlite3
+import pandas as pd
+
+from utils.feature_library import REQUIRED_LANDMARKS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # development_and_training base directory
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+KICK_DB_PATH = os.path.join(DATA_DIR, 'kick_data.db')
+POSE_DB_PATH = os.path.join(DATA_DIR, 'pose_data.db')
+
+POSE_COLUMNS = ["kick_id", "frame_id", "frame_no", "kick_direction",
+                "landmark_name", "x", "y", "z", "visibility"]
+
+_POSE_QUERY = """
+    SELECT f.kick_id, f.frame_id, f.frame_no, k.kick_direction,
+           p.landmark_name, p.x, p.y, p.z, p.visibility
+    FROM frames f
+    JOIN kicks k ON k.kick_id = f.kick_id
+    JOIN pose.pose_features p ON p.frame_id = f.frame_id
+    WHERE p.landmark_name IN ({landmarks})
+      {filters}
+    ORDER BY f.kick_id, f.frame_no
+"""
+
+
+def connect(kick_db_path=KICK_DB_PATH, pose_db_path=POSE_DB_PATH):
+    """
+    Opens kick_data.db with pose_data.db attached as schema 'pose',
+    making sure the join indexes exist.
+    """
+    conn = sqlite3.connect(kick_db_path)
+    conn.execute("ATTACH DATABASE ? AS pose", (pose_db_path,))
+    ensure_indexes(conn)
+    return conn
+
+
+def ensure_indexes(conn):
+    """
+    Creates the indexes the push-down joins rely on (no-op if they exist).
+    frames(kick_id, frame_no) is already covered by its UNIQUE constraint.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS pose.idx_pose_features_frame_id ON pose_features(frame_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_frame_no ON frames(frame_no)")
+    conn.commit()
+
+
+def _pose_query(filters="", landmarks=REQUIRED_LANDMARKS):
+    placeholders = ",".join(["?"] * len(landmarks))
+    return _POSE_QUERY.format(landmarks=placeholders, filters=filters), list(landmarks)
+
+
+def load_pose_rows(conn, frame_no=None, landmarks=REQUIRED_LANDMARKS):
+    """
+    Long-format pose rows joined with their frame and kick, as a DataFrame with POSE_COLUMNS,
+    ordered by kick_id, frame_no. Only 'landmarks' (default: the ones the feature library
+    reads) and, if given, a single frame_no are selected.
+    """
+    if frame_no is None:
+        query, params = _pose_query(landmarks=landmarks)
+    else:
+        query, params = _pose_query("AND f.frame_no = ?", landmarks)
+        params.append(frame_no)
+    return pd.read_sql_query(query, conn, params=params)
+
+
+def max_frames_per_kick(conn):
+    """
+    Largest number of extracted frames of any kick (0 if there are no frames).
+    """
+    row = conn.execute("""
+        SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM frames GROUP BY kick_id)
+    """).fetchone()
+    return row[0] or 0
+
+
+def kick_id_ranges(conn, batch_size=256):
+    """
+    Partitions the kicks table, in kick_id order, into consecutive batches of
+    'batch_size' kicks. Returns [(first_kick_id, last_kick_id), ...].
+    """
+    kick_ids = [r[0] for r in conn.execute("SELECT kick_id FROM kicks ORDER BY kick_id")]
+    return [(batch[0], batch[-1])
+            for batch in (kick_ids[i:i + batch_size] for i in range(0, len(kick_ids), batch_size))]
+
+
+def load_kick_range(conn, first_kick_id, last_kick_id, landmarks=REQUIRED_LANDMARKS):
+    """
+    Labels and pose rows of the kicks with first_kick_id <= kick_id <= last_kick_id.
+
+    Returns (labels, rows):
+      labels: {kick_id: kick_direction}
+      rows: tuples in POSE_COLUMNS order, ordered by kick_id, frame_no
+    """
+    kicks = conn.execute("""
+        SELECT kick_id, kick_direction FROM kicks
+        WHERE kick_id BETWEEN ? AND ?
+    """, (first_kick_id, last_kick_id)).fetchall()
+    query, params = _pose_query("AND f.kick_id BETWEEN ? AND ?", landmarks)
+    rows = conn.execute(query, params + [first_kick_id, last_kick_id]).fetchall()
+    return dict(kicks), rows
+
+
+def iter_kick_batches(conn, batch_size=256, landmarks=REQUIRED_LANDMARKS):
+    """
+    Walks the kicks table in kick_id order, 'batch_size' kicks at a time.
+
+    Yields (labels, rows) per batch, as returned by load_kick_range().
+    Only one batch of rows is held in memory at a time.
+    """
+    last_kick_id = -1  # kick_id is an AUTOINCREMENT key (>= 1)
+    while True:
+        kicks = conn.execute("""
+            SELECT kick_id FROM kicks
+            WHERE kick_id > ?
+            ORDER BY kick_id LIMIT ?
+        """, (last_kick_id, batch_size)).fetchall()
+        if not kicks:
+            return
+
+        first_kick_id, last_kick_id = kicks[0][0], kicks[-1][0]
+        yield load_kick_range(conn, first_kick_id, last_kick_id, landmarks)
@@ -0,0 +1,320 @@
+"""
+feature_library.py
+
+Shared, vectorized pose feature engineering used by both the training scripts
+(scripts/data_preprocessing/) and the web backend (/compute_engineered, /predict_kick).
+
+Everything works on dense NumPy landmark tensors of shape (..., 33, C), where the
+landmark axis follows MediaPipe's PoseLandmark index order and the channel axis is
+(x, y, z[, visibility]). Leading axes are free, so the same code handles a single
+frame, one kick (frames, 33, C) or a whole dataset (kicks, frames, 33, C).
+
+Normalization (matches the data the deployed sequence model was trained on):
+  - origin: per-frame mid-hip (falls back to mid-shoulder, then a single
+    shoulder / the nose when hips are missing)
+  - scale: signed horizontal shoulder width (x_shoulder_right - x_shoulder_left)
+    taken from the reference frame (mid-swing, frame_no 11), 1e-6 if zero,
+    1.0 if shoulders are missing
+  - z is only scaled, not shifted
+"""
+
+import numpy as np
+
+# MediaPipe PoseLandmark names, in landmark index order
+LANDMARK_NAMES = [
+    "NOSE",
+    "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER", "RIGHT_EYE", "RIGHT_EYE_OUTER",
+    "LEFT_EAR", "RIGHT_EAR",
+    "MOUTH_LEFT", "MOUTH_RIGHT",
+    "LEFT_SHOULDER", "RIGHT_SHOULDER",
+    "LEFT_ELBOW", "RIGHT_ELBOW",
+    "LEFT_WRIST", "RIGHT_WRIST",
+    "LEFT_PINKY", "RIGHT_PINKY",
+    "LEFT_INDEX", "RIGHT_INDEX",
+    "LEFT_THUMB", "RIGHT_THUMB",
+    "LEFT_HIP", "RIGHT_HIP",
+    "LEFT_KNEE", "RIGHT_KNEE",
+    "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+]
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+
+# Channels of a landmark tensor
+CHANNELS = ["x", "y", "z", "visibility"]
+
+# Sequence layout used by frame extraction: 10 frames before + mid-swing + 10 after
+SEQUENCE_LENGTH = 21
+MIDSWING_FRAME_NO = 11
+
+# Landmarks that make up the feature vector. The order is the column order produced by
+# the original pandas pivot (alphabetical by MediaPipe name), which the saved models expect.
+FEATURE_LANDMARKS = [
+    "LEFT_ANKLE", "LEFT_ELBOW", "LEFT_FOOT_INDEX", "LEFT_HIP",
+    "LEFT_KNEE", "LEFT_SHOULDER", "LEFT_WRIST",
+    "RIGHT_ANKLE", "RIGHT_ELBOW", "RIGHT_FOOT_INDEX", "RIGHT_HIP",
+    "RIGHT_KNEE", "RIGHT_SHOULDER", "RIGHT_WRIST",
+]
+
+# (angle column, first joint, center joint, second joint)
+ANGLE_DEFINITIONS = [
+    ("angle_knee_left", "LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE"),
+    ("angle_knee_right", "RIGHT_HIP", "RIGHT_KNEE", "RIGHT_ANKLE"),
+    ("angle_elbow_left", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST"),
+    ("angle_elbow_right", "RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST"),
+]
+
+
+def landmark_column_name(landmark_name):
+    """
+    Converts a MediaPipe landmark name to the column suffix used in feature names,
+    e.g. LEFT_HIP -> hip_left, LEFT_FOOT_INDEX -> left_foot_index.
+    """
+    landmark = landmark_name.lower()
+    parts = landmark.split('_')
+    if len(parts) == 2:
+        side, joint = parts
+        landmark = f"{joint}_{side}"
+    return landmark
+
+
+COORD_COLUMNS = [
+    f"{axis}_{landmark_column_name(name)}"
+    for axis in ("x", "y", "z")
+    for name in FEATURE_LANDMARKS
+]
+MID_HIP_COLUMNS = ["x_mid_hip", "y_mid_hip"]
+ANGLE_COLUMNS = [a[0] for a in ANGLE_DEFINITIONS]
+
+# The declared feature schema: one row per frame, in this exact order
+FEATURE_COLUMNS = COORD_COLUMNS + MID_HIP_COLUMNS + ANGLE_COLUMNS
+NUM_FEATURES = len(FEATURE_COLUMNS)
+
+# Every landmark the feature computation reads (features + the nose, used as last-resort origin)
+REQUIRED_LANDMARKS = FEATURE_LANDMARKS + ["NOSE"]
+
+_FEATURE_IDX = np.array([LANDMARK_INDEX[n] for n in FEATURE_LANDMARKS])
+_ANGLE_IDX = np.array([
+    [LANDMARK_INDEX[a], LANDMARK_INDEX[b], LANDMARK_INDEX[c]]
+    for _, a, b, c in ANGLE_DEFINITIONS
+])
+
+_L_HIP, _R_HIP = LANDMARK_INDEX["LEFT_HIP"], LANDMARK_INDEX["RIGHT_HIP"]
+_L_SHOULDER, _R_SHOULDER = LANDMARK_INDEX["LEFT_SHOULDER"], LANDMARK_INDEX["RIGHT_SHOULDER"]
+_NOSE = LANDMARK_INDEX["NOSE"]
+
+
+def empty_landmarks(shape, dtype=np.float32):
+    """
+    Returns a NaN-filled landmark tensor of shape (*shape, 33, 4).
+    NaN marks landmarks that were not detected.
+    """
+    return np.full(tuple(shape) + (NUM_LANDMARKS, len(CHANNELS)), np.nan, dtype=dtype)
+
+
+def landmark_indices(landmark_names):
+    """
+    Maps an iterable of MediaPipe landmark names to landmark indices (-1 if unknown).
+    """
+    return np.fromiter((LANDMARK_INDEX.get(n, -1) for n in landmark_names), dtype=np.int64)
+
+
+def reference_index(frame_nos, ref_frame_no=MIDSWING_FRAME_NO):
+    """
+    Position of the reference (mid-swing) frame along the last axis of 'frame_nos'.
+    Falls back to the first frame if the mid-swing frame is missing.
+    Returns an int for a single frame_no vector, else an array of shape frame_nos.shape[:-1].
+    """
+    hits = np.asarray(frame_nos) == ref_frame_no
+    if hits.shape[-1] == 0:
+        idx = np.zeros(hits.shape[:-1], dtype=np.int64)
+    else:
+        idx = np.where(hits.any(axis=-1), hits.argmax(axis=-1), 0)
+    return int(idx) if idx.ndim == 0 else idx
+
+
+def pose_origin(landmarks):
+    """
+    (..., 33, C) -> (..., 2) per-frame origin: mid-hip, else mid-shoulder,
+    else left shoulder, right shoulder or nose (first one available).
+    """
+    xy = landmarks[..., :2]
+    candidates = [
+        (xy[..., _L_HIP, :] + xy[..., _R_HIP, :]) / 2.0,
+        (xy[..., _L_SHOULDER, :] + xy[..., _R_SHOULDER, :]) / 2.0,
+        xy[..., _L_SHOULDER, :],
+        xy[..., _R_SHOULDER, :],
+        xy[..., _NOSE, :],
+    ]
+    origin = candidates[-1]
+    for cand in reversed(candidates[:-1]):
+        ok = np.isfinite(cand).all(axis=-1, keepdims=True)
+        origin = np.where(ok, cand, origin)
+    return origin
+
+
+def shoulder_scale(landmarks):
+    """
+    (..., 33, C) -> (...) signed horizontal shoulder width.
+    Zero widths become 1e-6; missing shoulders give 1.0.
+    """
+    scale = landmarks[..., _R_SHOULDER, 0] - landmarks[..., _L_SHOULDER, 0]
+    scale = np.where(scale == 0, 1e-6, scale)
+    return np.where(np.isfinite(scale), scale, 1.0)
+
+
+def normalize_landmarks(landmarks, scale):
+    """
+    Translates x/y to the per-frame origin and divides x/y/z by 'scale'.
+
+    landmarks: (..., 33, C) with C >= 3
+    scale: array broadcastable to landmarks.shape[:-2]
+    Returns (..., 33, 3) normalized coordinates.
+    """
+    scale = np.asarray(scale)[..., None, None]
+    origin = pose_origin(landmarks)
+    xy = (landmarks[..., :2] - origin[..., None, :]) / scale
+    z = landmarks[..., 2:3] / scale
+    return np.concatenate([xy, z], axis=-1)
+
+
+def compute_angles(coords):
+    """
+    (..., 33, >=2) -> (..., len(ANGLE_DEFINITIONS)) joint angles in degrees [0, 360),
+    measured at the center joint from the first joint to the second.
+    """
+    a = coords[..., _ANGLE_IDX[:, 0], :2]
+    b = coords[..., _ANGLE_IDX[:, 1], :2]
+    c = coords[..., _ANGLE_IDX[:, 2], :2]
+    v1 = a - b
+    v2 = c - b
+    angle = np.degrees(np.arctan2(v2[..., 1], v2[..., 0]) - np.arctan2(v1[..., 1], v1[..., 0]))
+    return np.where(angle < 0, angle + 360, angle)
+
+
+def assemble_features(coords):
+    """
+    (..., 33, 3) normalized coordinates -> (..., NUM_FEATURES) in FEATURE_COLUMNS order.
+    """
+    sel = coords[..., _FEATURE_IDX, :]
+    # x block, y block, z block (axis-major, like the flattened pivot columns)
+    coord_feats = np.moveaxis(sel, -1, -2).reshape(sel.shape[:-2] + (-1,))
+    mid_hip = (coords[..., _L_HIP, :2] + coords[..., _R_HIP, :2]) / 2.0
+    angles = compute_angles(coords)
+    return np.concatenate([coord_feats, mid_hip, angles], axis=-1)
+
+
+def engineer_sequence(landmarks, ref_index=MIDSWING_FRAME_NO - 1):
+    """
+    Feature engineering for sequences.
+
+    landmarks: (..., frames, 33, C) raw MediaPipe landmarks
+    ref_index: frame position used for the scale; int or array of shape (...)
+               (one per sequence). Out-of-range indices fall back to frame 0.
+    Returns (..., frames, NUM_FEATURES).
+    """
+    landmarks = np.asarray(landmarks)
+    num_frames = landmarks.shape[-3]
+    ref_index = np.asarray(ref_index)
+    ref_index = np.where((ref_index >= 0) & (ref_index < num_frames), ref_index, 0)
+
+    scale_per_frame = shoulder_scale(landmarks)  # (..., frames)
+    ref_scale = np.take_along_axis(
+        scale_per_frame,
+        np.broadcast_to(ref_index, scale_per_frame.shape[:-1])[..., None],
+        axis=-1
+    )  # (..., 1)
+    coords = normalize_landmarks(landmarks, ref_scale)
+    return assemble_features(coords)
+
+
+def engineer_frames(landmarks):
+    """
+    Feature engineering for independent frames (single-frame model):
+    every frame is its own reference frame.
+
+    landmarks: (..., 33, C) -> (..., NUM_FEATURES)
+    """
+    landmarks = np.asarray(landmarks)
+    coords = normalize_landmarks(landmarks, shoulder_scale(landmarks))
+    return assemble_features(coords)
+
+
+def rows_to_landmarks(frame_pos, landmark_names, values, num_frames, dtype=np.float32):
+    """
+    Scatters long-format pose rows (one row per frame/landmark) into a dense tensor.
+
+    frame_pos: (rows,) integer frame position in [0, num_frames)
+    landmark_names: (rows,) MediaPipe landmark names
+    values: (rows, C) landmark channels, C <= 4 (x, y, z, visibility)
+    Returns (num_frames, 33, 4) of 'dtype'; missing entries are NaN.
+    Duplicate (frame, landmark) rows keep the last value.
+    """
+    out = empty_landmarks((num_frames,), dtype=dtype)
+    lm_idx = landmark_indices(landmark_names)
+    values = np.asarray(values, dtype=dtype)
+    keep = lm_idx >= 0
+    out[np.asarray(frame_pos)[keep], lm_idx[keep], :values.shape[1]] = values[keep]
+    return out
+
+
+def rows_to_sequences(kick_ids, frame_nos, landmark_names, values, num_frames=None, dtype=np.float32):
+    """
+    Scatters long-format pose rows of many kicks into one dense tensor in a single pass
+    (no per-kick filtering or pivoting).
+
+    Frames of each kick are ordered by frame_no and packed from position 0; frame_nos
+    without any pose rows are skipped, exactly like a per-kick pivot would.
+
+    kick_ids, frame_nos, landmark_names: (rows,)
+    values: (rows, C) landmark channels, C <= 4
+    num_frames: length of the frame axis (default: longest kick); longer kicks are truncated
+    Returns (kick_ids, frame_nos, lengths, landmarks):
+      kick_ids: (kicks,) sorted unique kick ids
+      frame_nos: (kicks, num_frames) frame_no at each position, -1 for padding
+      lengths: (kicks,) number of frames with pose data (before truncation)
+      landmarks: (kicks, num_frames, 33, 4) of 'dtype'; NaN for padding / missing landmarks
+    """
+    kick_u, kick_pos = np.unique(np.asarray(kick_ids), return_inverse=True)
+    kick_pos = kick_pos.reshape(-1)
+    frame_nos = np.asarray(frame_nos, dtype=np.int64)
+
+    # One int64 key per (kick, frame_no) pair; sorting it orders by kick, then frame_no
+    fmin = int(frame_nos.min()) if len(frame_nos) else 0
+    span = int(frame_nos.max()) - fmin + 1 if len(frame_nos) else 1
+    pair_keys, pair_pos = np.unique(kick_pos * span + (frame_nos - fmin), return_inverse=True)
+    pair_pos = pair_pos.reshape(-1)
+    pairs = np.stack([pair_keys // span, pair_keys % span + fmin], axis=1)
+
+    # Rank of each (kick, frame_no) pair within its kick
+    lengths = np.bincount(pairs[:, 0], minlength=len(kick_u))
+    starts = np.cumsum(lengths) - lengths
+    rank = np.arange(len(pairs)) - starts[pairs[:, 0]]
+
+    if num_frames is None:
+        num_frames = int(lengths.max()) if len(lengths) else 0
+
+    frame_grid = np.full((len(kick_u), num_frames), -1, dtype=np.int64)
+    keep_pair = rank < num_frames
+    frame_grid[pairs[keep_pair, 0], rank[keep_pair]] = pairs[keep_pair, 1]
+
+    out = empty_landmarks((len(kick_u), num_frames), dtype=dtype)
+    lm_idx = landmark_indices(landmark_names)
+    values = np.asarray(values, dtype=dtype)
+    row_rank = rank[pair_pos]
+    keep = (lm_idx >= 0) & (row_rank < num_frames)
+    out[kick_pos[keep], row_rank[keep], lm_idx[keep], :values.shape[1]] = values[keep]
+    return kick_u, frame_grid, lengths, out
+
+
+def pad_or_truncate(features, length=SEQUENCE_LENGTH):
+    """
+    Zero-pads or truncates the frame axis of a (frames, F) array to 'length' frames.
+    """
+    num_frames = features.shape[0]
+    if num_frames < length:
+        pad = np.zeros((length - num_frames,) + features.shape[1:], dtype=features.dtype)
+        return np.concatenate([features, pad], axis=0)
+    return features[:length]
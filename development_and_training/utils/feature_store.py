@@ -0,0 +1,141 @@
+"""
+feature_store.py
+
+Incremental cache of engineered features, one entry per kick and feature set
+('sequence', 'single_frame'), in data/processed/feature_store.db.
+
+Each entry is stored with a fingerprint of everything its features depend on:
+  - the kick's raw landmarks and frame numbers
+  - the feature set's normalization parameters (reference frame, columns, ...)
+  - the feature code version (a hash of utils/feature_library.py)
+The preprocessing scripts only engineer kicks whose fingerprint is new or has
+changed, and assemble the training sets from the cached arrays otherwise.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # development_and_training base directory
+FEATURE_STORE_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'feature_store.db')
+FEATURE_LIBRARY_PATH = os.path.join(BASE_DIR, 'utils', 'feature_library.py')
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS kick_features (
+        feature_set TEXT NOT NULL,
+        kick_id INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        num_frames INTEGER NOT NULL,
+        features BLOB NOT NULL,
+        PRIMARY KEY (feature_set, kick_id)
+    )
+"""
+
+_SQLITE_MAX_PARAMS = 500  # stay well below SQLITE_MAX_VARIABLE_NUMBER
+
+
+def feature_code_version():
+    """
+    Hash of the feature library source; any edit to it invalidates every entry.
+    """
+    with open(FEATURE_LIBRARY_PATH, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class FeatureStore:
+    """
+    Per-kick feature cache for one feature set.
+
+    params: JSON-serializable normalization parameters of the feature set; they are
+    hashed into every fingerprint together with feature_code_version().
+    Features are stored as float64 (frames, features) arrays, exactly as engineered.
+    """
+
+    def __init__(self, feature_set, params, path=FEATURE_STORE_PATH):
+        self.feature_set = feature_set
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60)  # shared by --workers processes
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+        self._prefix = hashlib.sha256(json.dumps({
+            "feature_set": feature_set,
+            "params": params,
+            "code_version": feature_code_version(),
+        }, sort_keys=True).encode()).digest()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprints(self, frame_nos, landmarks, lengths):
+        """
+        frame_nos: (kicks, frames), landmarks: (kicks, frames, 33, 4), lengths: (kicks,)
+        Returns one hex digest per kick over its first 'lengths' frames.
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        frame_nos = np.asarray(frame_nos, dtype=np.int64)
+        out = []
+        for k in range(len(landmarks)):
+            n = min(int(lengths[k]), landmarks.shape[1])
+            h = hashlib.sha256(self._prefix)
+            h.update(np.ascontiguousarray(frame_nos[k, :n]).tobytes())
+            h.update(np.ascontiguousarray(landmarks[k, :n]).tobytes())
+            out.append(h.hexdigest())
+        return np.array(out, dtype=object)
+
+    def load(self, kick_ids, fingerprints):
+        """
+        Returns {kick_id: (frames, features) array} for the kicks whose stored
+        fingerprint matches; everything else has to be (re)computed.
+        """
+        wanted = dict(zip((int(k) for k in kick_ids), fingerprints))
+        ids = list(wanted)
+        cached = {}
+        for start in range(0, len(ids), _SQLITE_MAX_PARAMS):
+            chunk = ids[start:start + _SQLITE_MAX_PARAMS]
+            rows = self.conn.execute(f"""
+                SELECT kick_id, fingerprint, num_frames, features FROM kick_features
+                WHERE feature_set = ? AND kick_id IN ({",".join(["?"] * len(chunk))})
+            """, [self.feature_set] + chunk).fetchall()
+            for kick_id, fingerprint, num_frames, blob in rows:
+                if fingerprint == wanted[kick_id]:
+                    cached[kick_id] = np.frombuffer(blob, dtype=np.float64).reshape(num_frames, -1)
+        self.hits += len(cached)
+        self.misses += len(ids) - len(cached)
+        return cached
+
+    def save(self, kick_ids, fingerprints, features):
+        """
+        Stores freshly engineered features; features[i] is a (frames, features) array.
+        """
+        rows = []
+        for kick_id, fingerprint, f in zip(kick_ids, fingerprints, features):
+            f = np.ascontiguousarray(f, dtype=np.float64)
+            rows.append((self.feature_set, int(kick_id), fingerprint, f.shape[0], f.tobytes()))
+        self.conn.executemany("""
+            INSERT OR REPLACE INTO kick_features (feature_set, kick_id, fingerprint, num_frames, features)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        self.conn.commit()
+
+    def prune(self, kick_ids):
+        """
+        Drops entries of kicks that are no longer in the database.
+        Returns the number of entries removed.
+        """
+        keep = {int(k) for k in kick_ids}
+        stored = [r[0] for r in self.conn.execute(
+            "SELECT kick_id FROM kick_features WHERE feature_set = ?", (self.feature_set,))]
+        gone = [(self.feature_set, k) for k in stored if k not in keep]
+        self.conn.executemany("DELETE FROM kick_features WHERE feature_set = ? AND kick_id = ?", gone)
+        self.conn.commit()
+        return len(gone)
+
+    def clear(self):
+        self.conn.execute("DELETE FROM kick_features WHERE feature_set = ?", (self.feature_set,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -2,6 +2,10 @@ import sys
 import os
 import numpy as np
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sequence_dataset import is_sharded_dataset, ShardedDataset
+
 def print_npz_info(X_seq, y_seq):
     print("=== NPZ File Info ===")
     print(f"X_seq shape: {X_seq.shape} (samples, frames, features)")
@@ -16,9 +20,23 @@ def print_npz_info(X_seq, y_seq):
     for label, count in zip(unique_labels, counts):
         print(f"  Label {label}: {count} samples")
 
+def print_dataset_info(dataset):
+    # Everything comes from manifest.json; no shard is read
+    manifest = dataset.manifest
+    print("=== Sharded Dataset Info ===")
+    print(f"Shape: {dataset.shape} (samples, frames, features)")
+    print(f"dtype: {manifest['dtype']}, format version: {manifest['format_version']}")
+    print(f"Shards: {len(dataset.shards)}")
+    print(f"Number of samples: {len(dataset)}")
+    print(f"Number of frames per sample: {dataset.num_frames}")
+    print(f"Number of features per frame: {dataset.num_features}")
+    print("Label distribution:")
+    for label, count in sorted(dataset.label_counts.items()):
+        print(f"  Label {label}: {count} samples")
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python inspect_npz_info.py <path_to_npz>")
+        print("Usage: python inspect_npz_info.py <path_to_npz_or_dataset_dir>")
         sys.exit(1)
 
     npz_path = sys.argv[1]
@@ -26,6 +44,10 @@ if __name__ == "__main__":
         print(f"File not found: {npz_path}")
         sys.exit(1)
 
+    if is_sharded_dataset(npz_path):
+        print_dataset_info(ShardedDataset(npz_path))
+        sys.exit(0)
+
     data = np.load(npz_path)
     X_seq = data.get('X_seq')
     y_seq = data.get('y_seq')
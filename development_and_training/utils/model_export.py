@@ -0,0 +1,201 @@
+"""
+model_export.py
+
+Runtime-specific exports of the sequence LSTM (LSTM -> Dropout -> Dense), written
+next to sequence_model.h5 for the web backend's inference backends:
+
+  export_onnx():   ONNX graph (native ONNX LSTM op) built straight from the .h5
+                   weights with the 'onnx' package; TensorFlow is not needed.
+  export_tflite(): TFLite flatbuffer via tf.lite.TFLiteConverter (needs TensorFlow).
+
+export_serving_models() writes every format whose converter is installed.
+
+Like the NumPy export (numpy_lstm.py), both take raw features: the StandardScaler
+is folded into the LSTM's input kernel and bias, so serving loads one artifact.
+The int8 variants (QUANTIZED_FILENAMES) store the kernels as int8 and keep the
+scaler as a separate normalization step; see scripts/training/quantize_sequence_model.py.
+"""
+
+import numpy as np
+
+from utils.numpy_lstm import _sequence_layers, export_sequence_model, file_sha256, fold_scaler, quantize_per_channel
+
+ONNX_OPSET = 17
+ONNX_IR_VERSION = 8  # IR version of opset 17; newer onnx packages default to IRs older runtimes reject
+ONNX_INPUT_NAME = "features"
+ONNX_OUTPUT_NAME = "probs"
+
+# Serving artifacts, written next to sequence_model.h5
+EXPORT_FILENAMES = {
+    "numpy": "sequence_model_numpy.npz",
+    "onnx": "sequence_model.onnx",
+    "tflite": "sequence_model.tflite",
+}
+# int8-weight exports, written and checked by scripts/training/quantize_sequence_model.py
+QUANTIZED_FILENAMES = {
+    "numpy_int8": "sequence_model_numpy_int8.npz",
+    "onnx_int8": "sequence_model_int8.onnx",
+}
+
+
+def _keras_to_onnx_gates(w, units):
+    # Keras stacks the gates as i, f, c, o along the last axis; ONNX expects i, o, f, c
+    i, f, c, o = (w[..., k * units:(k + 1) * units] for k in range(4))
+    return np.concatenate([i, o, f, c], axis=-1)
+
+
+def export_onnx(h5_path, scaler, out_path, num_frames=21, int8_weights=False):
+    """
+    Writes 'h5_path' (with 'scaler' folded in) as an ONNX model taking
+    'features' (batch, num_frames, features) float32 and returning 'probs' (batch, classes).
+    With int8_weights=True the LSTM and Dense kernels are int8 initializers with one scale
+    per output column (DequantizeLinear), and the scaler stays a Sub / Div on the input
+    instead of being folded into the quantized kernel (see numpy_lstm.export_sequence_model).
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    lstm_cfg, lstm_w, dense_cfg, dense_w = _sequence_layers(h5_path)
+    if (lstm_cfg['activation'], lstm_cfg['recurrent_activation'], dense_cfg['activation']) != ('tanh', 'sigmoid', 'softmax'):
+        raise ValueError("ONNX export supports tanh / sigmoid LSTM activations and a softmax Dense layer")
+
+    units = lstm_cfg['units']
+    kernel, bias = lstm_w[0].astype(np.float32), lstm_w[2].astype(np.float32)
+    if not int8_weights:
+        kernel, bias = fold_scaler(kernel, bias, scaler.mean_, scaler.scale_)
+    num_features = kernel.shape[0]
+
+    # (inputs, outputs) matrices in ONNX gate order. The LSTM takes W: (1, 4H, F), R: (1, 4H, H)
+    # and B: (1, 8H) = input bias + recurrent bias (zeros in Keras)
+    weights = {
+        "lstm_W": _keras_to_onnx_gates(kernel, units),
+        "lstm_R": _keras_to_onnx_gates(lstm_w[1].astype(np.float32), units),
+        "dense_kernel": dense_w[0].astype(np.float32),
+    }
+    initializers = [
+        numpy_helper.from_array(np.concatenate([_keras_to_onnx_gates(bias, units),
+                                                np.zeros(4 * units, dtype=np.float32)])[np.newaxis], "lstm_B"),
+        numpy_helper.from_array(np.array([-1, units], dtype=np.int64), "h_shape"),
+        numpy_helper.from_array(dense_w[1].astype(np.float32), "dense_bias"),
+    ]
+    nodes = []
+    input_name = ONNX_INPUT_NAME
+    for name, w in weights.items():
+        onnx_layout = (lambda a: a.T[np.newaxis]) if name.startswith("lstm_") else (lambda a: a)
+        if not int8_weights:
+            initializers.append(numpy_helper.from_array(onnx_layout(w), name))
+            continue
+        # Output channels end up on axis 1 in both layouts
+        q, scale = quantize_per_channel(w)
+        initializers += [numpy_helper.from_array(onnx_layout(q), f"{name}_int8"),
+                         numpy_helper.from_array(scale, f"{name}_scale")]
+        nodes.append(helper.make_node("DequantizeLinear", [f"{name}_int8", f"{name}_scale"], [name], axis=1))
+    if int8_weights:
+        initializers += [numpy_helper.from_array(np.asarray(scaler.mean_, dtype=np.float32), "scaler_mean"),
+                         numpy_helper.from_array(np.asarray(scaler.scale_, dtype=np.float32), "scaler_scale")]
+        nodes += [helper.make_node("Sub", [ONNX_INPUT_NAME, "scaler_mean"], ["features_centered"]),
+                  helper.make_node("Div", ["features_centered", "scaler_scale"], ["features_scaled"])]
+        input_name = "features_scaled"
+
+    nodes += [
+        # ONNX Runtime only implements the sequence-major layout: X (seq, batch, F), Y_h (1, batch, H)
+        helper.make_node("Transpose", [input_name], ["features_tbf"], perm=[1, 0, 2]),
+        helper.make_node("LSTM", ["features_tbf", "lstm_W", "lstm_R", "lstm_B"], ["", "lstm_h"],
+                         hidden_size=units),
+        helper.make_node("Reshape", ["lstm_h", "h_shape"], ["h"]),
+        # Dropout is the identity at inference time
+        helper.make_node("MatMul", ["h", "dense_kernel"], ["logits_nobias"]),
+        helper.make_node("Add", ["logits_nobias", "dense_bias"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], [ONNX_OUTPUT_NAME], axis=-1),
+    ]
+    graph = helper.make_graph(
+        nodes, "sequence_lstm",
+        [helper.make_tensor_value_info(ONNX_INPUT_NAME, TensorProto.FLOAT, ["batch", num_frames, num_features])],
+        [helper.make_tensor_value_info(ONNX_OUTPUT_NAME, TensorProto.FLOAT, ["batch", int(dense_w[0].shape[1])])],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", ONNX_OPSET)],
+                              ir_version=ONNX_IR_VERSION, producer_name="penalty-kick-prediction")
+    helper.set_model_props(model, {
+        "source_sha256": file_sha256(h5_path),
+        "scaler_folded": "false" if int8_weights else "true",
+        "weights_dtype": "int8" if int8_weights else "float32",
+    })
+    onnx.checker.check_model(model)
+    onnx.save(model, out_path)
+
+
+def load_folded_keras_model(h5_path, scaler):
+    """
+    The Keras model from 'h5_path' with 'scaler' folded into its LSTM layer (needs TensorFlow).
+    """
+    from tensorflow.keras.models import load_model
+
+    model = load_model(h5_path)
+    lstm = next(layer for layer in model.layers if type(layer).__name__ == 'LSTM')
+    kernel, recurrent_kernel, bias = lstm.get_weights()
+    kernel, bias = fold_scaler(kernel, bias, scaler.mean_, scaler.scale_)
+    lstm.set_weights([kernel, recurrent_kernel, bias])
+    return model
+
+
+def export_tflite(h5_path, scaler, out_path, num_frames=21, optimizations=None, representative_dataset=None):
+    """
+    Writes 'h5_path' (with 'scaler' folded in) as a TFLite model with a fixed
+    (1, num_frames, features) float32 input, i.e. one sequence per invoke(). Needs TensorFlow.
+    """
+    import tempfile
+    import tensorflow as tf
+
+    model = load_folded_keras_model(h5_path, scaler)
+    num_features = model.inputs[0].shape[-1]
+
+    # Static input shape: the converter cannot lower the Keras LSTM loop with a dynamic batch
+    input_spec = tf.TensorSpec([1, num_frames, num_features], tf.float32)
+
+    # Go through a SavedModel so the weights are frozen into constants
+    # (converting a traced function directly keeps them as resource variables)
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        try:
+            model.export(saved_model_dir, input_signature=[input_spec])  # Keras 3
+        except TypeError:
+            # tf.keras 2.x: Model.export() has no input_signature
+            serve = tf.function(lambda features: model(features, training=False), input_signature=[input_spec])
+            tf.saved_model.save(model, saved_model_dir, signatures=serve.get_concrete_function())
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        if optimizations:
+            converter.optimizations = optimizations
+        if representative_dataset is not None:
+            converter.representative_dataset = representative_dataset
+        tflite_model = converter.convert()
+    with open(out_path, 'wb') as f:
+        f.write(tflite_model)
+
+
+def export_serving_models(h5_path, scaler, models_dir, formats=("numpy", "onnx", "tflite")):
+    """
+    Writes the requested formats (EXPORT_FILENAMES or QUANTIZED_FILENAMES keys) next to
+    the .h5. A format whose converter is not installed ('onnx' package, TensorFlow) is skipped.
+    Returns {format: path} of the files written.
+    """
+    import os
+    from functools import partial
+
+    exporters = {
+        "numpy": export_sequence_model,
+        "onnx": export_onnx,
+        "tflite": export_tflite,
+        "numpy_int8": partial(export_sequence_model, int8_weights=True),
+        "onnx_int8": partial(export_onnx, int8_weights=True),
+    }
+    filenames = {**EXPORT_FILENAMES, **QUANTIZED_FILENAMES}
+    written = {}
+    for fmt in formats:
+        path = os.path.join(models_dir, filenames[fmt])
+        try:
+            exporters[fmt](h5_path, scaler, path)
+        except ImportError as e:
+            print(f"Skipping {fmt} export ({e.name} is not installed)")
+            continue
+        written[fmt] = path
+    return written
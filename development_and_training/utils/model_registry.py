@@ -0,0 +1,123 @@
+"""
+model_registry.py
+
+Versioned model registry on the local filesystem, shared by the training scripts
+(which publish) and the web backend (which serves the active version):
+
+    <root>/<model_name>/
+        ACTIVE                      name of the active version (one line)
+        <version>/manifest.json     version, created_at, files, metadata
+        <version>/<artifacts>       e.g. sequence_model.h5, sequence_scaler.pkl, exports
+
+Both steps are atomic, so a reader never sees a half-written version:
+  publish():  copies the files into a hidden temp directory, then renames it into place
+  activate(): writes ACTIVE.tmp, then os.replace()s it over ACTIVE
+
+Versions are immutable once published; rolling back is activate(<older version>).
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+MANIFEST_FILENAME = "manifest.json"
+ACTIVE_FILENAME = "ACTIVE"
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, root, model_name):
+        self.root = root
+        self.model_name = model_name
+        self.model_dir = os.path.join(root, model_name)
+
+    def version_dir(self, version):
+        return os.path.join(self.model_dir, version)
+
+    def active_version(self):
+        """
+        The active version, or None if nothing was activated yet.
+        """
+        try:
+            with open(os.path.join(self.model_dir, ACTIVE_FILENAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILENAME)) as f:
+            return json.load(f)
+
+    def versions(self):
+        """
+        Manifests of all published versions, oldest first.
+        """
+        if not os.path.isdir(self.model_dir):
+            return []
+        manifests = []
+        for name in os.listdir(self.model_dir):
+            if name.startswith('.') or not os.path.isfile(os.path.join(self.model_dir, name, MANIFEST_FILENAME)):
+                continue
+            manifests.append(self.manifest(name))
+        return sorted(manifests, key=lambda m: (m['created_at'], m['version']))
+
+    def publish(self, files, version=None, metadata=None, activate=True):
+        """
+        Copies 'files' ({artifact filename: source path}) into a new version and returns its name.
+        The default version name is the UTC time plus the first bytes of the artifacts' hash.
+        """
+        digests = {filename: _file_sha256(path) for filename, path in files.items()}
+        if version is None:
+            combined = hashlib.sha256("".join(digests[k] for k in sorted(digests)).encode()).hexdigest()
+            version = time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + combined[:8]
+        final_dir = self.version_dir(version)
+        if os.path.exists(final_dir):
+            raise FileExistsError(f"{self.model_name} version {version} already exists")
+
+        # 1. Copy + manifest into a hidden directory, 2. rename it into place in one step
+        os.makedirs(self.model_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.model_dir, f".tmp-{version}-{os.getpid()}")
+        os.makedirs(tmp_dir)
+        try:
+            for filename, path in files.items():
+                shutil.copy2(path, os.path.join(tmp_dir, filename))
+            manifest = {
+                "model_name": self.model_name,
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "files": {filename: {"sha256": digests[filename], "bytes": os.path.getsize(path)}
+                          for filename, path in files.items()},
+                "metadata": metadata or {},
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(tmp_dir, final_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """
+        Atomically points ACTIVE at 'version'; serving workers pick it up on their next poll.
+        """
+        if not os.path.isfile(os.path.join(self.version_dir(version), MANIFEST_FILENAME)):
+            raise FileNotFoundError(f"{self.model_name} version {version} is not published")
+        tmp_path = os.path.join(self.model_dir, f"{ACTIVE_FILENAME}.tmp-{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.model_dir, ACTIVE_FILENAME))
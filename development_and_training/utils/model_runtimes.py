@@ -0,0 +1,76 @@
+"""
+model_runtimes.py
+
+Runners for the serving exports written by model_export.py. Each one has the
+same interface as numpy_lstm.NumpyLSTMModel:
+
+    predict(X) -> (batch, num_classes) probabilities for raw (batch, frames, features) input
+
+The runtimes are optional dependencies and only imported when a runner is built:
+  OnnxSequenceModel:   onnxruntime
+  TFLiteSequenceModel: ai-edge-litert, tflite-runtime or TensorFlow (first one installed)
+The int8-weight exports load with the same runners (the NumPy one dequantizes at load).
+"""
+
+import threading
+import numpy as np
+
+from utils.numpy_lstm import NumpyLSTMModel
+
+
+class OnnxSequenceModel:
+    def __init__(self, export_path, intra_op_threads=1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # Requests are batched by the caller; one thread per run avoids oversubscribing small boxes
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(export_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, X):
+        return self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[0]
+
+
+def _tflite_interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+class TFLiteSequenceModel:
+    """
+    The TFLite export has a fixed batch of 1, so predict() invokes once per sequence.
+    """
+
+    def __init__(self, export_path, num_threads=1):
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=export_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self._lock = threading.Lock()  # an interpreter is not thread-safe
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        out = []
+        with self._lock:
+            for x in X:
+                self.interpreter.set_tensor(self.input_index, x[np.newaxis])
+                self.interpreter.invoke()
+                out.append(self.interpreter.get_tensor(self.output_index)[0].copy())
+        return np.stack(out)
+
+
+RUNTIMES = {
+    "numpy": NumpyLSTMModel,
+    "onnx": OnnxSequenceModel,
+    "tflite": TFLiteSequenceModel,
+    "numpy_int8": NumpyLSTMModel,
+    "onnx_int8": OnnxSequenceModel,
+}
@@ -0,0 +1,118 @@
+"""
+numpy_forest.py
+
+NumPy-only inference for the single-frame RandomForestClassifier trained by
+scripts/training/train_model_single_frame.py (on StandardScaler-ed features).
+
+export_forest() compiles the fitted forest into flat node arrays, every tree
+concatenated into one table:
+
+    feature[n], threshold[n]   split of node n (x[feature] <= threshold goes left)
+    left[n], right[n]          absolute index of its children; a leaf points to itself
+    value[n]                   class distribution at node n (rows sum to 1)
+    roots[t]                   index of tree t's root
+
+The scaler is folded into the thresholds (x_scaled <= t  <=>  x <= t * scale + mean,
+scale > 0), so NumpyForestModel takes the raw engineered features. predict_proba()
+walks all trees for the whole batch at once, one vectorized step per tree level,
+and averages the leaf distributions like sklearn's predict_proba.
+"""
+
+import json
+import numpy as np
+
+FOREST_FORMAT_VERSION = 1
+
+
+def compile_forest(model, scaler=None):
+    """
+    Flat node arrays (see the module docstring) of a fitted sklearn forest of
+    DecisionTreeClassifiers, with 'scaler' (a fitted StandardScaler or None) folded in.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own_index = np.arange(n) + offset
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = tree.threshold.astype(np.float64)
+        if scaler is not None:
+            threshold = threshold * scaler.scale_[feature] + scaler.mean_[feature]
+        value = tree.value[:, 0, :].astype(np.float64)
+        # Older sklearn versions store class counts, newer ones fractions
+        value = value / value.sum(axis=1, keepdims=True)
+
+        features.append(feature.astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, threshold))
+        lefts.append(np.where(is_leaf, own_index, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, own_index, tree.children_right + offset).astype(np.int32))
+        values.append(value.astype(np.float32))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "classes": np.asarray(model.classes_),
+        "max_depth": max_depth,
+    }
+
+
+def export_forest(model, scaler, out_path, feature_names=None):
+    """
+    Writes compile_forest(model, scaler) to 'out_path' (.npz). Returns the meta dict.
+    """
+    arrays = compile_forest(model, scaler)
+    meta = {
+        "format_version": FOREST_FORMAT_VERSION,
+        "num_trees": int(len(arrays["roots"])),
+        "num_nodes": int(len(arrays["feature"])),
+        "max_depth": int(arrays.pop("max_depth")),
+        "num_features": int(model.n_features_in_),
+        "classes": [c.item() if hasattr(c, 'item') else c for c in arrays["classes"]],
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "scaler_folded": scaler is not None,
+    }
+    np.savez(out_path, meta=np.array(json.dumps(meta)), **arrays)
+    return meta
+
+
+class NumpyForestModel:
+    """
+    Forward pass of an export_forest() file.
+    predict_proba(X) takes raw (batch, features) input and returns (batch, num_classes)
+    probabilities in the order of self.classes, like model.predict_proba(scaler.transform(X)).
+    """
+
+    def __init__(self, export_path):
+        with np.load(export_path) as data:
+            self.meta = json.loads(str(data['meta']))
+            self.feature = data['feature']
+            self.threshold = data['threshold']
+            self.left = data['left']
+            self.right = data['right']
+            self.value = data['value']
+            self.roots = data['roots']
+            self.classes = data['classes']
+        if self.meta['format_version'] != FOREST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version {self.meta['format_version']}")
+        self.max_depth = self.meta['max_depth']
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        rows = np.arange(len(X))[:, np.newaxis]
+        # (batch, trees) current node of every tree; leaves loop onto themselves
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=1)
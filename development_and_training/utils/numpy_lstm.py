@@ -0,0 +1,238 @@
+"""
+numpy_lstm.py
+
+NumPy-only inference for the sequence model built by
+scripts/training/train_model_sequence.build_lstm_model:
+
+    Input(21, 48) -> LSTM(64) -> Dropout -> Dense(num_classes, softmax)
+
+export_sequence_model() reads the weights straight from the Keras .h5 with h5py
+(no TensorFlow needed) and writes them to one .npz, with the StandardScaler
+folded into the LSTM's input kernel and bias (see fold_scaler). NumpyLSTMModel
+loads that file and reproduces model.predict(scaler.transform(X)) in a single
+pass over the raw features, so the web backend can serve predictions without
+TensorFlow, sklearn or the scaler .pkl.
+
+With int8_weights=True the kernels are stored as int8 with one float32 scale per
+output column (quantize_per_channel) and dequantized at load: a quarter of the
+size on disk, float32 arithmetic at inference.
+"""
+
+import json
+import hashlib
+import numpy as np
+
+EXPORT_FORMAT_VERSION = 1
+
+_ACTIVATIONS = {
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "hard_sigmoid": lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+}
+
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_keras_h5(h5_path):
+    """
+    Layer configs and weights of a Sequential model saved with model.save('*.h5').
+    Returns [(class_name, config, [weight arrays in Keras order]), ...] without the InputLayer.
+    """
+    import h5py
+
+    layers = []
+    with h5py.File(h5_path, 'r') as f:
+        model_config = json.loads(f.attrs['model_config'])
+        weights_group = f['model_weights']
+        for layer in model_config['config']['layers']:
+            if layer['class_name'] == 'InputLayer':
+                continue
+            name = layer['config']['name']
+            group = weights_group[name]
+            weight_names = [n.decode() if isinstance(n, bytes) else n for n in group.attrs['weight_names']]
+            # Keras 2 stores names as '<path>:0'; both versions store the dataset at group[<path>]
+            weights = [np.array(group[n]) for n in weight_names]
+            layers.append((layer['class_name'], layer['config'], weights))
+    return layers
+
+
+def fold_scaler(kernel, bias, mean, scale):
+    """
+    Folds x_scaled = (x - mean) / scale into a layer's input projection:
+        x_scaled @ W + b == x @ (W / scale[:, None]) + (b - (mean / scale) @ W)
+    Returns (kernel, bias) in the dtype of 'kernel' / 'bias'.
+    """
+    kernel64 = np.asarray(kernel, dtype=np.float64)
+    folded_kernel = kernel64 / np.asarray(scale, dtype=np.float64)[:, None]
+    folded_bias = np.asarray(bias, dtype=np.float64) - (np.asarray(mean) / np.asarray(scale)) @ kernel64
+    return folded_kernel.astype(kernel.dtype), folded_bias.astype(bias.dtype)
+
+
+def quantize_per_channel(w):
+    """
+    Symmetric int8 quantization of a (inputs, outputs) weight matrix with one scale per
+    output column: w ~= q * scale, q in [-127, 127].
+    Returns (q int8, scale float32 of shape (outputs,)).
+    """
+    w = np.asarray(w, dtype=np.float32)
+    scale = np.abs(w).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.round(w / scale), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def dequantize(q, scale):
+    return q.astype(np.float32) * scale
+
+
+def _sequence_layers(h5_path):
+    """
+    (lstm_config, lstm_weights, dense_config, dense_weights) of a build_lstm_model .h5.
+    """
+    layers = read_keras_h5(h5_path)
+    kinds = [kind for kind, _, _ in layers]
+    if [k for k in kinds if k != 'Dropout'] != ['LSTM', 'Dense']:
+        raise ValueError(f"Unsupported architecture for the NumPy engine: {kinds}")
+
+    (_, lstm_cfg, lstm_w), = [l for l in layers if l[0] == 'LSTM']
+    (_, dense_cfg, dense_w), = [l for l in layers if l[0] == 'Dense']
+    if lstm_cfg.get('return_sequences') or lstm_cfg.get('go_backwards') or not lstm_cfg.get('use_bias', True):
+        raise ValueError("Only a single forward LSTM returning its last state (with bias) is supported")
+    return lstm_cfg, lstm_w, dense_cfg, dense_w
+
+
+def lstm_forward(X, kernel, recurrent_kernel, bias, activation, recurrent_activation):
+    """
+    Last hidden state of a Keras LSTM (gate order i, f, c, o) over X: (batch, frames, features).
+    """
+    b, t, _ = X.shape
+    u = recurrent_kernel.shape[0]
+
+    # Input projection for all time steps at once: (b, t, 4u)
+    xw = X @ kernel + bias
+    h = np.zeros((b, u), dtype=xw.dtype)
+    c = np.zeros((b, u), dtype=xw.dtype)
+    for step in range(t):
+        z = xw[:, step] + h @ recurrent_kernel
+        i = recurrent_activation(z[:, :u])
+        f = recurrent_activation(z[:, u:2 * u])
+        g = activation(z[:, 2 * u:3 * u])
+        o = recurrent_activation(z[:, 3 * u:])
+        c = f * c + i * g
+        h = o * activation(c)
+    return h
+
+
+def _dense_forward(h, kernel, bias, activation):
+    # Dropout is the identity at inference time
+    logits = h @ kernel + bias
+    if activation == 'softmax':
+        return softmax(logits)
+    return _ACTIVATIONS[activation](logits)
+
+
+def two_step_predict(h5_path, scaler, X):
+    """
+    Reference path the fused export must match: scaler.transform on the 2D-reshaped
+    features, then the unfolded LSTM -> Dense weights.
+    """
+    lstm_cfg, lstm_w, dense_cfg, dense_w = _sequence_layers(h5_path)
+    b, t, f = X.shape
+    X_scaled = scaler.transform(X.reshape(b * t, f)).reshape(b, t, f).astype(np.float32)
+    h = lstm_forward(X_scaled, lstm_w[0], lstm_w[1], lstm_w[2],
+                     _ACTIVATIONS[lstm_cfg['activation']], _ACTIVATIONS[lstm_cfg['recurrent_activation']])
+    return _dense_forward(h, dense_w[0], dense_w[1], dense_cfg['activation'])
+
+
+# Kernels stored as int8 + '<name>_scale' in an int8_weights export
+_QUANTIZED_WEIGHTS = ("lstm_kernel", "lstm_recurrent_kernel", "dense_kernel")
+
+
+def export_sequence_model(h5_path, scaler, out_path, int8_weights=False):
+    """
+    Writes the LSTM / Dense weights of 'h5_path', with 'scaler' folded into the LSTM's
+    input kernel and bias, to 'out_path' (.npz).
+    With int8_weights=True the kernels are quantized per output column and the scaler
+    is stored separately, to be folded in after dequantizing at load time.
+    Only the LSTM -> Dropout -> Dense architecture of build_lstm_model is supported.
+    """
+    lstm_cfg, lstm_w, dense_cfg, dense_w = _sequence_layers(h5_path)
+    arrays = {
+        "lstm_kernel": lstm_w[0].astype(np.float32),
+        "lstm_recurrent_kernel": lstm_w[1].astype(np.float32),
+        "lstm_bias": lstm_w[2].astype(np.float32),
+        "dense_kernel": dense_w[0].astype(np.float32),
+        "dense_bias": dense_w[1].astype(np.float32),
+    }
+    if int8_weights:
+        # Quantize before folding: folding divides each input row by its feature's std,
+        # so a few low-variance features would set every column's scale and crush the rest
+        for name in _QUANTIZED_WEIGHTS:
+            arrays[name], arrays[name + "_scale"] = quantize_per_channel(arrays[name])
+        arrays["scaler_mean"] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(scaler.scale_, dtype=np.float64)
+    else:
+        arrays["lstm_kernel"], arrays["lstm_bias"] = fold_scaler(arrays["lstm_kernel"], arrays["lstm_bias"],
+                                                                 scaler.mean_, scaler.scale_)
+
+    meta = {
+        "format_version": EXPORT_FORMAT_VERSION,
+        "source_sha256": file_sha256(h5_path),
+        "units": lstm_cfg['units'],
+        "activation": lstm_cfg['activation'],
+        "recurrent_activation": lstm_cfg['recurrent_activation'],
+        "dense_activation": dense_cfg['activation'],
+        "num_features": int(lstm_w[0].shape[0]),
+        "num_classes": int(dense_w[0].shape[1]),
+        "scaler_folded": not int8_weights,
+        "weights_dtype": "int8" if int8_weights else "float32",
+    }
+    np.savez(out_path, meta=np.array(json.dumps(meta)), **arrays)
+    return meta
+
+
+class NumpyLSTMModel:
+    """
+    Forward pass of an export_sequence_model() file.
+    predict(X) takes raw (unscaled) (batch, frames, features) input and returns
+    (batch, num_classes) probabilities, like model.predict(scaler.transform(X)).
+    Exports with a separate scaler (int8 weights, or made before the scaler was
+    folded in) get it folded in here, after dequantizing.
+    """
+
+    def __init__(self, export_path):
+        with np.load(export_path) as data:
+            self.meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in data.files}
+        if self.meta.get('weights_dtype') == 'int8':
+            for name in _QUANTIZED_WEIGHTS:
+                arrays[name] = dequantize(arrays[name], arrays[name + '_scale'])
+        self.kernel = arrays['lstm_kernel']
+        self.recurrent_kernel = arrays['lstm_recurrent_kernel']
+        self.bias = arrays['lstm_bias']
+        self.dense_kernel = arrays['dense_kernel']
+        self.dense_bias = arrays['dense_bias']
+        if not self.meta.get('scaler_folded', False):
+            self.kernel, self.bias = fold_scaler(self.kernel, self.bias,
+                                                 arrays['scaler_mean'], arrays['scaler_scale'])
+        if self.meta['format_version'] != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported export format version {self.meta['format_version']}")
+        self.activation = _ACTIVATIONS[self.meta['activation']]
+        self.recurrent_activation = _ACTIVATIONS[self.meta['recurrent_activation']]
+
+    def predict(self, X):
+        # Scaling happens inside the (folded) input projection: one pass over the raw features
+        X = np.asarray(X, dtype=np.float32)
+        h = lstm_forward(X, self.kernel, self.recurrent_kernel, self.bias,
+                         self.activation, self.recurrent_activation)
+        return _dense_forward(h, self.dense_kernel, self.dense_bias, self.meta['dense_activation'])
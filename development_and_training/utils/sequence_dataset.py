@@ -0,0 +1,229 @@
+"""
+sequence_dataset.py
+
+Sharded, memory-mapped on-disk format for the sequence training data
+(replaces the single training_data_sequence.npz).
+
+A dataset is a directory containing:
+  X_00000.npy, X_00001.npy, ...  float32 (samples, frames, features)
+  y_00000.npy, y_00001.npy, ...  int64 (samples,)
+  manifest.json                  shapes, feature names, label counts, shard list
+
+Shards are opened with np.load(mmap_mode='r'), so readers never load more than
+what they index, and datasets can be larger than RAM.
+"""
+
+import os
+import json
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+DEFAULT_SHARD_SIZE = 4096  # sequences per shard (~16 MB at 21 x 48 float32)
+
+
+class ShardedDatasetWriter:
+    """
+    Appends (X, y) batches and cuts them into fixed-size shards.
+    Holds at most one shard in memory. The manifest is written by close(),
+    so a dataset without manifest.json is incomplete.
+    """
+
+    def __init__(self, path, feature_names, num_frames, shard_size=DEFAULT_SHARD_SIZE):
+        self.path = path
+        self.feature_names = list(feature_names)
+        self.num_frames = int(num_frames)
+        self.shard_size = int(shard_size)
+        self.shards = []
+        self.label_counts = {}
+        self._x_parts = []
+        self._y_parts = []
+        self._buffered = 0
+
+        os.makedirs(path, exist_ok=True)
+        # Drop any previous dataset in this directory
+        for fname in os.listdir(path):
+            if fname == MANIFEST_NAME or (fname.endswith(".npy") and fname[:2] in ("X_", "y_")):
+                os.remove(os.path.join(path, fname))
+
+    def append(self, X, y):
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.int64)
+        expected = (self.num_frames, len(self.feature_names))
+        if X.shape[1:] != expected:
+            raise ValueError(f"Expected samples of shape {expected}, got {X.shape[1:]}")
+        if len(X) != len(y):
+            raise ValueError(f"X has {len(X)} samples but y has {len(y)}")
+
+        for label in y.tolist():
+            self.label_counts[label] = self.label_counts.get(label, 0) + 1
+
+        self._x_parts.append(X)
+        self._y_parts.append(y)
+        self._buffered += len(X)
+        while self._buffered >= self.shard_size:
+            self._flush(self.shard_size)
+
+    def _flush(self, count):
+        X = np.concatenate(self._x_parts, axis=0)
+        y = np.concatenate(self._y_parts, axis=0)
+        shard_no = len(self.shards)
+        x_name, y_name = f"X_{shard_no:05d}.npy", f"y_{shard_no:05d}.npy"
+        np.save(os.path.join(self.path, x_name), X[:count])
+        np.save(os.path.join(self.path, y_name), y[:count])
+        self.shards.append({"x": x_name, "y": y_name, "num_samples": int(count)})
+
+        self._x_parts = [X[count:]] if count < len(X) else []
+        self._y_parts = [y[count:]] if count < len(y) else []
+        self._buffered = len(X) - count
+
+    def close(self):
+        if self._buffered:
+            self._flush(self._buffered)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "dtype": "float32",
+            "num_samples": sum(s["num_samples"] for s in self.shards),
+            "num_frames": self.num_frames,
+            "num_features": len(self.feature_names),
+            "feature_names": self.feature_names,
+            "label_counts": {str(k): v for k, v in sorted(self.label_counts.items())},
+            "shards": self.shards,
+        }
+        tmp_path = os.path.join(self.path, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_NAME))
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+class ShardedDataset:
+    """
+    Lazy reader for a sharded dataset directory. Nothing but the manifest is read
+    up front; shards are memory-mapped on first access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.feature_names = self.manifest["feature_names"]
+        self.num_frames = self.manifest["num_frames"]
+        self.num_features = self.manifest["num_features"]
+        self.shards = self.manifest["shards"]
+        sizes = [s["num_samples"] for s in self.shards]
+        # offsets[i] = global index of the first sample in shard i
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._x = [None] * len(self.shards)
+        self._y = [None] * len(self.shards)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def shape(self):
+        return (len(self), self.num_frames, self.num_features)
+
+    @property
+    def label_counts(self):
+        return {int(k): v for k, v in self.manifest["label_counts"].items()}
+
+    def shard_x(self, i):
+        if self._x[i] is None:
+            self._x[i] = np.load(os.path.join(self.path, self.shards[i]["x"]), mmap_mode="r")
+        return self._x[i]
+
+    def shard_y(self, i):
+        if self._y[i] is None:
+            self._y[i] = np.load(os.path.join(self.path, self.shards[i]["y"]), mmap_mode="r")
+        return self._y[i]
+
+    def labels(self):
+        """
+        All labels as one in-memory int64 array (8 bytes per sample).
+        """
+        if not self.shards:
+            return np.empty((0,), dtype=np.int64)
+        return np.concatenate([self.shard_y(i) for i in range(len(self.shards))])
+
+    def take(self, indices):
+        """
+        Gathers samples by global index (any order). Returns (X, y) copies of just those rows.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        X = np.empty((len(indices), self.num_frames, self.num_features), dtype=np.float32)
+        y = np.empty((len(indices),), dtype=np.int64)
+        shard_of = np.searchsorted(self.offsets, indices, side="right") - 1
+        for i in np.unique(shard_of):
+            sel = shard_of == i
+            local = indices[sel] - self.offsets[i]
+            X[sel] = self.shard_x(i)[local]
+            y[sel] = self.shard_y(i)[local]
+        return X, y
+
+    def iter_batches(self, batch_size):
+        """
+        Yields (X, y) in storage order. Batches never span shards, so each one is
+        a zero-copy view into a memory-mapped shard.
+        """
+        for i in range(len(self.shards)):
+            X, y = self.shard_x(i), self.shard_y(i)
+            for start in range(0, len(X), batch_size):
+                yield X[start:start + batch_size], y[start:start + batch_size]
+
+
+class ArrayDataset:
+    """
+    In-memory stand-in with the ShardedDataset reading interface,
+    for legacy training_data_sequence.npz files.
+    """
+
+    def __init__(self, X, y, feature_names=None):
+        self.X = X
+        self.y = np.asarray(y).astype(np.int64)
+        self.num_frames = X.shape[1] if X.ndim == 3 else 0
+        self.num_features = X.shape[2] if X.ndim == 3 else 0
+        self.feature_names = feature_names
+
+    def __len__(self):
+        return len(self.X)
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+    @property
+    def label_counts(self):
+        labels, counts = np.unique(self.y, return_counts=True)
+        return {int(k): int(v) for k, v in zip(labels, counts)}
+
+    def labels(self):
+        return self.y
+
+    def take(self, indices):
+        return self.X[indices].astype(np.float32), self.y[indices]
+
+    def iter_batches(self, batch_size):
+        for start in range(0, len(self.X), batch_size):
+            yield self.X[start:start + batch_size], self.y[start:start + batch_size]
+
+
+def is_sharded_dataset(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def open_sequence_dataset(path):
+    """
+    Opens a sharded dataset directory lazily, or a legacy .npz (X_seq / y_seq) in memory.
+    """
+    if is_sharded_dataset(path):
+        return ShardedDataset(path)
+    data = np.load(path)
+    return ArrayDataset(data['X_seq'], data['y_seq'])
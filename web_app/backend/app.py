@@ -9,8 +9,26 @@ from routes.extract_routes import extract_bp
 from routes.pose_routes import pose_bp
 from routes.predict_routes import predict_bp
 from routes.dev_routes import dev_bp
+from routes.health_routes import health_bp
+from routes.model_routes import models_bp
+from routes.analyze_routes import analyze_bp
+from services.model_loader import start_registry_watcher, start_warmup
 
-def create_app():
+# Set PK_MODEL_WARMUP=0 to skip the background warm-up (the model then loads on the first prediction)
+PK_MODEL_WARMUP = os.environ.get("PK_MODEL_WARMUP", "1") != "0"
+
+def start_background_threads():
+    """
+    Per-process background threads. Threads do not survive fork(), so a prefork server
+    (gunicorn.conf.py) calls this in each worker instead of in create_app().
+    """
+    # Load + warm up the model in the background; /api/ready reports when it is done
+    if PK_MODEL_WARMUP:
+        start_warmup()
+    # Swap to newly activated registry versions without a restart (PK_MODEL_REGISTRY_POLL_S)
+    start_registry_watcher()
+
+def create_app(background_threads=True):
     app = Flask(__name__)
     CORS(app)
 
@@ -40,7 +58,12 @@ def create_app():
     app.register_blueprint(pose_bp, url_prefix='/api')
     app.register_blueprint(predict_bp, url_prefix='/api')
     app.register_blueprint(dev_bp, url_prefix='/api/dev')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    app.register_blueprint(models_bp, url_prefix='/api')
+    app.register_blueprint(analyze_bp, url_prefix='/api')
 
+    if background_threads:
+        start_background_threads()
 
     @app.route('/')
     def index():
@@ -49,5 +72,6 @@ def create_app():
     return app
 
 if __name__ == "__main__":
+    # Development server; for production use gunicorn.conf.py (gunicorn -c gunicorn.conf.py wsgi:app)
     application = create_app()
     application.run(debug=True, host='0.0.0.0', port=8098)
@@ -17,9 +17,25 @@ def init_db():
     schema_file = os.path.join(os.path.dirname(__file__), 'schema.sql')
     with open(schema_file, 'r') as f:
         sql_script = f.read()
+    drop_stale_engineered_table(conn, sql_script)
     conn.executescript(sql_script)
     conn.close()
 
+def drop_stale_engineered_table(conn, sql_script):
+    """
+    engineered_features only holds derived data. If its columns no longer match
+    schema.sql (the feature schema changed), drop it so the script recreates it.
+    """
+    ref = sqlite3.connect(":memory:")
+    ref.executescript(sql_script)
+    expected = [r[1] for r in ref.execute("PRAGMA table_info(engineered_features)")]
+    ref.close()
+
+    current = [r[1] for r in conn.execute("PRAGMA table_info(engineered_features)")]
+    if current and current != expected:
+        conn.execute("DROP TABLE engineered_features")
+        conn.commit()
+
 def get_connection():
     """
     Returns a new SQLite connection each time.
@@ -38,31 +38,49 @@ CREATE TABLE IF NOT EXISTS engineered_features (
     efeature_id INTEGER PRIMARY KEY AUTOINCREMENT,
     frame_id INTEGER,
 
-    -- 2D coords for the main joints of interest (already normalized)
-    x_hip_left REAL,      y_hip_left REAL,
-    x_hip_right REAL,     y_hip_right REAL,
-    x_knee_left REAL,     y_knee_left REAL,
-    x_knee_right REAL,    y_knee_right REAL,
-    x_ankle_left REAL,    y_ankle_left REAL,
-    x_ankle_right REAL,   y_ankle_right REAL,
-    x_left_foot_index REAL,   y_left_foot_index REAL,
-    x_right_foot_index REAL,  y_right_foot_index REAL,
-    x_shoulder_left REAL, y_shoulder_left REAL,
-    x_shoulder_right REAL,y_shoulder_right REAL,
-    x_elbow_left REAL,    y_elbow_left REAL,
-    x_elbow_right REAL,   y_elbow_right REAL,
-    x_wrist_left REAL,    y_wrist_left REAL,
-    x_wrist_right REAL,   y_wrist_right REAL,
+    -- Columns follow FEATURE_COLUMNS in development_and_training/utils/feature_library.py
+    -- (normalized x, y, z of the 14 joints of interest, mid-hip, joint angles)
+    x_ankle_left REAL, x_elbow_left REAL, x_left_foot_index REAL, x_hip_left REAL,
+    x_knee_left REAL, x_shoulder_left REAL, x_wrist_left REAL,
+    x_ankle_right REAL, x_elbow_right REAL, x_right_foot_index REAL, x_hip_right REAL,
+    x_knee_right REAL, x_shoulder_right REAL, x_wrist_right REAL,
+
+    y_ankle_left REAL, y_elbow_left REAL, y_left_foot_index REAL, y_hip_left REAL,
+    y_knee_left REAL, y_shoulder_left REAL, y_wrist_left REAL,
+    y_ankle_right REAL, y_elbow_right REAL, y_right_foot_index REAL, y_hip_right REAL,
+    y_knee_right REAL, y_shoulder_right REAL, y_wrist_right REAL,
+
+    z_ankle_left REAL, z_elbow_left REAL, z_left_foot_index REAL, z_hip_left REAL,
+    z_knee_left REAL, z_shoulder_left REAL, z_wrist_left REAL,
+    z_ankle_right REAL, z_elbow_right REAL, z_right_foot_index REAL, z_hip_right REAL,
+    z_knee_right REAL, z_shoulder_right REAL, z_wrist_right REAL,
+
+    x_mid_hip REAL, y_mid_hip REAL,
 
     -- Angles
     angle_knee_left REAL,
     angle_knee_right REAL,
     angle_elbow_left REAL,
     angle_elbow_right REAL,
-    angle_ankle_left REAL,
-    angle_ankle_right REAL,
-    angle_foot_left REAL,
-    angle_foot_right REAL,
 
     FOREIGN KEY (frame_id) REFERENCES frames(frame_id)
-);
\ No newline at end of file
+);
+-- Per-video lookups (features, and their version checked before every cached /predict_kick)
+CREATE INDEX IF NOT EXISTS idx_frames_video_id ON frames(video_id);
+CREATE INDEX IF NOT EXISTS idx_engineered_features_frame_id ON engineered_features(frame_id);
+-- Background /detect_pose runs (services/pose_jobs.py)
+CREATE TABLE IF NOT EXISTS pose_jobs (
+    job_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    video_id INTEGER,
+    status TEXT,                 -- queued / running / done / error
+    frames_total INTEGER,
+    frames_done INTEGER,
+    annotated_frames TEXT,       -- JSON list of annotated filenames, grows while running
+    error TEXT,
+    worker_pid INTEGER,          -- process whose queue holds the job
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    FOREIGN KEY (video_id) REFERENCES videos(video_id)
+);
@@ -0,0 +1,52 @@
+# web_app/backend/gunicorn.conf.py
+
+"""
+Production server profile: a prefork gunicorn master with threaded workers,
+instead of app.py's single development process.
+
+    cd web_app/backend
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master imports wsgi.py (preload_app), which loads the models once (forked
+workers share them copy-on-write) and fetches MediaPipe's model files. Each
+worker then starts its own background threads (model warm-up, registry watcher)
+in post_fork and builds its own MediaPipe graphs on first use.
+Note that every worker has its own prediction cache, micro-batcher, pose job
+queue and /predict_batch process pool (PK_BATCH_PROCESSES, default 2, per
+worker). Pose jobs and their progress are shared through SQLite, and a cached
+prediction is only used while the video's features version in SQLite still
+matches, so a worker never answers from features another worker has rewritten.
+
+Tunables (environment):
+  PK_BIND              address to listen on (default 0.0.0.0:8098)
+  PK_WORKERS           worker processes (default: CPU count)
+  PK_THREADS           request threads per worker (default 4); an open
+                       /detect_pose event stream holds one for the job's duration
+  PK_WORKER_TIMEOUT    seconds a worker may stay unresponsive before it is restarted (default 120)
+  PK_GRACEFUL_TIMEOUT  seconds to finish in-flight requests on restart / shutdown (default 30)
+  PK_KEEPALIVE         seconds an idle client connection is kept open (default 5)
+  PK_MAX_REQUESTS      requests after which a worker is recycled, 0 = never (default 0)
+  PK_ACCESS_LOG        0 = no per-request access log on stdout (default 1)
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get("PK_BIND", "0.0.0.0:8098")
+workers = int(os.environ.get("PK_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.environ.get("PK_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.environ.get("PK_WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("PK_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("PK_KEEPALIVE", "5"))
+max_requests = int(os.environ.get("PK_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = "-" if os.environ.get("PK_ACCESS_LOG", "1") != "0" else None
+
+
+def post_fork(server, worker):
+    # Threads started in the master would not exist in the worker
+    from app import start_background_threads
+    start_background_threads()
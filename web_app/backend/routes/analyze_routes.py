@@ -0,0 +1,151 @@
+# web_app/backend/routes/analyze_routes.py
+
+import os
+import time
+import tempfile
+import cv2
+from flask import Blueprint, request, jsonify, current_app, g
+from services.analysis import ANALYZE_ARTIFACTS, VideoDecodeError, analyze_kick
+from services.db_manager import insert_analyzed_kick
+from services.file_cleanup import clear_session
+from services.static_files import versioned_url
+from routes.predict_routes import PREDICT_MODES
+
+analyze_bp = Blueprint('analyze_bp', __name__)
+
+@analyze_bp.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    One-shot /upload + /extract_frames + /detect_pose + /compute_engineered + /predict_kick.
+    Multipart form:
+      file: the video
+      timestamp: mid-swing time in seconds
+      mode: sequence (default) / single_frame / ensemble, as for /predict_kick
+      timeout_ms: ensemble timeout (optional)
+      persist: comma-separated artifacts to keep (default none): video, frames,
+               annotated, pose, features. Anything persisted replaces the session's
+               previous video, exactly like /upload (but only once the analysis has
+               succeeded), and is laid out like the step endpoints leave it, so they
+               can take over from there.
+    Returns the prediction, per-step timings and whatever was persisted.
+    """
+    file = request.files.get('file')
+    if not file:
+        return jsonify({"error": "No file found"}), 400
+
+    session_id = getattr(g, 'session_id', None)
+    if not session_id:
+        return jsonify({"error": "No session_id found"}), 500
+
+    try:
+        midswing_time = float(request.form.get('timestamp', 0.0))
+        timeout_ms = request.form.get('timeout_ms')
+        timeout_ms = float(timeout_ms) if timeout_ms is not None else None
+    except ValueError:
+        return jsonify({"error": "timestamp and timeout_ms must be numbers"}), 400
+    if timeout_ms is not None and timeout_ms < 0:
+        return jsonify({"error": "timeout_ms must be a non-negative number"}), 400
+
+    mode = request.form.get('mode', 'sequence')
+    if mode not in PREDICT_MODES:
+        return jsonify({"error": f"Unknown mode '{mode}' (expected one of {', '.join(PREDICT_MODES)})"}), 400
+
+    persist = [a.strip() for a in request.form.get('persist', '').split(',') if a.strip()]
+    unknown = [a for a in persist if a not in ANALYZE_ARTIFACTS]
+    if unknown:
+        return jsonify({"error": f"Unknown artifacts {', '.join(unknown)} (expected some of {', '.join(ANALYZE_ARTIFACTS)})"}), 400
+
+    # 1) ffmpeg needs a seekable file: a temporary one, in uploads/ if the video is persisted
+    #    (so it only has to be renamed once the analysis has succeeded)
+    new_filename = f"{session_id}_{file.filename}"
+    upload_folder = os.path.join(current_app.root_path, 'uploads')
+    if "video" in persist:
+        os.makedirs(upload_folder, exist_ok=True)
+    fd, video_path = tempfile.mkstemp(prefix="kick_analyze_", suffix=os.path.splitext(file.filename)[1],
+                                      dir=upload_folder if "video" in persist else None)
+    with os.fdopen(fd, 'wb') as f:
+        file.save(f)
+
+    # 2) decode -> pose -> features -> prediction, in memory
+    keep_video = False
+    try:
+        result = analyze_kick(video_path, midswing_time, mode=mode, annotate="annotated" in persist,
+                              timeout_ms=timeout_ms)
+        keep_video = "video" in persist and len(result["frames"]) > 0
+    except VideoDecodeError as e:
+        return jsonify({"error": f"Could not decode the video: {e}"}), 400
+    finally:
+        if not keep_video:
+            os.remove(video_path)
+
+    frames = result["frames"]
+    if not frames:
+        return jsonify({"error": "No frames could be decoded around this timestamp"}), 400
+
+    # 3) Persist only what was asked for. The session's previous video is only replaced
+    #    now, so a failed analysis leaves it as it was
+    response = {}
+    if persist:
+        started = time.perf_counter()
+        if keep_video:
+            try:
+                clear_session(session_id, current_app.root_path)
+                os.replace(video_path, os.path.join(upload_folder, new_filename))
+            except Exception:
+                os.remove(video_path)
+                raise
+        else:
+            clear_session(session_id, current_app.root_path)
+        response.update(persist_artifacts(session_id, new_filename, midswing_time, result, persist))
+        result["timings_ms"]["persist"] = (time.perf_counter() - started) * 1000.0
+
+    response.update({
+        "mode": mode,
+        "frame_count": len(frames),
+        "pose_frame_count": int(result["features"].shape[0]),
+        "timings_ms": result["timings_ms"],
+        "persisted": persist,
+    })
+    prediction = result["prediction"]
+    if prediction is None:
+        return jsonify({"error": "No pose detected in the frames this mode needs", **response}), 404
+
+    response.update(prediction)
+    response["message"] = f"Kick analyzed from {len(frames)} frames"
+    return jsonify(response), 200
+
+def persist_artifacts(session_id, video_name, midswing_time, result, persist):
+    """
+    Writes the requested artifacts with the names and rows the step endpoints use.
+    The video / kick / frames rows are always written, so /upload can clean up after them.
+    """
+    # Same names as /extract_frames and /detect_pose give them
+    frame_names = [f"{session_id}_frame_{i:03d}.png" for i in range(1, len(result["frames"]) + 1)]
+    response = {"filename": video_name}
+
+    if "frames" in persist:
+        temp_frames_folder = os.path.join(current_app.root_path, 'temp_frames')
+        os.makedirs(temp_frames_folder, exist_ok=True)
+        for name, img in zip(frame_names, result["frames"]):
+            cv2.imwrite(os.path.join(temp_frames_folder, name), img)
+        response["frame_urls"] = [versioned_url('/api/temp_frames', temp_frames_folder, name) for name in frame_names]
+
+    if "annotated" in persist:
+        annotated_folder = os.path.join(current_app.root_path, 'temp_annotated_frames')
+        os.makedirs(annotated_folder, exist_ok=True)
+        annotated_names = []
+        for name, img in zip(frame_names, result["annotated"]):
+            if img is None:
+                continue
+            ann_name = f"{session_id}_{name}"
+            cv2.imwrite(os.path.join(annotated_folder, ann_name), img)
+            annotated_names.append(ann_name)
+        response["annotated_frames"] = [versioned_url('/api/annotated', annotated_folder, name) for name in annotated_names]
+
+    video_id, kick_id, _ = insert_analyzed_kick(
+        session_id, video_name, midswing_time, frame_names, result["landmarks"],
+        save_pose="pose" in persist,
+        features=result["features"] if "features" in persist else None
+    )
+    response.update(video_id=video_id, kick_id=kick_id)
+    return response
@@ -2,29 +2,35 @@
 
 import os
 import shutil
-from flask import Blueprint, request, jsonify, send_from_directory, current_app, g
+from flask import Blueprint, request, jsonify, current_app, g
 from services.db_manager import (
     get_video_by_name,
+    get_frames_for_video,
     insert_kick,
     insert_frame,
     clear_frames_for_video
 )
+from services.contact_sheet import build_contact_sheet, contact_sheet_files
 from services.file_cleanup import remove_files_in_folder
 from services.frame_extraction import extract_frames_around_time
+from services.pose_manager import ensure_annotated_frames
+from services.static_files import send_cached_file, versioned_url
 
 extract_bp = Blueprint('extract_bp', __name__)
 
 @extract_bp.route('/extract_frames', methods=['POST'])
 def extract_frames():
     """
-    JSON body: { filename, timestamp }
+    JSON body: { filename, timestamp, sprite (optional, default false) }
     1) Clears old frames + annotated frames for this video (in case user re-extracts).
     2) Extracts new frames around 'timestamp'.
-    3) Returns list of new frame URLs.
+    3) Returns list of new frame URLs, plus with 'sprite' the frames' contact sheet
+       (one tiled image + offset map, see services/contact_sheet.py).
     """
     data = request.json
     filename = data.get('filename')
     midswing_time = float(data.get('timestamp', 0.0))
+    sprite = bool(data.get('sprite', False))
 
     session_id = getattr(g, 'session_id', None)
     if not session_id:
@@ -42,11 +48,12 @@ def extract_frames():
     # 1) Clear old frames + annotated for this video (just in case user is redoing)
     frame_files, annotated_files = clear_frames_for_video(session_id, video_id)
 
+    sheet_files = contact_sheet_files(session_id, video_id)
     temp_frames_folder = os.path.join(current_app.root_path, 'temp_frames')
-    remove_files_in_folder(temp_frames_folder, frame_files)
+    remove_files_in_folder(temp_frames_folder, frame_files + sheet_files)
 
     temp_annotated_folder = os.path.join(current_app.root_path, 'temp_annotated_frames')
-    remove_files_in_folder(temp_annotated_folder, annotated_files)
+    remove_files_in_folder(temp_annotated_folder, annotated_files + sheet_files)
 
     # 2) Extract frames
     upload_folder = os.path.join(current_app.root_path, 'uploads')
@@ -82,19 +89,76 @@ def extract_frames():
 
         cur.execute("UPDATE frames SET frame_path=? WHERE frame_id=?", (final_name, frame_id))
 
-        url = f"/api/temp_frames/{final_name}"
-        frame_urls.append(url)
+        frame_urls.append(versioned_url('/api/temp_frames', temp_frames_folder, final_name))
 
     conn.commit()
     conn.close()
 
-    return jsonify({
+    response = {
         "message": "Frames extracted successfully",
         "kick_id": kick_id,
         "frame_urls": frame_urls
-    }), 200
+    }
+    if sprite:
+        response["sprite"] = contact_sheet_response(session_id, video_id, "frames")
+    return jsonify(response), 200
 
 @extract_bp.route('/temp_frames/<path:filename>')
 def serve_temp_frames(filename):
+    """
+    Serves the extracted frames from 'temp_frames/' (ETags, caching, WebP:
+    services/static_files.py).
+    """
     temp_frames_folder = os.path.join(current_app.root_path, 'temp_frames')
-    return send_from_directory(temp_frames_folder, filename)
+    return send_cached_file(temp_frames_folder, filename)
+
+# Frames a contact sheet can tile: (folder, URL prefix, frame_path -> filename in the folder)
+CONTACT_SHEET_KINDS = {
+    "frames": ('temp_frames', '/api/temp_frames', lambda session_id, frame_path: frame_path),
+    "annotated": ('temp_annotated_frames', '/api/annotated', lambda session_id, frame_path: f"{session_id}_{frame_path}"),
+}
+
+def contact_sheet_response(session_id, video_id, kind):
+    """
+    { url, columns, rows, tile_width, tile_height, tiles } of the video's contact
+    sheet of 'kind' (built on first request), or None if it has no such frames.
+    """
+    folder_name, url_prefix, to_filename = CONTACT_SHEET_KINDS[kind]
+    if kind == "annotated":
+        # Frames of a pose job run with annotate=false are only drawn on demand
+        ensure_annotated_frames(session_id, video_id)
+    frames = [(no, to_filename(session_id, path)) for no, path in get_frames_for_video(video_id)]
+    folder = os.path.join(current_app.root_path, folder_name)
+    built = build_contact_sheet(folder, session_id, video_id, frames)
+    if built is None:
+        return None
+    sheet_file, layout = built
+    return {"url": versioned_url(url_prefix, folder, sheet_file), **layout}
+
+@extract_bp.route('/contact_sheet', methods=['GET'])
+def contact_sheet():
+    """
+    Query: ?filename=<video>&kind=frames|annotated (default frames)
+    All of the video's extracted (or annotated) frames as one tiled image: returns its
+    URL and the offset map of the tiles, so a viewer needs a single image request.
+    """
+    filename = request.args.get('filename')
+    kind = request.args.get('kind', 'frames')
+
+    session_id = getattr(g, 'session_id', None)
+    if not session_id:
+        return jsonify({"error": "No session_id found."}), 500
+
+    if not filename:
+        return jsonify({"error": "No filename provided"}), 400
+    if kind not in CONTACT_SHEET_KINDS:
+        return jsonify({"error": f"Unknown kind '{kind}' (expected one of {', '.join(CONTACT_SHEET_KINDS)})"}), 400
+
+    row = get_video_by_name(session_id, filename)
+    if not row:
+        return jsonify({"error": "Video not found for this session"}), 404
+
+    sheet = contact_sheet_response(session_id, row[0], kind)
+    if sheet is None:
+        return jsonify({"error": f"No {kind} frames for this video"}), 404
+    return jsonify(sheet), 200
@@ -0,0 +1,53 @@
+# web_app/backend/routes/health_routes.py
+
+from flask import Blueprint, jsonify
+from services.model_loader import inference_stats, model_status
+from services.prediction_cache import prediction_cache
+from services.ensemble import ensemble_stats
+from services.pose_jobs import pose_job_stats
+
+health_bp = Blueprint('health_bp', __name__)
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """
+    Liveness: the process is up and serving. Never touches the model.
+    """
+    return jsonify({"status": "ok"}), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness: 200 once the model is loaded and warmed up, 503 until then.
+    """
+    status = model_status()
+    code = 200 if status["status"] == "ready" else 503
+    return jsonify({"ready": code == 200, "model": status}), code
+
+@health_bp.route('/metrics/inference', methods=['GET'])
+def inference_metrics():
+    """
+    Batch-size / latency metrics of the /predict_kick micro-batching executor.
+    """
+    return jsonify(inference_stats()), 200
+
+@health_bp.route('/metrics/prediction_cache', methods=['GET'])
+def prediction_cache_metrics():
+    """
+    Hit / miss / eviction / invalidation counts of the /predict_kick prediction cache.
+    """
+    return jsonify(prediction_cache.stats()), 200
+
+@health_bp.route('/metrics/ensemble', methods=['GET'])
+def ensemble_metrics():
+    """
+    Blended vs single-model answers and per-model timeouts / errors of /predict_kick mode 'ensemble'.
+    """
+    return jsonify(ensemble_stats()), 200
+
+@health_bp.route('/metrics/pose_jobs', methods=['GET'])
+def pose_job_metrics():
+    """
+    Running / queued pose detection jobs of this worker and the queue limits.
+    """
+    return jsonify(pose_job_stats()), 200
@@ -0,0 +1,18 @@
+# web_app/backend/routes/model_routes.py
+
+import os
+from flask import Blueprint, jsonify
+from services.model_loader import models_overview
+from services.single_frame_model import single_frame_status
+
+models_bp = Blueprint('models_bp', __name__)
+
+@models_bp.route('/models', methods=['GET'])
+def list_models():
+    """
+    Model versions as seen by this worker: the version it serves, the registry's
+    active version (they differ while a swap is loading) and the published versions.
+    """
+    models = models_overview()
+    models["single_frame"] = single_frame_status()
+    return jsonify({"worker_pid": os.getpid(), "models": models}), 200
@@ -1,29 +1,39 @@
 # web_app/backend/routes/pose_routes.py
 
 import os
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, g
+import numpy as np
+from urllib.parse import quote
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, g
 from services.db_manager import (
     get_video_by_name,
-    get_pose_data_for_video,
-    insert_engineered_feature,
+    get_pose_job,
+    get_pose_landmarks_for_video,
+    insert_engineered_features,
     clear_engineered_for_frames
 )
-from services.pose_manager import detect_pose_and_annotate
-from services.feature_engineering import engineer_features_2d
+from services.job_queue import QueueFullError
+from services.pose_jobs import fail_if_orphaned, job_events, job_summary, submit_pose_job
+from services.feature_engineering import LANDMARK_NAMES, engineer_kick_features
+from services.pose_manager import SKELETON_CONNECTIONS, ensure_annotated_frame
+from services.static_files import send_cached_file
 
 pose_bp = Blueprint('pose_bp', __name__)
 
 @pose_bp.route('/detect_pose', methods=['POST'])
 def detect_pose():
     """
-    JSON body: { "filename": <str> }
+    JSON body: { "filename": <str>, "annotate": <bool, default true> }
     1) Verify session_id
     2) Find video in DB by (session_id, filename)
-    3) detect_pose_and_annotate() -> annotated frames
-    4) Return { "annotated_frames": [...] }
+    3) Queue detect_pose_and_annotate() as a background job (services/pose_jobs.py);
+       with annotate=false no images are drawn: clients render /landmarks themselves
+       and /annotated/<file> draws an image only when it is requested
+    4) Return 202 { "job_id", "status_url", "events_url", "landmarks_url" } right away;
+       429 if the job queue is full
     """
     data = request.json
     filename = data.get('filename')
+    annotate = bool(data.get('annotate', True))
 
     session_id = getattr(g, 'session_id', None)
     if not session_id:
@@ -38,18 +48,92 @@ def detect_pose():
         return jsonify({"error": "Video not found for this session"}), 404
     video_id = row[0]
 
-    # Run pose detection
-    annotated_list = detect_pose_and_annotate(video_id, session_id)
+    try:
+        job_id = submit_pose_job(session_id, video_id, annotate=annotate)
+    except QueueFullError:
+        response = jsonify({"error": "Too many pose detection jobs queued, try again shortly"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
 
-    # Build URLs for each annotated image (under /api/annotated/<filename>)
-    annotated_urls = []
-    for ann_name in annotated_list:
-        # We might add a cache-busting param
-        annotated_urls.append(f"/api/annotated/{ann_name}")
+    return jsonify({
+        "message": "Pose detection queued",
+        "job_id": job_id,
+        "status_url": f"/api/detect_pose/jobs/{job_id}",
+        "events_url": f"/api/detect_pose/jobs/{job_id}/events",
+        "landmarks_url": f"/api/landmarks?filename={quote(filename)}"
+    }), 202
+
+def get_session_job(job_id):
+    """
+    The pose job if it belongs to this request's session, else None.
+    """
+    job = get_pose_job(job_id)
+    if job is None or job["session_id"] != getattr(g, 'session_id', None):
+        return None
+    return job
+
+@pose_bp.route('/detect_pose/jobs/<job_id>', methods=['GET'])
+def pose_job_status(job_id):
+    """
+    Status, progress and annotated frames so far of a pose job.
+    """
+    job = get_session_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_summary(fail_if_orphaned(job))), 200
+
+@pose_bp.route('/detect_pose/jobs/<job_id>/events', methods=['GET'])
+def pose_job_event_stream(job_id):
+    """
+    Server-Sent Events stream of a pose job (see services.pose_jobs.job_events).
+    """
+    if get_session_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    return Response(
+        stream_with_context(job_events(job_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@pose_bp.route('/landmarks', methods=['GET'])
+def landmarks():
+    """
+    Query: ?filename=<video>
+    The video's detected landmarks for client-side drawing, instead of annotated images:
+      landmark_names: the 33 MediaPipe landmark names, in index order
+      connections: skeleton edges as [landmark index, landmark index] pairs
+      channels: what each landmark entry holds ("x", "y", "visibility"; x / y
+                normalized to the frame's width / height)
+      frames: [ { frame_no, landmarks: 33 x [x, y, visibility], null where missing } ]
+    """
+    filename = request.args.get('filename')
 
+    session_id = getattr(g, 'session_id', None)
+    if not session_id:
+        return jsonify({"error": "No session_id found."}), 500
+
+    if not filename:
+        return jsonify({"error": "No filename provided"}), 400
+
+    row = get_video_by_name(session_id, filename)
+    if not row:
+        return jsonify({"error": "Video not found for this session"}), 404
+
+    _, frame_nos, landmarks = get_pose_landmarks_for_video(session_id, row[0])
+    # 4 decimals is well below a pixel for any frame size and keeps the payload small
+    points = np.round(landmarks[:, :, [0, 1, 3]].astype(np.float64), 4)
+    frames = [
+        {
+            "frame_no": int(frame_no),
+            "landmarks": [None if np.isnan(p).any() else p.tolist() for p in frame_points],
+        }
+        for frame_no, frame_points in zip(frame_nos, points)
+    ]
     return jsonify({
-        "message": "Pose detection complete",
-        "annotated_frames": annotated_urls
+        "landmark_names": LANDMARK_NAMES,
+        "connections": SKELETON_CONNECTIONS,
+        "channels": ["x", "y", "visibility"],
+        "frames": frames,
     }), 200
 
 @pose_bp.route("/compute_engineered", methods=["POST"])
@@ -68,82 +152,29 @@ def compute_engineered():
         return jsonify({"error": "Video not found"}), 404
     video_id = row[0]
 
-    df_raw = get_pose_data_for_video(session_id, video_id)
-    if df_raw.empty:
+    # Dense (frames, 33, 4) landmark tensor ordered by frame_no
+    frame_ids, frame_nos, landmarks = get_pose_landmarks_for_video(session_id, video_id)
+    if len(frame_ids) == 0:
         return jsonify({"error": "No pose data"}), 404
 
-    # Pivot
-    df_pivot = df_raw.pivot_table(
-        index="frame_no",
-        columns="landmark_name",
-        values=["x", "y"]  # ignoring z for pure 2D
-    ).reset_index()
-
-    # Flatten columns => x_ankle_left, y_ankle_left, etc.
-    df_pivot.columns = [f"{c[0]}_{c[1]}" if c[1] else c[0] for c in df_pivot.columns]
-    if "frame_no_" in df_pivot.columns:
-        df_pivot.rename(columns={"frame_no_": "frame_no"}, inplace=True)
-    df_pivot.sort_values("frame_no", inplace=True)
-
-    # For safety, fill missing columns with 0.0
-    needed_cols = [
-        "x_hip_left","y_hip_left","x_hip_right","y_hip_right",
-        "x_knee_left","y_knee_left","x_knee_right","y_knee_right",
-        "x_ankle_left","y_ankle_left","x_ankle_right","y_ankle_right",
-        "x_left_foot_index","y_left_foot_index","x_right_foot_index","y_right_foot_index",
-        "x_shoulder_left","y_shoulder_left","x_shoulder_right","y_shoulder_right",
-        "x_elbow_left","y_elbow_left","x_elbow_right","y_elbow_right",
-        "x_wrist_left","y_wrist_left","x_wrist_right","y_wrist_right"
-    ]
-    for col in needed_cols:
-        if col not in df_pivot.columns:
-            df_pivot[col] = 0.0
-
-    # Engineer
-    df_eng = engineer_features_2d(df_pivot)
-
-    # Map frame_no -> frame_id
-    frame_map = df_raw[["frame_id","frame_no"]].drop_duplicates()
-    fm = dict(zip(frame_map["frame_no"], frame_map["frame_id"]))
+    # Engineer with the shared feature library (same schema as training)
+    features = engineer_kick_features(landmarks, frame_nos)
 
     # Clear old engineered if re-running
-    frame_ids = list(fm.values())
-    clear_engineered_for_frames(frame_ids)
-
-    count = 0
-    for _, row2 in df_eng.iterrows():
-        fn = row2["frame_no"]
-        if fn in fm:
-            f_id = fm[fn]
-            insert_engineered_feature(
-                f_id,
-                row2["x_hip_left"], row2["y_hip_left"],
-                row2["x_hip_right"], row2["y_hip_right"],
-                row2["x_knee_left"], row2["y_knee_left"],
-                row2["x_knee_right"], row2["y_knee_right"],
-                row2["x_ankle_left"], row2["y_ankle_left"],
-                row2["x_ankle_right"], row2["y_ankle_right"],
-                row2["x_left_foot_index"], row2["y_left_foot_index"],
-                row2["x_right_foot_index"], row2["y_right_foot_index"],
-                row2["x_shoulder_left"], row2["y_shoulder_left"],
-                row2["x_shoulder_right"], row2["y_shoulder_right"],
-                row2["x_elbow_left"], row2["y_elbow_left"],
-                row2["x_elbow_right"], row2["y_elbow_right"],
-                row2["x_wrist_left"], row2["y_wrist_left"],
-                row2["x_wrist_right"], row2["y_wrist_right"],
-                row2["angle_knee_left"], row2["angle_knee_right"],
-                row2["angle_elbow_left"], row2["angle_elbow_right"],
-                row2["angle_ankle_left"], row2["angle_ankle_right"],
-                row2["angle_foot_left"], row2["angle_foot_right"]
-            )
-            count += 1
+    clear_engineered_for_frames(frame_ids.tolist())
+
+    count = insert_engineered_features(frame_ids, features)
 
     return jsonify({"message":"Engineered features computed","row_count":count}),200
 
 @pose_bp.route('/annotated/<path:filename>')
 def serve_annotated_file(filename):
     """
-    Serves the annotated frames from 'temp_annotated_frames/'.
+    Serves the annotated frames from 'temp_annotated_frames/'. Frames whose pose job
+    ran with annotate=false are drawn from the stored landmarks on first request; the
+    drawing is kept there for later requests. ETags, caching, WebP: services/static_files.py.
     """
     annotated_folder = os.path.join(current_app.root_path, 'temp_annotated_frames')
-    return send_from_directory(annotated_folder, filename)
+    if not os.path.exists(os.path.join(annotated_folder, filename)):
+        ensure_annotated_frame(filename)
+    return send_cached_file(annotated_folder, filename)
@@ -1,18 +1,37 @@
 # web_app/backend/routes/predict_routes.py
 
+import os
+import time
+import shutil
+import tempfile
 from flask import Blueprint, request, jsonify, g
 import numpy as np
-import pandas as pd
-from services.db_manager import get_video_by_name, get_engineered_data
-from services.model_loader import sequence_LSTM_model
+from services.db_manager import get_video_by_name, get_engineered_features_for_video, get_engineered_features_version, get_pose_landmarks_for_video
+from services.model_loader import predict_sequence, served_model_classes, served_model_version
+from services.single_frame_model import predict_single_frame
+from services.ensemble import run_ensemble
+from services.batch_scoring import score_kicks
+from services.feature_engineering import MIDSWING_FRAME_NO, NUM_FEATURES, SEQUENCE_LENGTH, engineer_frame_features, pad_or_truncate
+from services.prediction_cache import feature_digest, prediction_cache
 
 predict_bp = Blueprint('predict_bp', __name__)
 
+# /predict_kick modes: the LSTM over the whole engineered sequence (default), the
+# compiled RandomForest on the mid-swing frame's pose alone (no /compute_engineered needed),
+# or both at once with their probabilities blended (services/ensemble.py)
+PREDICT_MODES = ("sequence", "single_frame", "ensemble")
+
+# Most videos one /predict_batch request may carry (larger jobs: scripts/score_batch.py)
+PK_PREDICT_BATCH_MAX_KICKS = int(os.environ.get("PK_PREDICT_BATCH_MAX_KICKS", "32"))
+
 @predict_bp.route('/predict_kick', methods=['POST'])
 def predict_kick():
     data = request.json
     if not data or 'filename' not in data:
         return jsonify({"error": "No filename provided"}), 400
+    mode = data.get('mode', 'sequence')
+    if mode not in PREDICT_MODES:
+        return jsonify({"error": f"Unknown mode '{mode}' (expected one of {', '.join(PREDICT_MODES)})"}), 400
 
     session_id = getattr(g, 'session_id', None)
     if not session_id:
@@ -24,60 +43,174 @@ def predict_kick():
         return jsonify({"error": "Video not found for this session"}), 404
     video_id = row[0]
 
-    # 1) Fetch from engineered_features
-    df = get_engineered_data(session_id, video_id)
-    if df.empty:
+    if mode == "single_frame":
+        return predict_kick_single_frame(session_id, video_id)
+    if mode == "ensemble":
+        return predict_kick_ensemble(session_id, video_id, data.get('timeout_ms'))
+
+    result = predict_sequence_for_video(session_id, video_id)
+    if result is None:
         return jsonify({"error": "No engineered features found for this video"}), 404
 
-    # 2) We have columns like x_hip_left, y_hip_left, angle_knee_left, etc. + frame_no
-    #    Sort by frame_no
-    df.sort_values('frame_no', inplace=True)
-
-    # 3) Define that exact order the model expects:
-    feature_cols = [
-      # e.g. x_hip_left, y_hip_left, x_hip_right, y_hip_right, x_knee_left, ...
-      # plus angles. EXACTLY match your training order
-      'x_hip_left','y_hip_left',
-      'x_hip_right','y_hip_right',
-      'x_knee_left','y_knee_left',
-      'x_knee_right','y_knee_right',
-      'x_ankle_left','y_ankle_left',
-      'x_ankle_right','y_ankle_right',
-      'x_left_foot_index','y_left_foot_index',
-      'x_right_foot_index','y_right_foot_index',
-      'x_shoulder_left','y_shoulder_left',
-      'x_shoulder_right','y_shoulder_right',
-      'x_elbow_left','y_elbow_left',
-      'x_elbow_right','y_elbow_right',
-      'x_wrist_left','y_wrist_left',
-      'x_wrist_right','y_wrist_right',
-      'angle_knee_left','angle_knee_right',
-      'angle_elbow_left','angle_elbow_right',
-      'angle_ankle_left','angle_ankle_right',
-      'angle_foot_left','angle_foot_right',
-    ]
-
-    for col in feature_cols:
-        if col not in df.columns:
-            df[col] = 0.0
-
-    arr = df[feature_cols].values
-    time_steps, feat_count = arr.shape
-
-    required_timesteps = 21
-    if time_steps < required_timesteps:
-        pad_count = required_timesteps - time_steps
-        pad_arr = np.zeros((pad_count, feat_count), dtype=np.float32)
-        arr = np.concatenate([arr, pad_arr], axis=0)
-    elif time_steps > required_timesteps:
-        arr = arr[:required_timesteps]
-
-    arr_3d = arr.reshape((1, required_timesteps, feat_count))
-
-    # 4) Predict with LSTM
-    probs = sequence_LSTM_model.predict_quadrant_probs(arr_3d)
+    return jsonify({
+        "message": f"Kick direction predicted using {result['feat_count']} features from engineered_features",
+        "quadrant_probs": result["quadrant_probs"]
+    }), 200
+
+def predict_sequence_for_video(session_id, video_id):
+    """
+    LSTM result {"quadrant_probs", "feat_count"} for the video, None if it has no engineered features.
+    """
+    # 0) Unchanged video + same model version: answer from the cache. Whether the video is
+    #    unchanged is asked of the DB (cheap COUNT / MAX), as another worker may have rewritten it
+    model_version = served_model_version()
+    cache_generation = prediction_cache.generation
+    features_version = get_engineered_features_version(session_id, video_id)
+    result = prediction_cache.get_for_video(session_id, video_id, model_version, features_version)
+    if result is None:
+        result = predict_video(session_id, video_id, model_version, features_version, cache_generation)
+    return result
+
+def predict_video(session_id, video_id, model_version, features_version, cache_generation):
+    """
+    Runs the LSTM on the video's engineered features, unless the same padded
+    sequence was already predicted by 'model_version'. None if there are no features.
+    'features_version' and 'cache_generation' must have been read before the features are.
+    """
+    # 1) Fetch from engineered_features as a (frames, F) array, already ordered by
+    #    frame_no and in FEATURE_COLUMNS order (the order the model was trained on)
+    frame_ids, arr = get_engineered_features_for_video(session_id, video_id)
+    if len(frame_ids) == 0:
+        return None
+
+    # 2) Missing values -> 0.0, then pad/truncate to the model's sequence length
+    arr = pad_or_truncate(np.nan_to_num(arr, nan=0.0), SEQUENCE_LENGTH)
+
+    # 3) Shape (1, 21, F)
+    arr_3d = arr[np.newaxis]
+
+    # 4) Predict with LSTM (loaded on first use if the warm-up has not finished yet),
+    #    or reuse the cached result for this exact input
+    digest = feature_digest(arr_3d)
+    result = prediction_cache.get(digest, model_version)
+    if result is None:
+        result = {"quadrant_probs": predict_sequence(arr_3d), "feat_count": arr.shape[1]}
+        # A registry swap may have landed mid-prediction: only cache under the version that answered
+        if served_model_version() == model_version:
+            prediction_cache.put(digest, model_version, result)
+    prediction_cache.remember_video(session_id, video_id, digest, frame_ids, features_version, cache_generation)
+    return result
+
+def predict_kick_single_frame(session_id, video_id):
+    """
+    Kick direction from the mid-swing frame only: its pose landmarks, engineered with the
+    frame as its own reference (as in training), through the compiled RandomForest.
+    """
+    result = predict_single_frame_for_video(session_id, video_id)
+    if result is None:
+        return jsonify({"error": f"No pose data for the mid-swing frame (frame {MIDSWING_FRAME_NO})"}), 404
+    probs, classes = result
+
+    return jsonify({
+        "message": f"Kick direction predicted from the mid-swing frame using {NUM_FEATURES} features",
+        "mode": "single_frame",
+        "quadrant_probs": probs,
+        "classes": classes
+    }), 200
+
+def predict_single_frame_for_video(session_id, video_id):
+    """
+    Forest (probs, classes) for the video's mid-swing frame, None if that frame has no pose data.
+    """
+    _, _, landmarks = get_pose_landmarks_for_video(session_id, video_id, frame_no=MIDSWING_FRAME_NO)
+    if len(landmarks) == 0:
+        return None
+    features = np.nan_to_num(engineer_frame_features(landmarks[0]), nan=0.0)
+    return predict_single_frame(features)
+
+def predict_kick_ensemble(session_id, video_id, timeout_ms=None):
+    """
+    Sequence LSTM and single-frame forest run concurrently; their probabilities are blended
+    per kick direction. A model still running after the timeout (body 'timeout_ms', default
+    PK_ENSEMBLE_TIMEOUT_MS) is left out; if neither has finished, the first to finish answers.
+    """
+    if timeout_ms is not None and (not isinstance(timeout_ms, (int, float)) or timeout_ms < 0):
+        return jsonify({"error": "timeout_ms must be a non-negative number"}), 400
+
+    def sequence_job():
+        result = predict_sequence_for_video(session_id, video_id)
+        if result is None:
+            return None
+        return result["quadrant_probs"], served_model_classes()
+
+    result = run_ensemble({
+        "sequence": sequence_job,
+        "single_frame": lambda: predict_single_frame_for_video(session_id, video_id),
+    }, timeout_ms=timeout_ms)
+
+    if result["quadrant_probs"] is None:
+        errors = {name: m["error"] for name, m in result["models"].items() if m["status"] == "error"}
+        if errors:
+            return jsonify({"error": "No model could predict this video", "models": result["models"]}), 500
+        return jsonify({"error": "No engineered features or mid-swing pose data found for this video",
+                        "models": result["models"]}), 404
+
+    return jsonify({
+        "message": f"Kick direction predicted by the ensemble of {' + '.join(result['used'])}",
+        "mode": "ensemble",
+        "quadrant_probs": result["quadrant_probs"],
+        "classes": result["classes"],
+        "models": result["models"]
+    }), 200
+
+@predict_bp.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores several kicks in one request, without touching the session's data
+    (services/batch_scoring.py: pose across a process pool, one batched pass per model).
+    Multipart form:
+      files: the videos (repeated field)
+      timestamps: mid-swing time of each video, in the same order (repeated field,
+                  or one comma-separated value)
+      mode: sequence (default) / single_frame / ensemble
+    Returns { "results": [ {filename, timestamp, status, quadrant_probs, classes, ...} ] }
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({"error": "No files found"}), 400
+    if len(files) > PK_PREDICT_BATCH_MAX_KICKS:
+        return jsonify({"error": f"At most {PK_PREDICT_BATCH_MAX_KICKS} videos per request"}), 413
+
+    timestamps = [t for value in request.form.getlist('timestamps') for t in value.split(',') if t.strip()]
+    if len(timestamps) != len(files):
+        return jsonify({"error": f"Got {len(files)} files but {len(timestamps)} timestamps"}), 400
+    try:
+        timestamps = [float(t) for t in timestamps]
+    except ValueError:
+        return jsonify({"error": "timestamps must be numbers"}), 400
+
+    mode = request.form.get('mode', 'sequence')
+    if mode not in PREDICT_MODES:
+        return jsonify({"error": f"Unknown mode '{mode}' (expected one of {', '.join(PREDICT_MODES)})"}), 400
+
+    # ffmpeg needs seekable files: the uploads live in a temporary directory for the request
+    started = time.perf_counter()
+    tmp_dir = tempfile.mkdtemp(prefix="kick_batch_")
+    try:
+        paths = []
+        for i, file in enumerate(files):
+            path = os.path.join(tmp_dir, f"{i:04d}{os.path.splitext(file.filename)[1]}")
+            file.save(path)
+            paths.append(path)
+        results = score_kicks(list(zip(paths, timestamps)), mode=mode)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
+    for file, timestamp, result in zip(files, timestamps, results):
+        result.update(filename=file.filename, timestamp=timestamp)
     return jsonify({
-        "message": f"Kick direction predicted using {feat_count} features from engineered_features",
-        "quadrant_probs": probs
+        "message": f"Scored {sum(r['status'] == 'ok' for r in results)} of {len(results)} kicks",
+        "mode": mode,
+        "results": results,
+        "elapsed_ms": (time.perf_counter() - started) * 1000.0
     }), 200
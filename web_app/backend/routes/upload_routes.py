@@ -2,8 +2,8 @@
 
 import os
 from flask import Blueprint, request, jsonify, current_app, g
-from services.db_manager import insert_video, clear_session_data
-from services.file_cleanup import remove_files_in_folder
+from services.db_manager import insert_video
+from services.file_cleanup import clear_session
 
 upload_bp = Blueprint('upload_bp', __name__)
 
@@ -23,28 +23,13 @@ def upload_video():
     if not session_id:
         return jsonify({"error": "No session_id found"}), 500
 
-    # 1) Clear old DB data for this session
-    video_names, frame_files, annotated_files = clear_session_data(session_id)
-
-    # 2) Remove old files from disk
-    #    old videos in 'uploads/'
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    for v in video_names:
-        old_video_path = os.path.join(upload_folder, v)
-        if os.path.exists(old_video_path):
-            os.remove(old_video_path)
-
-    # remove frames from 'temp_frames'
-    temp_frames_folder = os.path.join(current_app.root_path, 'temp_frames')
-    remove_files_in_folder(temp_frames_folder, frame_files)
-
-    # remove annotated from 'temp_annotated_frames'
-    temp_annotated_folder = os.path.join(current_app.root_path, 'temp_annotated_frames')
-    remove_files_in_folder(temp_annotated_folder, annotated_files)
+    # 1-2) Clear old DB data for this session and remove its files from disk
+    clear_session(session_id, current_app.root_path)
 
     # 3) Store the new video
     orig_filename = file.filename
     new_filename = f"{session_id}_{orig_filename}"
+    upload_folder = os.path.join(current_app.root_path, 'uploads')
     os.makedirs(upload_folder, exist_ok=True)
     save_path = os.path.join(upload_folder, new_filename)
     file.save(save_path)
@@ -0,0 +1,103 @@
+# web_app/backend/scripts/benchmark_backends.py
+
+"""
+CPU latency / memory benchmark of the sequence model's inference backends
+(services/model_loader.BACKENDS).
+
+Each backend runs in a fresh Python process, so import time and RSS are not
+shared between backends. Reported per backend:
+  load_s:   import of the runtime + model load
+  first_ms: first prediction (graph building / allocation)
+  p50/p95:  single-sequence latency, the /predict_kick case
+  batch_ms: one batch of --batch-size sequences
+  rss_mb:   peak resident memory of the process
+
+Usage (from web_app/backend):
+  python scripts/benchmark_backends.py [--backends keras,numpy,onnx,tflite,numpy_int8,onnx_int8] [--iterations 200]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+ALL_BACKENDS = ["keras", "numpy", "onnx", "tflite", "numpy_int8", "onnx_int8"]
+
+
+def run_child(backend, iterations, batch_size):
+    import numpy as np
+
+    started = time.perf_counter()
+    from services.model_loader import select_backend
+    from services.feature_engineering import NUM_FEATURES, SEQUENCE_LENGTH
+    model = select_backend(backend)()
+    load_s = time.perf_counter() - started
+
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(1, SEQUENCE_LENGTH, NUM_FEATURES)).astype(np.float32)
+
+    t0 = time.perf_counter()
+    model.predict_batch_probs(x)
+    first_ms = (time.perf_counter() - t0) * 1000.0
+
+    latencies = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        model.predict_batch_probs(x)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    batch = rng.normal(size=(batch_size, SEQUENCE_LENGTH, NUM_FEATURES)).astype(np.float32)
+    model.predict_batch_probs(batch)
+    t0 = time.perf_counter()
+    model.predict_batch_probs(batch)
+    batch_ms = (time.perf_counter() - t0) * 1000.0
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "first_ms": first_ms,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "batch_ms": batch_ms,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,  # KB on Linux
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sequence model inference backends on CPU.")
+    parser.add_argument("--backends", default=",".join(ALL_BACKENDS), help="Comma-separated backends.")
+    parser.add_argument("--iterations", type=int, default=200, help="Single-sequence predictions per backend.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Sequences in the batched measurement.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.iterations, args.batch_size)))
+        return
+
+    print(f"{'backend':<10} {'load_s':>7} {'first_ms':>9} {'p50_ms':>8} {'p95_ms':>8} "
+          f"{'batch' + str(args.batch_size) + '_ms':>11} {'rss_mb':>7}")
+    for backend in args.backends.split(","):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", backend,
+             "--iterations", str(args.iterations), "--batch-size", str(args.batch_size)],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            reason = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+            print(f"{backend:<10} failed: {reason}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{backend:<10} {r['load_s']:>7.2f} {r['first_ms']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['batch_ms']:>11.2f} {r['rss_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# web_app/backend/scripts/load_test.py
+
+"""
+Throughput of the production profile (gunicorn.conf.py) as the worker count grows.
+
+For each --workers count a gunicorn server is started on a free local port and
+warmed up, then --concurrency client threads (one keep-alive connection each)
+post /api/predict_kick for --duration seconds. Reported per worker count:
+  rps:      successful requests per second
+  scaling:  rps relative to the first worker count
+  p50/p95/p99: request latency
+  errors:   non-200 answers and connection failures
+
+The requests use a synthetic kick (random landmarks through the real feature
+pipeline) seeded into this checkout's database for a dedicated session, so no
+video, ffmpeg or MediaPipe run is needed. The servers run with the prediction
+cache disabled, so every request reaches the model.
+
+Usage (from web_app/backend):
+  python scripts/load_test.py [--workers 1,2,4] [--threads 4] [--concurrency 16] [--duration 10]
+                              [--mode sequence|single_frame|ensemble]
+  python scripts/load_test.py --url http://127.0.0.1:8098   # a single run against a running
+                                                             # server using this checkout's database
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+SESSION_ID = "load-test-session"
+FILENAME = f"{SESSION_ID}_kick.mp4"
+
+
+def seed_session():
+    """
+    One kick with pose rows and engineered features for SESSION_ID, replacing any previous one.
+    """
+    from database.db_setup import init_db
+    from services.db_manager import clear_session_data, insert_analyzed_kick
+    from services.feature_engineering import NUM_LANDMARKS, SEQUENCE_LENGTH, engineer_kick_features
+
+    init_db()
+    clear_session_data(SESSION_ID)
+    rng = np.random.default_rng(0)
+    landmarks = rng.uniform(0.0, 1.0, size=(SEQUENCE_LENGTH, NUM_LANDMARKS, 4)).astype(np.float32)
+    frame_nos = np.arange(1, SEQUENCE_LENGTH + 1)
+    insert_analyzed_kick(
+        SESSION_ID, FILENAME, 0.0,
+        [f"{SESSION_ID}_frame_{i:03d}.png" for i in frame_nos],
+        list(landmarks),
+        save_pose=True,
+        features=engineer_kick_features(landmarks, frame_nos)
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_status(host, port, path):
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().status
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def start_server(workers, threads, port, timeout_s=300):
+    """
+    gunicorn with the production profile; returns once /api/ready has answered 200
+    often enough that every worker has most likely warmed up.
+    """
+    env = dict(os.environ,
+               PK_BIND=f"127.0.0.1:{port}",
+               PK_WORKERS=str(workers),
+               PK_THREADS=str(threads),
+               PK_ACCESS_LOG="0",
+               PK_PREDICTION_CACHE_SIZE="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.time() + timeout_s
+    ready_answers = 0
+    while ready_answers < 4 * workers:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited: {server.stderr.read().decode()[-2000:]}")
+        if time.time() > deadline:
+            stop_server(server)
+            raise RuntimeError(f"gunicorn with {workers} workers was not ready after {timeout_s}s")
+        if get_status("127.0.0.1", port, "/api/ready") == 200:
+            ready_answers += 1
+        else:
+            time.sleep(0.2)
+    return server
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def client(host, port, body, deadline, results):
+    headers = {"Content-Type": "application/json", "Cookie": f"SESSION_ID={SESSION_ID}"}
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/api/predict_kick", body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        results.append((ok, (time.perf_counter() - started) * 1000.0))
+    conn.close()
+
+
+def run_load(host, port, mode, concurrency, duration):
+    body = json.dumps({"filename": FILENAME, "mode": mode})
+    # A short untimed burst first, so connection setup and lazy loads are not measured
+    client(host, port, body, time.perf_counter() + 1.0, [])
+
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(host, port, body, deadline, results))
+               for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([ms for ok, ms in results if ok])
+    errors = sum(1 for ok, _ in results if not ok)
+    if len(latencies) == 0:
+        return {"rps": 0.0, "p50": float("nan"), "p95": float("nan"), "p99": float("nan"), "errors": errors}
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "p99": float(np.percentile(latencies, 99)),
+        "errors": errors,
+    }
+
+
+def print_row(label, r, base_rps):
+    scaling = r["rps"] / base_rps if base_rps else float("nan")
+    print(f"{label:<10}{r['rps']:>10.1f}{scaling:>9.2f}x{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/predict_kick on the gunicorn profile at several worker counts.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare.")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker (PK_THREADS).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count.")
+    parser.add_argument("--mode", default="sequence", choices=["sequence", "single_frame", "ensemble"])
+    parser.add_argument("--url", help="Load-test a running server instead of starting gunicorn.")
+    args = parser.parse_args()
+
+    seed_session()
+    print(f"{'workers':<10}{'rps':>10}{'scaling':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    if args.url:
+        url = urlparse(args.url)
+        r = run_load(url.hostname, url.port or 80, args.mode, args.concurrency, args.duration)
+        print_row("(url)", r, r["rps"])
+        return
+
+    base_rps = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        port = free_port()
+        server = start_server(workers, args.threads, port)
+        try:
+            r = run_load("127.0.0.1", port, args.mode, args.concurrency, args.duration)
+        finally:
+            stop_server(server)
+        base_rps = base_rps or r["rps"]
+        print_row(str(workers), r, base_rps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# web_app/backend/scripts/score_batch.py
+
+"""
+Offline batch scoring of many kicks (e.g. a whole shootout) with the web backend's
+pipeline and models (services/batch_scoring.py): frames are decoded and MediaPipe
+runs across a process pool, then every chunk of kicks is scored in one batched
+forward pass per model. Nothing is written to the web app's database.
+
+Input, either:
+  --manifest kicks.csv   columns 'video' and 'timestamp' (mid-swing time in seconds);
+                         relative video paths are relative to the manifest
+  --dir videos/          every video in the directory, all with --timestamp
+                         (e.g. clips already cut around the kick)
+
+Output (--out): one row per kick, .csv or .parquet (Parquet needs pandas + pyarrow):
+  video, timestamp, status, error, frame_count, pose_frame_count, predicted,
+  p_<class> for every class label
+
+Usage (from web_app/backend):
+  python scripts/score_batch.py --manifest shootout.csv --out shootout_scores.csv [--mode ensemble]
+  python scripts/score_batch.py --dir clips/ --timestamp 1.2 --out clips.parquet [--processes 8]
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+BASE_COLUMNS = ["video", "timestamp", "status", "error", "frame_count", "pose_frame_count", "predicted"]
+
+
+def read_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    missing = {"video", "timestamp"} - set(rows[0] if rows else {})
+    if missing:
+        sys.exit(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+    return [(os.path.join(base, row["video"]), float(row["timestamp"])) for row in rows]
+
+
+def list_directory(path, timestamp):
+    names = sorted(n for n in os.listdir(path) if n.lower().endswith(VIDEO_EXTENSIONS))
+    return [(os.path.join(path, n), timestamp) for n in names]
+
+
+def to_row(video, timestamp, result):
+    """
+    Flat output row of one score_kicks() result; class labels become p_<label> columns.
+    """
+    row = {
+        "video": video,
+        "timestamp": timestamp,
+        "status": result["status"],
+        "error": result.get("error", ""),
+        "frame_count": result.get("frame_count", 0),
+        "pose_frame_count": result.get("pose_frame_count", 0),
+        "predicted": "",
+    }
+    probs = result.get("quadrant_probs")
+    if probs:
+        # Output index if the model's class labels are unknown
+        labels = result["classes"] or list(range(len(probs)))
+        row["predicted"] = labels[max(range(len(probs)), key=probs.__getitem__)]
+        row.update({f"p_{label}": p for label, p in zip(labels, probs)})
+    return row
+
+
+def write_rows(rows, out_path):
+    prob_columns = sorted({c for row in rows for c in row if c.startswith("p_")})
+    columns = BASE_COLUMNS + prob_columns
+    if out_path.endswith(".parquet"):
+        try:
+            import pandas as pd
+            import pyarrow  # noqa: F401 (the Parquet engine)
+        except ImportError:
+            sys.exit("Writing Parquet needs pandas and pyarrow (pip install pandas pyarrow), or use a .csv --out")
+        pd.DataFrame(rows, columns=columns).to_parquet(out_path, index=False)
+        return
+    with open(out_path, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many penalty kicks offline and write the results to CSV / Parquet.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="CSV with 'video' and 'timestamp' columns.")
+    source.add_argument("--dir", help="Directory of videos, all scored at --timestamp.")
+    parser.add_argument("--timestamp", type=float, help="Mid-swing time (s) of every video in --dir.")
+    parser.add_argument("--out", required=True, help="Output .csv or .parquet file.")
+    parser.add_argument("--mode", default="sequence", choices=["sequence", "single_frame", "ensemble"])
+    parser.add_argument("--processes", type=int, default=None, help="Pose worker processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Kicks per batched inference pass.")
+    args = parser.parse_args()
+
+    if args.dir and args.timestamp is None:
+        parser.error("--dir needs --timestamp")
+    kicks = read_manifest(args.manifest) if args.manifest else list_directory(args.dir, args.timestamp)
+    if not kicks:
+        sys.exit("No videos to score")
+
+    # Imported here so --help and argument errors do not pay for MediaPipe / the models
+    from services.batch_scoring import get_pose_pool, score_kicks
+
+    # Unlike a web worker, this process has the machine to itself
+    pool = get_pose_pool(args.processes or os.cpu_count())
+    rows = []
+    started = time.perf_counter()
+    for start in range(0, len(kicks), args.chunk_size):
+        chunk = kicks[start:start + args.chunk_size]
+        results = score_kicks(chunk, mode=args.mode, pool=pool)
+        rows.extend(to_row(video, timestamp, result) for (video, timestamp), result in zip(chunk, results))
+        print(f"Scored {len(rows)}/{len(kicks)} kicks ({time.perf_counter() - started:.1f}s)")
+    pool.shutdown()
+
+    write_rows(rows, args.out)
+    failed = sum(row["status"] != "ok" for row in rows)
+    print(f"Results written to {args.out} ({len(rows) - failed} scored, {failed} without a prediction)")
+
+
+if __name__ == "__main__":
+    main()
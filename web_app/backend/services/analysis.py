@@ -0,0 +1,143 @@
+# web_app/backend/services/analysis.py
+
+"""
+Fused decode -> pose -> features -> prediction pipeline behind /analyze.
+
+The step endpoints (/extract_frames, /detect_pose, /compute_engineered,
+/predict_kick) hand their results to each other through PNGs on disk and rows in
+SQLite. Here every intermediate stays in memory: frames are piped out of ffmpeg as
+raw pixels, landmarks go straight from MediaPipe into the shared feature library
+and the features straight into the model. Nothing is written; the route decides
+which artifacts to persist afterwards.
+"""
+
+import time
+import numpy as np
+
+from services.ensemble import run_ensemble
+from services.feature_engineering import (
+    MIDSWING_FRAME_NO,
+    NUM_FEATURES,
+    SEQUENCE_LENGTH,
+    engineer_frame_features,
+    engineer_kick_features,
+    pad_or_truncate,
+)
+from services.frame_extraction import decode_frames_around_time
+from services.model_loader import predict_sequence, served_model_classes, served_model_version
+from services.pose_manager import detect_pose_in_images
+from services.prediction_cache import feature_digest, prediction_cache
+from services.single_frame_model import predict_single_frame
+
+# Artifacts /analyze can persist, in the layout of the step endpoints
+ANALYZE_ARTIFACTS = ("video", "frames", "annotated", "pose", "features")
+
+
+class VideoDecodeError(Exception):
+    """ffprobe / ffmpeg could not read the video (the input's fault, not the server's)."""
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000.0
+
+
+def engineer_kick(landmarks):
+    """
+    landmarks: per decoded frame, (33, 4) raw landmarks or None without a pose
+    Returns (features, midswing):
+      features: (pose frames, NUM_FEATURES) engineered features of the frames with a pose,
+                numbered like the frames rows /extract_frames inserts (1..N)
+      midswing: the mid-swing frame's landmarks, or None without a pose
+    """
+    posed = [i for i, lm in enumerate(landmarks) if lm is not None]
+    if posed:
+        features = engineer_kick_features(np.stack([landmarks[i] for i in posed]), np.array(posed) + 1)
+    else:
+        features = np.empty((0, NUM_FEATURES), dtype=np.float32)
+    midswing = landmarks[MIDSWING_FRAME_NO - 1] if len(landmarks) >= MIDSWING_FRAME_NO else None
+    return features, midswing
+
+
+def predict_sequence_features(features):
+    """
+    LSTM (probs, classes) for a kick's (pose frames, NUM_FEATURES) engineered features,
+    sharing /predict_kick's prediction cache. None if there are no frames.
+    """
+    if len(features) == 0:
+        return None
+    arr_3d = pad_or_truncate(np.nan_to_num(features, nan=0.0), SEQUENCE_LENGTH)[np.newaxis]
+    model_version = served_model_version()
+    digest = feature_digest(arr_3d)
+    result = prediction_cache.get(digest, model_version)
+    if result is None:
+        result = {"quadrant_probs": predict_sequence(arr_3d), "feat_count": arr_3d.shape[2]}
+        if served_model_version() == model_version:
+            prediction_cache.put(digest, model_version, result)
+    return result["quadrant_probs"], served_model_classes()
+
+
+def predict_single_frame_landmarks(midswing_landmarks):
+    """
+    Forest (probs, classes) for the mid-swing frame's (33, 4) landmarks, None if it has no pose.
+    """
+    if midswing_landmarks is None:
+        return None
+    return predict_single_frame(np.nan_to_num(engineer_frame_features(midswing_landmarks), nan=0.0))
+
+
+def analyze_kick(video_path, timestamp, mode="sequence", annotate=False, timeout_ms=None):
+    """
+    Runs the whole pipeline on the (2 * 10 + 1) frames around 'timestamp' of 'video_path'.
+    mode: 'sequence', 'single_frame' or 'ensemble', as for /predict_kick.
+
+    Returns a dict:
+      frames: decoded BGR frames (frame_no = position + 1)
+      landmarks: per frame, (33, 4) raw landmarks or None without a pose
+      annotated: per frame, the annotated image or None (only if 'annotate')
+      features: (pose frames, NUM_FEATURES) engineered features of the frames with a pose
+      prediction: {"quadrant_probs", "classes"[, "models"]} or None if the mode's model had no input
+      timings_ms: per step
+    Raises VideoDecodeError if the video cannot be read.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    try:
+        frames = decode_frames_around_time(video_path, timestamp)
+    except (RuntimeError, KeyError) as e:
+        raise VideoDecodeError(str(e)) from e
+    timings["decode"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    poses = detect_pose_in_images(frames, annotate=annotate)
+    landmarks = [lm for lm, _ in poses]
+    timings["pose"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    features, midswing = engineer_kick(landmarks)
+    timings["features"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    if mode == "ensemble":
+        result = run_ensemble({
+            "sequence": lambda: predict_sequence_features(features),
+            "single_frame": lambda: predict_single_frame_landmarks(midswing),
+        }, timeout_ms=timeout_ms)
+        prediction = None if result["quadrant_probs"] is None else {
+            "quadrant_probs": result["quadrant_probs"],
+            "classes": result["classes"],
+            "models": result["models"],
+        }
+    else:
+        output = predict_single_frame_landmarks(midswing) if mode == "single_frame" else predict_sequence_features(features)
+        prediction = None if output is None else {"quadrant_probs": output[0], "classes": output[1]}
+    timings["predict"] = _elapsed_ms(started)
+
+    return {
+        "frames": frames,
+        "landmarks": landmarks,
+        "annotated": [ann for _, ann in poses],
+        "features": features,
+        "prediction": prediction,
+        "timings_ms": timings,
+    }
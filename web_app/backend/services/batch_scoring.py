@@ -0,0 +1,164 @@
+# web_app/backend/services/batch_scoring.py
+
+"""
+Scoring many kicks at once (/predict_batch and scripts/score_batch.py).
+
+Decoding and pose detection dominate a kick's cost and are CPU-bound, so they run
+across a process pool: each task decodes one kick's frames in memory
+(frame_extraction.decode_frames_around_time), runs MediaPipe on them
+(pose_manager.detect_pose_in_images) and sends back only the landmarks. The parent
+then engineers the features and scores all kicks with one batched forward pass per
+model (model_loader.predict_sequences, single_frame_model.predict_single_frames).
+Nothing is written to disk or the database.
+
+PK_BATCH_PROCESSES: pose worker processes of the pool (default 2); started on first use
+                    and kept, since each one imports MediaPipe. Every gunicorn worker
+                    has its own pool, so keep this small under the web server;
+                    scripts/score_batch.py sizes its pool to the CPU count instead.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from services.analysis import engineer_kick
+from services.ensemble import ENSEMBLE_WEIGHTS, blend_probabilities
+from services.feature_engineering import SEQUENCE_LENGTH, engineer_frame_features, pad_or_truncate
+from services.frame_extraction import decode_frames_around_time
+from services.model_loader import predict_sequences, served_model_classes
+from services.pose_manager import detect_pose_in_images
+from services.single_frame_model import predict_single_frames
+
+PK_BATCH_PROCESSES = int(os.environ.get("PK_BATCH_PROCESSES", "2"))
+
+_pose_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_kick_landmarks(video_path, timestamp):
+    """
+    Process-pool task: per decoded frame, (33, 4) raw landmarks or None without a pose.
+    """
+    frames = decode_frames_around_time(video_path, timestamp)
+    return [lm for lm, _ in detect_pose_in_images(frames)]
+
+
+def get_pose_pool(processes=None):
+    """
+    The shared process pool, created on first use. 'spawn' rather than fork: the
+    callers are multi-threaded (web workers, the micro-batcher) and fork() only
+    copies the calling thread.
+    """
+    global _pose_pool
+    with _pool_lock:
+        if _pose_pool is None:
+            _pose_pool = ProcessPoolExecutor(
+                max_workers=max(1, processes or PK_BATCH_PROCESSES),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pose_pool
+
+
+def _has_input(x):
+    return x is not None and len(x) > 0
+
+
+def score_sequences(features):
+    """
+    features: per kick, (pose frames, NUM_FEATURES) array or None
+    Returns per kick (probs, classes) from one batched LSTM pass, or None without features.
+    """
+    scored = [i for i, f in enumerate(features) if _has_input(f)]
+    out = [None] * len(features)
+    if scored:
+        batch = np.stack([pad_or_truncate(np.nan_to_num(features[i], nan=0.0), SEQUENCE_LENGTH) for i in scored])
+        probs = predict_sequences(batch)
+        classes = served_model_classes()
+        for i, p in zip(scored, probs):
+            out[i] = (p.tolist(), classes)
+    return out
+
+
+def score_single_frames(midswings):
+    """
+    midswings: per kick, the mid-swing frame's (33, 4) landmarks or None
+    Returns per kick (probs, classes) from one batched forest pass, or None without a pose.
+    """
+    scored = [i for i, m in enumerate(midswings) if _has_input(m)]
+    out = [None] * len(midswings)
+    if scored:
+        batch = np.stack([np.nan_to_num(engineer_frame_features(midswings[i]), nan=0.0) for i in scored])
+        probs, classes = predict_single_frames(batch)
+        for i, p in zip(scored, probs):
+            out[i] = (p.tolist(), classes)
+    return out
+
+
+def score_kicks(kicks, mode="sequence", pool=None):
+    """
+    kicks: list of (video_path, timestamp)
+    mode: 'sequence', 'single_frame' or 'ensemble' (both, blended per kick direction)
+    Returns one dict per kick, in order:
+      status: ok / no_pose (the mode's model had no input) / error
+      error, frame_count, pose_frame_count, quadrant_probs, classes
+      models: each model's {status, quadrant_probs, classes} or {status: error, error}, in ensemble mode
+    A model whose batched pass raises fails only the kicks it would have scored (in
+    ensemble mode, only those the other model could not answer either).
+    """
+    pool = pool or get_pose_pool()
+    futures = [pool.submit(extract_kick_landmarks, path, timestamp) for path, timestamp in kicks]
+
+    results, features, midswings = [], [], []
+    for future in futures:
+        try:
+            landmarks = future.result()
+        except Exception as e:
+            results.append({"status": "error", "error": str(e)})
+            features.append(None)
+            midswings.append(None)
+            continue
+        kick_features, midswing = engineer_kick(landmarks)
+        results.append({"status": "ok", "frame_count": len(landmarks), "pose_frame_count": len(kick_features)})
+        features.append(kick_features)
+        midswings.append(midswing)
+
+    models = {}
+    if mode in ("sequence", "ensemble"):
+        models["sequence"] = (score_sequences, features)
+    if mode in ("single_frame", "ensemble"):
+        models["single_frame"] = (score_single_frames, midswings)
+    outputs, errors = {}, {}
+    for name, (score, inputs) in models.items():
+        try:
+            outputs[name] = score(inputs)
+        except Exception as e:
+            errors[name] = str(e)
+
+    for i, result in enumerate(results):
+        if result["status"] != "ok":
+            continue
+        answers = {name: out[i] for name, out in outputs.items() if out[i] is not None}
+        # Models that failed on a kick they had input for
+        failed = {name: error for name, error in errors.items() if _has_input(models[name][1][i])}
+        if not answers:
+            if failed:
+                result.update(status="error", error="; ".join(f"{name}: {error}" for name, error in failed.items()),
+                              quadrant_probs=None, classes=None)
+            else:
+                result.update(status="no_pose", quadrant_probs=None, classes=None)
+            continue
+        if mode == "ensemble":
+            # As in services/ensemble.py: outputs without class labels (or weight) are not blended
+            mapped = {name: a for name, a in answers.items()
+                      if a[1] is not None and ENSEMBLE_WEIGHTS.get(name, 0.0) > 0}
+            probs, classes = blend_probabilities(mapped) if mapped else next(iter(answers.values()))
+            # Per model as in services/ensemble.py: ok with its output, or error
+            result["models"] = {name: {"status": "ok", "quadrant_probs": a[0], "classes": a[1]}
+                                for name, a in answers.items()}
+            result["models"].update({name: {"status": "error", "error": error} for name, error in failed.items()})
+        else:
+            probs, classes = answers[mode]
+        result.update(quadrant_probs=probs, classes=classes)
+    return results
@@ -0,0 +1,122 @@
+# web_app/backend/services/contact_sheet.py
+
+"""
+Contact sheets: all frames of a kick tiled into one JPEG plus a JSON offset map, so
+a kick view is one image request instead of one per frame (21 for a kick).
+
+The sheet of a video's frames lives next to them, in temp_frames/ or
+temp_annotated_frames/, as '<session_id>_sheet_<video_id>.jpg' with its offset map
+in '<session_id>_sheet_<video_id>.json'. The map:
+  columns, rows, tile_width, tile_height: the grid (every tile has the same size)
+  tiles: per frame, in frame order, {frame_no, x, y} of its top-left corner
+
+PK_SPRITE_COLUMNS: tiles per row (default 7, i.e. 7 x 3 for a 21-frame kick)
+PK_SPRITE_TILE_WIDTH: tile width in pixels; frames are scaled to it, keeping their
+                      aspect ratio (default 480)
+PK_SPRITE_QUALITY: JPEG quality of the sheet (default 85)
+"""
+
+import os
+import glob
+import json
+import math
+import threading
+import cv2
+import numpy as np
+
+PK_SPRITE_COLUMNS = int(os.environ.get("PK_SPRITE_COLUMNS", "7"))
+PK_SPRITE_TILE_WIDTH = int(os.environ.get("PK_SPRITE_TILE_WIDTH", "480"))
+PK_SPRITE_QUALITY = int(os.environ.get("PK_SPRITE_QUALITY", "85"))
+
+
+def contact_sheet_name(session_id, video_id):
+    """
+    Base name (without extension) of a video's contact sheet and offset map.
+    """
+    return f"{session_id}_sheet_{video_id}"
+
+
+def contact_sheet_files(session_id, video_id):
+    name = contact_sheet_name(session_id, video_id)
+    return [f"{name}.jpg", f"{name}.json"]
+
+
+def render_contact_sheet(images, frame_nos, columns=None, tile_width=None):
+    """
+    images: BGR frames, all the same size
+    frame_nos: the frame_no of each image
+    Returns (sheet image, offset map).
+    """
+    columns = max(1, min(columns or PK_SPRITE_COLUMNS, len(images)))
+    tile_width = tile_width or PK_SPRITE_TILE_WIDTH
+    height, width = images[0].shape[:2]
+    tile_height = max(1, round(height * tile_width / width))
+    rows = math.ceil(len(images) / columns)
+
+    sheet = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    tiles = []
+    for i, (img, frame_no) in enumerate(zip(images, frame_nos)):
+        x, y = (i % columns) * tile_width, (i // columns) * tile_height
+        sheet[y:y + tile_height, x:x + tile_width] = cv2.resize(
+            img, (tile_width, tile_height), interpolation=cv2.INTER_AREA
+        )
+        tiles.append({"frame_no": int(frame_no), "x": x, "y": y})
+
+    layout = {
+        "columns": columns,
+        "rows": rows,
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "tiles": tiles,
+    }
+    return sheet, layout
+
+
+def build_contact_sheet(folder, session_id, video_id, frames):
+    """
+    Writes (or reuses) the contact sheet of 'frames' in 'folder'.
+    frames: list of (frame_no, filename in 'folder'); missing files are left out
+    Returns (sheet filename, offset map), or None if none of the frames exist.
+
+    An existing sheet is reused while it is newer than all of its frames (the
+    frames are rewritten whenever a kick is re-extracted or pose is re-run).
+    """
+    present = [(no, os.path.join(folder, name)) for no, name in frames
+               if os.path.exists(os.path.join(folder, name))]
+    if not present:
+        return None
+
+    sheet_file, layout_file = contact_sheet_files(session_id, video_id)
+    sheet_path = os.path.join(folder, sheet_file)
+    layout_path = os.path.join(folder, layout_file)
+    if os.path.exists(sheet_path) and os.path.exists(layout_path):
+        sheet_mtime = os.path.getmtime(sheet_path)
+        if all(os.path.getmtime(path) <= sheet_mtime for _, path in present):
+            with open(layout_path) as f:
+                layout = json.load(f)
+            if [t["frame_no"] for t in layout["tiles"]] == [no for no, _ in present]:
+                return sheet_file, layout
+
+    images = [cv2.imread(path) for _, path in present]
+    loaded = [(no, img) for (no, _), img in zip(present, images) if img is not None]
+    if not loaded:
+        return None
+    sheet, layout = render_contact_sheet([img for _, img in loaded], [no for no, _ in loaded])
+
+    # Written under per-writer temporary names and renamed, so a concurrent reader
+    # (or a second writer) never sees half a sheet
+    tmp = f".{os.getpid()}-{threading.get_ident()}.tmp"
+    cv2.imwrite(sheet_path + tmp + ".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, PK_SPRITE_QUALITY])
+    os.replace(sheet_path + tmp + ".jpg", sheet_path)
+    with open(layout_path + tmp, "w") as f:
+        json.dump(layout, f)
+    os.replace(layout_path + tmp, layout_path)
+    return sheet_file, layout
+
+
+def remove_session_contact_sheets(folder, session_id):
+    """
+    Removes every contact sheet (and offset map) of this session from 'folder'.
+    """
+    for path in glob.glob(os.path.join(folder, f"{glob.escape(session_id)}_sheet_*")):
+        os.remove(path)
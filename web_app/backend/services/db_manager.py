@@ -1,13 +1,16 @@
 # web_app/backend/services/db_manager.py
 
 import os
+import json
 import sqlite3
+import numpy as np
 from database.db_setup import get_connection
-import pandas as pd
+from services.feature_engineering import CHANNELS, FEATURE_COLUMNS, LANDMARK_NAMES, NUM_LANDMARKS, rows_to_landmarks
+from services.prediction_cache import invalidate_frames
 
 def clear_session_data(session_id):
     """
-    Removes all videos + frames + pose_features under this session_id.
+    Removes all videos + frames + pose_features + engineered_features under this session_id.
     Returns (video_files, frame_files, annotated_frame_files)
       so caller can remove them from disk.
     """
@@ -35,6 +38,7 @@ def clear_session_data(session_id):
     if frame_ids:
         frame_placeholders = ",".join(["?"]*len(frame_ids))
         cur.execute(f"DELETE FROM pose_features WHERE frame_id IN ({frame_placeholders})", frame_ids)
+        cur.execute(f"DELETE FROM engineered_features WHERE frame_id IN ({frame_placeholders})", frame_ids)
 
     # Delete frames
     cur.execute(f"DELETE FROM frames WHERE video_id IN ({placeholders})", video_ids)
@@ -47,6 +51,7 @@ def clear_session_data(session_id):
 
     conn.commit()
     conn.close()
+    invalidate_frames(frame_ids)
 
     # For annotated frames, we typically name them with session_id + frame_path,
     # so we can guess them. Let's build them all:
@@ -60,7 +65,7 @@ def clear_session_data(session_id):
 
 def clear_frames_for_video(session_id, video_id):
     """
-    Clears frames + pose_features for a specific video in this session, 
+    Clears frames + pose_features + engineered_features for a specific video in this session,
     so we can re-extract them. Returns (frame_files, annotated_frame_files).
     (We do NOT remove the video row.)
     """
@@ -80,6 +85,7 @@ def clear_frames_for_video(session_id, video_id):
     # 2) Delete pose_features for these frames
     placeholders = ",".join(["?"]*len(frame_ids))
     cur.execute(f"DELETE FROM pose_features WHERE frame_id IN ({placeholders})", frame_ids)
+    cur.execute(f"DELETE FROM engineered_features WHERE frame_id IN ({placeholders})", frame_ids)
 
     # 3) Delete frames
     cur.execute("DELETE FROM frames WHERE video_id=?", (video_id,))
@@ -91,6 +97,7 @@ def clear_frames_for_video(session_id, video_id):
 
     conn.commit()
     conn.close()
+    invalidate_frames(frame_ids)
 
     # Build annotated names (sessionID_frame_001.png => sessionID_frame_001.png)
     # If your naming convention is "sessionID_<originalFrame>", we do:
@@ -146,6 +153,40 @@ def insert_frame(kick_id, video_id, frame_no, frame_path):
     conn.close()
     return fid
 
+def get_frames_for_video(video_id):
+    """
+    [(frame_no, frame_path)] of a video's frames, ordered by frame_no.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT frame_no, frame_path
+        FROM frames
+        WHERE video_id=?
+        ORDER BY frame_no ASC
+    """, (video_id,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def get_frame_by_annotated_name(ann_name):
+    """
+    The frame an annotated image name ('<session_id>_<frame_path>') belongs to:
+    (session_id, video_id, frame_no, frame_path), or None.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT v.session_id, f.video_id, f.frame_no, f.frame_path
+        FROM frames f
+        JOIN videos v ON f.video_id = v.video_id
+        WHERE v.session_id || '_' || f.frame_path = ?
+        LIMIT 1
+    """, (ann_name,))
+    row = cur.fetchone()
+    conn.close()
+    return row
+
 def insert_pose_feature(frame_id, landmark_name, x, y, z, visibility):
     conn = get_connection()
     cur = conn.cursor()
@@ -156,127 +197,167 @@ def insert_pose_feature(frame_id, landmark_name, x, y, z, visibility):
     conn.commit()
     conn.close()
 
-def get_pose_data_for_video(session_id, video_id):
+def get_pose_landmarks_for_video(session_id, video_id, frame_no=None):
     """
-    Returns a pandas DataFrame containing frames+pose for the given session_id + video_id,
-    with columns: [frame_id, kick_id, video_id, frame_no, landmark_name, x, y, z]
-    Merged from frames + pose_features, plus we can also join kicks if needed.
+    Returns the pose data of the given session_id + video_id as dense arrays,
+    ordered by frame_no (only frames that have pose data; only 'frame_no' if given):
+      frame_ids: (frames,) int64
+      frame_nos: (frames,) int64
+      landmarks: (frames, 33, 4) float32 [x, y, z, visibility], the landmark axis
+                 indexed by MediaPipe PoseLandmark index; NaN where missing.
     """
     conn = get_connection()
-    
-    # We only merge frames that belong to this session_id & video_id
-    # Then join with pose_features
-    query = """
-    SELECT f.frame_id, f.kick_id, f.video_id, f.frame_no,
-           p.landmark_name, p.x, p.y, p.z
-    FROM frames f
-    JOIN pose_features p ON f.frame_id = p.frame_id
-    JOIN videos v ON f.video_id = v.video_id
-    WHERE v.session_id = ?
-      AND f.video_id = ?
-    ORDER BY f.frame_no ASC
-    """
-    df = pd.read_sql_query(query, conn, params=(session_id, video_id))
-    
-    conn.close()
-    return df
-
-def insert_engineered_feature(
-    frame_id,
-    x_hip_left, y_hip_left, x_hip_right, y_hip_right,
-    x_knee_left, y_knee_left, x_knee_right, y_knee_right,
-    x_ankle_left, y_ankle_left, x_ankle_right, y_ankle_right,
-    x_left_foot_index, y_left_foot_index,
-    x_right_foot_index, y_right_foot_index,
-    x_shoulder_left, y_shoulder_left,
-    x_shoulder_right, y_shoulder_right,
-    x_elbow_left, y_elbow_left,
-    x_elbow_right, y_elbow_right,
-    x_wrist_left, y_wrist_left,
-    x_wrist_right, y_wrist_right,
-    angle_knee_left, angle_knee_right,
-    angle_elbow_left, angle_elbow_right,
-    angle_ankle_left, angle_ankle_right,
-    angle_foot_left, angle_foot_right
-):
-    conn = get_connection()
     cur = conn.cursor()
+    frame_filter = "AND f.frame_no = ?" if frame_no is not None else ""
+    params = (session_id, video_id) + ((int(frame_no),) if frame_no is not None else ())
+    cur.execute(f"""
+        SELECT f.frame_id, f.frame_no, p.landmark_name, p.x, p.y, p.z, p.visibility
+        FROM frames f
+        JOIN pose_features p ON f.frame_id = p.frame_id
+        JOIN videos v ON f.video_id = v.video_id
+        WHERE v.session_id = ?
+          AND f.video_id = ?
+          {frame_filter}
+        ORDER BY f.frame_no ASC
+    """, params)
+    rows = cur.fetchall()
+    conn.close()
 
-    sql = """
-    INSERT INTO engineered_features (
-        frame_id,
-        x_hip_left, y_hip_left,
-        x_hip_right, y_hip_right,
-        x_knee_left, y_knee_left,
-        x_knee_right, y_knee_right,
-        x_ankle_left, y_ankle_left,
-        x_ankle_right, y_ankle_right,
-        x_left_foot_index, y_left_foot_index,
-        x_right_foot_index, y_right_foot_index,
-        x_shoulder_left, y_shoulder_left,
-        x_shoulder_right, y_shoulder_right,
-        x_elbow_left, y_elbow_left,
-        x_elbow_right, y_elbow_right,
-        x_wrist_left, y_wrist_left,
-        x_wrist_right, y_wrist_right,
-        angle_knee_left, angle_knee_right,
-        angle_elbow_left, angle_elbow_right,
-        angle_ankle_left, angle_ankle_right,
-        angle_foot_left, angle_foot_right
-    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """
-
-    # Build the tuple of values
-    args_tuple = (
-        frame_id,
-        x_hip_left, y_hip_left,
-        x_hip_right, y_hip_right,
-        x_knee_left, y_knee_left,
-        x_knee_right, y_knee_right,
-        x_ankle_left, y_ankle_left,
-        x_ankle_right, y_ankle_right,
-        x_left_foot_index, y_left_foot_index,
-        x_right_foot_index, y_right_foot_index,
-        x_shoulder_left, y_shoulder_left,
-        x_shoulder_right, y_shoulder_right,
-        x_elbow_left, y_elbow_left,
-        x_elbow_right, y_elbow_right,
-        x_wrist_left, y_wrist_left,
-        x_wrist_right, y_wrist_right,
-        angle_knee_left, angle_knee_right,
-        angle_elbow_left, angle_elbow_right,
-        angle_ankle_left, angle_ankle_right,
-        angle_foot_left, angle_foot_right
+    if not rows:
+        return (
+            np.empty((0,), dtype=np.int64),
+            np.empty((0,), dtype=np.int64),
+            np.empty((0, NUM_LANDMARKS, len(CHANNELS)), dtype=np.float32)
+        )
+
+    frame_id_col = np.array([r[0] for r in rows], dtype=np.int64)
+    frame_no_col = np.array([r[1] for r in rows], dtype=np.int64)
+    frame_nos, first_row, frame_pos = np.unique(frame_no_col, return_index=True, return_inverse=True)
+    landmarks = rows_to_landmarks(
+        frame_pos,
+        [r[2] for r in rows],
+        np.array([r[3:7] for r in rows], dtype=np.float32),
+        len(frame_nos)
     )
+    return frame_id_col[first_row], frame_nos, landmarks
 
-    # --- DEBUG PRINTS ---
-    print("\nDEBUG: Insert SQL statement:\n", sql)
-    print("DEBUG: Number of parameters in the tuple:", len(args_tuple))
-    for i, val in enumerate(args_tuple):
-        print(f"DEBUG param index={i} => {val!r}")
-    # ---------------------
+def insert_engineered_features(frame_ids, features):
+    """
+    Bulk-inserts engineered feature rows.
+    frame_ids: (frames,) frame_id of each row
+    features: (frames, NUM_FEATURES) array in FEATURE_COLUMNS order
+    """
+    cols = ", ".join(FEATURE_COLUMNS)
+    placeholders = ",".join(["?"] * (len(FEATURE_COLUMNS) + 1))
+    sql = f"INSERT INTO engineered_features (frame_id, {cols}) VALUES ({placeholders})"
 
-    cur.execute(sql, args_tuple)
+    rows = [
+        (int(frame_id),) + tuple(float(v) for v in row)
+        for frame_id, row in zip(frame_ids, features)
+    ]
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.executemany(sql, rows)
     conn.commit()
     conn.close()
+    # Cached predictions for these frames are stale now
+    invalidate_frames(frame_ids)
+    return len(rows)
 
 
-def get_engineered_data(session_id, video_id):
+def insert_analyzed_kick(session_id, video_name, timestamp, frame_paths, landmarks, save_pose=False, features=None):
+    """
+    Writes the rows of one fused /analyze run in a single transaction:
+    the video, its kick and one frames row per decoded frame (frame_no 1..N), plus
+    pose_features rows if 'save_pose' and engineered_features rows if 'features' is given.
+    frame_paths: (frames,) image filename of each frame under temp_frames/ (the file may not be saved)
+    landmarks: (frames,) list of (33, 4) raw landmarks, None for frames without a pose
+    features: (pose frames, NUM_FEATURES) rows of the frames with a pose, in frame order
+    Returns (video_id, kick_id, frame_ids).
+    """
     conn = get_connection()
-    query = """
-    SELECT ef.*,
-           f.frame_no
-    FROM engineered_features ef
-    JOIN frames f ON ef.frame_id = f.frame_id
-    JOIN videos v ON f.video_id = v.video_id
-    WHERE v.session_id = ?
-      AND f.video_id = ?
-    ORDER BY f.frame_no ASC
+    cur = conn.cursor()
+    cur.execute("INSERT INTO videos (session_id, original_name) VALUES (?, ?)", (session_id, video_name))
+    video_id = cur.lastrowid
+    cur.execute("INSERT INTO kicks (video_id, timestamp) VALUES (?, ?)", (video_id, timestamp))
+    kick_id = cur.lastrowid
+
+    frame_ids = []
+    for frame_no, frame_path in enumerate(frame_paths, start=1):
+        cur.execute("""
+            INSERT INTO frames (kick_id, video_id, frame_no, frame_path)
+            VALUES (?, ?, ?, ?)
+        """, (kick_id, video_id, frame_no, frame_path))
+        frame_ids.append(cur.lastrowid)
+
+    if save_pose:
+        cur.executemany(
+            "INSERT INTO pose_features (frame_id, landmark_name, x, y, z, visibility) VALUES (?,?,?,?,?,?)",
+            [(frame_id, name) + tuple(float(v) for v in lm[i])
+             for frame_id, lm in zip(frame_ids, landmarks) if lm is not None
+             for i, name in enumerate(LANDMARK_NAMES)]
+        )
+
+    if features is not None:
+        pose_frame_ids = [f for f, lm in zip(frame_ids, landmarks) if lm is not None]
+        cols = ", ".join(FEATURE_COLUMNS)
+        placeholders = ",".join(["?"] * (len(FEATURE_COLUMNS) + 1))
+        cur.executemany(
+            f"INSERT INTO engineered_features (frame_id, {cols}) VALUES ({placeholders})",
+            [(int(frame_id),) + tuple(float(v) for v in row) for frame_id, row in zip(pose_frame_ids, features)]
+        )
+
+    conn.commit()
+    conn.close()
+    return video_id, kick_id, frame_ids
+
+
+def get_engineered_features_for_video(session_id, video_id):
     """
-    df = pd.read_sql_query(query, conn, params=(session_id, video_id))
+    Returns (frame_ids, features) for the given session_id + video_id, ordered by frame_no:
+      frame_ids: (frames,) int64
+      features: (frames, NUM_FEATURES) float32 in FEATURE_COLUMNS order (NaN for NULLs)
+    """
+    cols = ", ".join(f"ef.{c}" for c in FEATURE_COLUMNS)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT ef.frame_id, {cols}
+        FROM engineered_features ef
+        JOIN frames f ON ef.frame_id = f.frame_id
+        JOIN videos v ON f.video_id = v.video_id
+        WHERE v.session_id = ?
+          AND f.video_id = ?
+        ORDER BY f.frame_no ASC
+    """, (session_id, video_id))
+    rows = cur.fetchall()
     conn.close()
-    return df
 
+    frame_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    features = np.array([r[1:] for r in rows], dtype=np.float32).reshape(len(rows), len(FEATURE_COLUMNS))
+    return frame_ids, features
+
+
+def get_engineered_features_version(session_id, video_id):
+    """
+    (row count, max efeature_id) of the video's engineered_features: changes whenever
+    they are rewritten or deleted (ids are AUTOINCREMENT, rows are never updated in place),
+    so any process can tell whether what it cached is still current.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT COUNT(ef.efeature_id), MAX(ef.efeature_id)
+        FROM engineered_features ef
+        JOIN frames f ON ef.frame_id = f.frame_id
+        JOIN videos v ON f.video_id = v.video_id
+        WHERE v.session_id = ?
+          AND f.video_id = ?
+    """, (session_id, video_id))
+    count, max_id = cur.fetchone()
+    conn.close()
+    return (count, max_id)
 
 def clear_engineered_for_frames(frame_ids):
     if not frame_ids:
@@ -286,4 +367,60 @@ def clear_engineered_for_frames(frame_ids):
     placeholders = ",".join(["?"]*len(frame_ids))
     cur.execute(f"DELETE FROM engineered_features WHERE frame_id IN ({placeholders})", frame_ids)
     c.commit()
-    c.close()
\ No newline at end of file
+    c.close()
+    invalidate_frames(frame_ids)
+
+POSE_JOB_COLUMNS = [
+    "job_id", "session_id", "video_id", "status", "frames_total", "frames_done",
+    "annotated_frames", "error", "worker_pid", "created_at", "started_at", "finished_at"
+]
+
+def insert_pose_job(job_id, session_id, video_id, worker_pid, created_at):
+    conn = get_connection()
+    conn.execute("""
+        INSERT INTO pose_jobs (job_id, session_id, video_id, status, frames_total, frames_done,
+                               annotated_frames, worker_pid, created_at)
+        VALUES (?, ?, ?, 'queued', 0, 0, '[]', ?, ?)
+    """, (job_id, session_id, video_id, worker_pid, created_at))
+    conn.commit()
+    conn.close()
+
+def update_pose_job(job_id, **fields):
+    """
+    Sets the given pose_jobs columns; 'annotated_frames' is given as a list.
+    """
+    if "annotated_frames" in fields:
+        fields["annotated_frames"] = json.dumps(fields["annotated_frames"])
+    assignments = ", ".join(f"{col}=?" for col in fields)
+    conn = get_connection()
+    conn.execute(f"UPDATE pose_jobs SET {assignments} WHERE job_id=?", tuple(fields.values()) + (job_id,))
+    conn.commit()
+    conn.close()
+
+def get_pose_job(job_id):
+    """
+    The job as a dict (annotated_frames decoded to a list), or None.
+    """
+    conn = get_connection()
+    row = conn.execute(f"SELECT {', '.join(POSE_JOB_COLUMNS)} FROM pose_jobs WHERE job_id=?", (job_id,)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    job = dict(zip(POSE_JOB_COLUMNS, row))
+    job["annotated_frames"] = json.loads(job["annotated_frames"] or "[]")
+    return job
+
+def delete_pose_job(job_id):
+    conn = get_connection()
+    conn.execute("DELETE FROM pose_jobs WHERE job_id=?", (job_id,))
+    conn.commit()
+    conn.close()
+
+def get_unfinished_pose_jobs():
+    """
+    (job_id, worker_pid) of every queued or running job.
+    """
+    conn = get_connection()
+    rows = conn.execute("SELECT job_id, worker_pid FROM pose_jobs WHERE status IN ('queued', 'running')").fetchall()
+    conn.close()
+    return rows
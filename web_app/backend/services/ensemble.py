@@ -0,0 +1,178 @@
+# web_app/backend/services/ensemble.py
+
+"""
+Ensemble of the sequence LSTM and the single-frame forest (/predict_kick mode 'ensemble').
+
+Each model runs on its own executor (a small thread pool per model), so both predict at
+once and a request takes as long as the slower one, not the sum of the two. After
+PK_ENSEMBLE_TIMEOUT_MS the request stops waiting and uses the models that have finished;
+if none has, it waits for the first one to finish and answers with it alone.
+
+Probabilities are blended per kick direction (the kick_direction labels, 1-6): each model
+contributes weight * its probability of that direction, renormalized over the models that
+answered. A model whose outputs cannot be mapped to directions (a sequence model without
+class labels, see model_loader.sequence_class_labels) is reported but left out of the
+blend, unless it is the only model that answered.
+
+PK_ENSEMBLE_TIMEOUT_MS: how long a request waits for both models (default 250)
+PK_ENSEMBLE_WEIGHTS: blend weights, e.g. "sequence=0.5,single_frame=0.5"
+PK_ENSEMBLE_WORKERS: threads of each model's executor (default 4)
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+PK_ENSEMBLE_TIMEOUT_MS = float(os.environ.get("PK_ENSEMBLE_TIMEOUT_MS", "250"))
+PK_ENSEMBLE_WEIGHTS = os.environ.get("PK_ENSEMBLE_WEIGHTS", "sequence=0.5,single_frame=0.5")
+PK_ENSEMBLE_WORKERS = int(os.environ.get("PK_ENSEMBLE_WORKERS", "4"))
+
+
+def parse_weights(spec):
+    """
+    "name=weight,..." -> {name: weight}
+    """
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+ENSEMBLE_WEIGHTS = parse_weights(PK_ENSEMBLE_WEIGHTS)
+
+_executors = {}
+_executors_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "blended": 0, "single_model": 0, "timeouts": {}, "errors": {}}
+
+
+def get_model_executor(name):
+    """
+    The executor model 'name' runs on, created on first use.
+    """
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=max(1, PK_ENSEMBLE_WORKERS), thread_name_prefix=f"ensemble-{name}")
+        return _executors[name]
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    output = fn()
+    return output, (time.perf_counter() - started) * 1000.0
+
+
+def _count(key, name):
+    with _stats_lock:
+        _stats[key][name] = _stats[key].get(name, 0) + 1
+
+
+def blend_probabilities(answers, weights=None):
+    """
+    Weighted average per class label of {name: (probs, classes)}, renormalized over the
+    models present (weights default to PK_ENSEMBLE_WEIGHTS). Returns (probs, classes).
+    """
+    weights = weights or ENSEMBLE_WEIGHTS
+    labels = sorted({label for _, classes in answers.values() for label in classes})
+    total = sum(weights[name] for name in answers)
+    blended = []
+    for label in labels:
+        p = sum(weights[name] * probs[classes.index(label)]
+                for name, (probs, classes) in answers.items() if label in classes)
+        blended.append(p / total)
+    return blended, labels
+
+
+def run_ensemble(jobs, timeout_ms=None, weights=None):
+    """
+    jobs: {model name: zero-arg callable returning (probs, class labels or None), or None
+          if the model has no input for this video}
+    Runs every job on its model's executor and blends what finished within 'timeout_ms'.
+
+    Returns {"quadrant_probs", "classes", "models", "used"}: "quadrant_probs" is None if no
+    model answered, "models" holds each model's status (ok / unmapped / no_input / error /
+    timed_out), latency and output, and "used" names the models in the answer.
+    """
+    timeout_ms = PK_ENSEMBLE_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    weights = weights or ENSEMBLE_WEIGHTS
+    with _stats_lock:
+        _stats["requests"] += 1
+
+    futures = {get_model_executor(name).submit(_timed, fn): name for name, fn in jobs.items()}
+    models = {}
+
+    def collect(done):
+        for future in done:
+            name = futures[future]
+            try:
+                output, latency_ms = future.result()
+            except Exception as e:
+                models[name] = {"status": "error", "error": str(e)}
+                _count("errors", name)
+                continue
+            if output is None:
+                models[name] = {"status": "no_input", "latency_ms": latency_ms}
+                continue
+            probs, classes = output
+            models[name] = {
+                "status": "ok" if classes is not None else "unmapped",
+                "latency_ms": latency_ms,
+                "weight": weights.get(name, 0.0),
+                "quadrant_probs": probs,
+                "classes": classes,
+            }
+
+    def answered():
+        return [name for name, m in models.items() if m["status"] in ("ok", "unmapped")]
+
+    # Both models at once: bounded by the slower one, or the timeout
+    done, pending = wait(futures, timeout=max(0.0, timeout_ms) / 1000.0)
+    collect(done)
+    # Nothing usable yet: fall back to whichever model finishes first
+    while pending and not answered():
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        collect(done)
+    for future in pending:
+        future.cancel()  # still queued: skip it; already running: its result is dropped
+        models[futures[future]] = {"status": "timed_out"}
+        _count("timeouts", futures[future])
+
+    mapped = {name: (m["quadrant_probs"], m["classes"]) for name, m in models.items()
+              if m["status"] == "ok" and weights.get(name, 0.0) > 0}
+    if mapped:
+        probs, classes = blend_probabilities(mapped, weights)
+        used = sorted(mapped)
+    elif answered():
+        # Only an unmapped model answered: its outputs as they are
+        name = answered()[0]
+        probs, classes, used = models[name]["quadrant_probs"], models[name]["classes"], [name]
+    else:
+        probs, classes, used = None, None, []
+    for name in used:
+        models[name]["used"] = True
+
+    with _stats_lock:
+        if len(used) > 1:
+            _stats["blended"] += 1
+        elif used:
+            _stats["single_model"] += 1
+    return {"quadrant_probs": probs, "classes": classes, "models": models, "used": used}
+
+
+def ensemble_stats():
+    """
+    Requests, how many were blended vs answered by one model, and timeouts / errors per model.
+    """
+    with _stats_lock:
+        return {
+            "requests": _stats["requests"],
+            "blended": _stats["blended"],
+            "single_model": _stats["single_model"],
+            "timeouts": dict(_stats["timeouts"]),
+            "errors": dict(_stats["errors"]),
+            "timeout_ms": PK_ENSEMBLE_TIMEOUT_MS,
+            "weights": dict(ENSEMBLE_WEIGHTS),
+        }
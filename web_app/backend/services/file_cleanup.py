@@ -2,13 +2,29 @@
 
 import os
 import shutil
+from services.contact_sheet import remove_session_contact_sheets
+from services.db_manager import clear_session_data
+from services.static_files import variant_files
 
 def remove_files_in_folder(folder, file_list):
     """
-    Attempts to remove each filename in 'file_list' from 'folder'.
-    Ignores if missing.
+    Attempts to remove each filename in 'file_list' from 'folder', along with the
+    variants served for it (e.g. WebP). Ignores if missing.
     """
     for f in file_list:
-        path = os.path.join(folder, f)
-        if os.path.exists(path):
-            os.remove(path)
+        for name in [f] + variant_files(f):
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+def clear_session(session_id, root_path):
+    """
+    Clears old data (videos, frames, annotated) for this session: the DB rows and
+    their files under 'root_path' (uploads/, temp_frames/, temp_annotated_frames/).
+    """
+    video_names, frame_files, annotated_files = clear_session_data(session_id)
+    remove_files_in_folder(os.path.join(root_path, 'uploads'), video_names)
+    remove_files_in_folder(os.path.join(root_path, 'temp_frames'), frame_files)
+    remove_files_in_folder(os.path.join(root_path, 'temp_annotated_frames'), annotated_files)
+    for folder in ('temp_frames', 'temp_annotated_frames'):
+        remove_session_contact_sheets(os.path.join(root_path, folder), session_id)
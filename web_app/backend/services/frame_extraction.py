@@ -2,6 +2,7 @@ import os
 import subprocess
 import tempfile
 import json
+import numpy as np
 
 def get_frame_rate(video_path):
     """
@@ -28,6 +29,77 @@ def get_frame_rate(video_path):
     num, denom = map(int, frame_rate_str.split('/'))
     return num / denom
 
+def get_frame_size(video_path):
+    """
+    Uses ffprobe to determine the (width, height) of the decoded frames, i.e. after
+    ffmpeg applies the stream's rotation (phone videos are often stored rotated).
+    """
+    command = [
+        "ffprobe", "-hide_banner", "-loglevel", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:stream_tags=rotate:stream_side_data=rotation",
+        "-of", "json",
+        video_path
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe error: {result.stderr.decode('utf-8')}")
+
+    info = json.loads(result.stdout)
+    if 'streams' not in info or len(info['streams']) == 0:
+        stderr_msg = result.stderr.decode('utf-8')
+        raise KeyError(f"'streams' not found in ffprobe output. Stderr: {stderr_msg}")
+
+    stream = info['streams'][0]
+    rotation = stream.get('tags', {}).get('rotate', 0)
+    for side_data in stream.get('side_data_list', []):
+        rotation = side_data.get('rotation', rotation)
+    width, height = stream['width'], stream['height']
+    if int(float(rotation)) % 180 != 0:
+        width, height = height, width
+    return width, height
+
+def decode_frames_around_time(
+    video_path,
+    midswing_time,
+    frames_before=10,
+    frames_after=10,
+    fps=None
+):
+    """
+    In-memory variant of extract_frames_around_time(exact_frames=True): the same
+    (frames_before + frames_after + 1) frames, piped out of ffmpeg as raw BGR pixels
+    instead of written as PNGs to a temporary directory.
+
+    Returns:
+        List[np.ndarray]: (height, width, 3) uint8 BGR frames, as cv2.imread would load them.
+    """
+    if fps is None:
+        fps = get_frame_rate(video_path)
+    width, height = get_frame_size(video_path)
+
+    total_frames = frames_before + frames_after + 1
+    start_time = max(midswing_time - (frames_before / fps), 0)
+
+    ffmpeg_cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", str(start_time),
+        "-i", video_path,
+        "-frames:v", str(total_frames),
+        "-an",                 # no audio
+        "-f", "rawvideo",
+        "-pix_fmt", "bgr24",   # OpenCV's channel order
+        "pipe:1"
+    ]
+    result = subprocess.run(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg error: {result.stderr.decode('utf-8')}")
+
+    frame_bytes = width * height * 3
+    count = len(result.stdout) // frame_bytes
+    frames = np.frombuffer(result.stdout, dtype=np.uint8, count=count * frame_bytes)
+    return list(frames.reshape(count, height, width, 3))
+
 def extract_frames_around_time(
     video_path,
     midswing_time,
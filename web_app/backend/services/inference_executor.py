@@ -0,0 +1,129 @@
+# web_app/backend/services/inference_executor.py
+
+"""
+Micro-batching executor for model inference.
+
+Concurrent requests each submit their own (n, ...) input. A single worker thread
+collects submissions until it has 'max_batch_size' samples or the oldest one has
+waited 'max_wait_ms', runs ONE batched forward pass and hands every caller its
+own rows of the result. The per-call overhead of Keras predict is thus paid once
+per batch instead of once per request.
+
+Knobs:
+  max_batch_size: samples per forward pass before it runs (throughput); requests are
+                  never split, so a multi-sample request may overshoot it
+  max_wait_ms: how long the first request of a batch may wait for company (latency)
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+
+class MicroBatchExecutor:
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, name="inference"):
+        """
+        predict_fn: callable mapping a (batch, ...) array to a (batch, ...) array
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._thread.start()
+
+    def _reset_stats(self):
+        self._stats = {
+            "requests": 0,
+            "samples": 0,
+            "batches": 0,
+            "max_batch_size_seen": 0,
+            "batch_size_histogram": {},
+            "queue_wait_ms_total": 0.0,
+            "predict_ms_total": 0.0,
+            "errors": 0,
+        }
+
+    def submit(self, x):
+        """
+        Queues one (n, ...) input and returns a Future resolving to its (n, ...) output.
+        """
+        future = Future()
+        self._queue.put((np.asarray(x), future, time.perf_counter()))
+        return future
+
+    def predict(self, x, timeout=None):
+        """
+        Blocking submit(): returns the output rows for 'x'.
+        """
+        return self.submit(x).result(timeout=timeout)
+
+    def _collect(self):
+        # Block for the first request, then gather more until the batch is full or the deadline passes
+        items = [self._queue.get()]
+        samples = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while samples < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            samples += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+            try:
+                batch = np.concatenate([x for x, _, _ in items], axis=0)
+                out = self.predict_fn(batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                continue
+            predict_ms = (time.perf_counter() - started) * 1000.0
+
+            # Scatter each caller's rows back
+            offset = 0
+            for x, future, _ in items:
+                future.set_result(out[offset:offset + len(x)])
+                offset += len(x)
+
+            with self._stats_lock:
+                s = self._stats
+                s["requests"] += len(items)
+                s["samples"] += len(batch)
+                s["batches"] += 1
+                s["max_batch_size_seen"] = max(s["max_batch_size_seen"], len(batch))
+                s["batch_size_histogram"][len(batch)] = s["batch_size_histogram"].get(len(batch), 0) + 1
+                s["queue_wait_ms_total"] += sum((started - t) * 1000.0 for _, _, t in items)
+                s["predict_ms_total"] += predict_ms
+
+    def stats(self):
+        """
+        Batch-size and latency metrics since start (or the last reset_stats()).
+        """
+        with self._stats_lock:
+            s = dict(self._stats)
+            s["batch_size_histogram"] = {str(k): v for k, v in sorted(s["batch_size_histogram"].items())}
+        batches, requests = s["batches"], s["requests"]
+        s["mean_batch_size"] = s["samples"] / batches if batches else 0.0
+        s["mean_queue_wait_ms"] = s.pop("queue_wait_ms_total") / requests if requests else 0.0
+        s["mean_predict_ms"] = s.pop("predict_ms_total") / batches if batches else 0.0
+        s["max_batch_size"] = self.max_batch_size
+        s["max_wait_ms"] = self.max_wait * 1000.0
+        s["queue_depth"] = self._queue.qsize()
+        return s
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
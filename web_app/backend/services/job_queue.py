@@ -0,0 +1,72 @@
+# web_app/backend/services/job_queue.py
+
+"""
+Bounded in-process job queue: a fixed pool of worker threads taking jobs from a
+FIFO queue, so a slow job runs next to the request threads instead of inside one.
+
+Knobs:
+  workers: jobs running at once (the pool size)
+  max_queued: jobs that may wait for a free worker (>= 1); submit() refuses more with
+              QueueFullError, so a burst is pushed back to the client instead of
+              piling up unbounded work
+"""
+
+import queue
+import threading
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, run_fn, workers=2, max_queued=16, name="jobs"):
+        """
+        run_fn: callable(job_id, *args) run on a worker thread per job; exceptions
+                are its own to record (they are only printed here)
+        """
+        self.run_fn = run_fn
+        self.workers = max(1, int(workers))
+        self.max_queued = max(1, int(max_queued))
+        self.name = name
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_id, *args):
+        """
+        Queues one job. Raises QueueFullError if 'max_queued' jobs are already waiting.
+        """
+        try:
+            self._queue.put_nowait((job_id, args))
+        except queue.Full:
+            raise QueueFullError(f"{self.name}: {self.max_queued} jobs already queued")
+
+    def _run(self):
+        while True:
+            job_id, args = self._queue.get()
+            with self._lock:
+                self._running += 1
+            try:
+                self.run_fn(job_id, *args)
+            except Exception as e:
+                print(f"{self.name} job {job_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def stats(self):
+        with self._lock:
+            running = self._running
+        return {
+            "workers": self.workers,
+            "running": running,
+            "queued": self._queue.qsize(),
+            "max_queued": self.max_queued,
+        }
@@ -1,60 +1,412 @@
 # web_app/backend/model_loader.py
 
 import os
+import json
+import time
+import threading
+from functools import partial
 import joblib
 import numpy as np
-from tensorflow.keras.models import load_model
+
+from services.feature_engineering import NUM_FEATURES, SEQUENCE_LENGTH
+from services.inference_executor import MicroBatchExecutor
+# development_and_training/ is on sys.path via services.feature_engineering
+from utils.numpy_lstm import file_sha256, fold_scaler
+from utils.model_export import EXPORT_FILENAMES, QUANTIZED_FILENAMES
+from utils.model_registry import ModelRegistry
+from utils.model_runtimes import RUNTIMES
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+SEQUENCE_MODELS_DIR = os.path.join(BASE_DIR, 'development_and_training', 'models', 'sequence_models')
+SEQUENCE_MODEL_FILENAME = 'sequence_model.h5'
+SEQUENCE_SCALER_FILENAME = 'sequence_scaler.pkl'
+# kick_direction of each output index, saved by scripts/training/train_model_sequence.py
+SEQUENCE_CLASSES_FILENAME = 'sequence_classes.json'
 # Paths to your saved model & scaler
-SEQUENCE_LSTM_MODEL_PATH = os.path.join(
-    BASE_DIR,
-    'development_and_training',
-    'models',
-    'sequence_models',
-    'sequence_model.h5'
-)
-SEQUENCE_LSTM_SCALER_PATH = os.path.join(
-    BASE_DIR,
-    'development_and_training',
-    'models',
-    'sequence_models',
-    'sequence_scaler.pkl'
-)
+SEQUENCE_LSTM_MODEL_PATH = os.path.join(SEQUENCE_MODELS_DIR, SEQUENCE_MODEL_FILENAME)
+SEQUENCE_LSTM_SCALER_PATH = os.path.join(SEQUENCE_MODELS_DIR, SEQUENCE_SCALER_FILENAME)
+# Exports of the two files above with the scaler folded in, one per runtime
+# (development_and_training/scripts/training/export_sequence_model.py), and their
+# int8-weight variants (scripts/training/quantize_sequence_model.py)
+SEQUENCE_EXPORT_FILENAMES = {**EXPORT_FILENAMES, **QUANTIZED_FILENAMES}
+
+# Versioned model registry (development_and_training/utils/model_registry.py), filled by
+# scripts/training/publish_sequence_model.py. The active version is served instead of the files
+# above; every PK_MODEL_REGISTRY_POLL_S seconds (0 = never) each worker checks for a newly
+# activated version, loads + warms it up in the background and then swaps it in
+PK_MODEL_REGISTRY_DIR = os.environ.get(
+    "PK_MODEL_REGISTRY_DIR", os.path.join(BASE_DIR, 'development_and_training', 'models', 'registry'))
+PK_MODEL_REGISTRY_POLL_S = float(os.environ.get("PK_MODEL_REGISTRY_POLL_S", "5"))
+SEQUENCE_REGISTRY = ModelRegistry(PK_MODEL_REGISTRY_DIR, "sequence")
+# Version name of the files in models/sequence_models/, served while nothing is activated
+DEFAULT_VERSION = "default"
+
+# Inference backend, chosen at startup: 'keras', 'numpy' (no TensorFlow), 'onnx' (ONNX Runtime),
+# 'tflite', 'numpy_int8' / 'onnx_int8' (int8 weights, see report/sequence/quantization_report_sequence.txt),
+# or 'auto' = numpy if its export is present and was made from the current .h5, else keras
+PK_MODEL_BACKEND = os.environ.get("PK_MODEL_BACKEND", "auto")
+
+# Class labels of a model trained before sequence_classes.json was saved, comma-separated
+# in output order (e.g. "1,2,4,5"); unset = unknown, the outputs are plain class indices
+PK_SEQUENCE_CLASSES = os.environ.get("PK_SEQUENCE_CLASSES", "")
+
+
+def sequence_model_paths(version=DEFAULT_VERSION):
+    """
+    {'model': .h5, 'scaler': .pkl, <export format>: path} of a registry version
+    (DEFAULT_VERSION = models/sequence_models/).
+    """
+    model_dir = SEQUENCE_MODELS_DIR if version == DEFAULT_VERSION else SEQUENCE_REGISTRY.version_dir(version)
+    paths = {fmt: os.path.join(model_dir, filename) for fmt, filename in SEQUENCE_EXPORT_FILENAMES.items()}
+    paths["model"] = os.path.join(model_dir, SEQUENCE_MODEL_FILENAME)
+    paths["scaler"] = os.path.join(model_dir, SEQUENCE_SCALER_FILENAME)
+    paths["classes"] = os.path.join(model_dir, SEQUENCE_CLASSES_FILENAME)
+    return paths
+
+
+def sequence_class_labels(paths):
+    """
+    kick_direction label of each model output, from the version's sequence_classes.json or
+    PK_SEQUENCE_CLASSES. None if unknown.
+    """
+    if os.path.exists(paths["classes"]):
+        with open(paths["classes"]) as f:
+            return json.load(f)["classes"]
+    if PK_SEQUENCE_CLASSES:
+        return [int(label) for label in PK_SEQUENCE_CLASSES.split(",")]
+    return None
+
+
+def active_model_version():
+    """
+    The registry's active version, or DEFAULT_VERSION if none was activated.
+    """
+    return SEQUENCE_REGISTRY.active_version() or DEFAULT_VERSION
+
+
 class SequenceLSTMModel:
-    def __init__(self):
+    def __init__(self, paths=None):
+        paths = paths or sequence_model_paths()
         # Load model + scaler
-        if not os.path.exists(SEQUENCE_LSTM_MODEL_PATH):
-            raise FileNotFoundError(f"Sequence model not found at {SEQUENCE_LSTM_MODEL_PATH}")
-        if not os.path.exists(SEQUENCE_LSTM_SCALER_PATH):
-            raise FileNotFoundError(f"Sequence scaler not found at {SEQUENCE_LSTM_SCALER_PATH}")
+        if not os.path.exists(paths["model"]):
+            raise FileNotFoundError(f"Sequence model not found at {paths['model']}")
+        if not os.path.exists(paths["scaler"]):
+            raise FileNotFoundError(f"Sequence scaler not found at {paths['scaler']}")
 
-        self.model = load_model(SEQUENCE_LSTM_MODEL_PATH)
-        self.scaler = joblib.load(SEQUENCE_LSTM_SCALER_PATH)
+        # TensorFlow is only imported here, so importing this module stays cheap
+        from tensorflow.keras.models import load_model
+
+        self.model = load_model(paths["model"])
+        self.scaler = joblib.load(paths["scaler"])
+        self.backend = "keras"
+
+        # Fold the scaler into the LSTM's input kernel + bias once, so each request is a
+        # single predict on the raw features (no reshape / sklearn transform / reshape)
+        lstm = next(layer for layer in self.model.layers if type(layer).__name__ == 'LSTM')
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        kernel, bias = fold_scaler(kernel, bias, self.scaler.mean_, self.scaler.scale_)
+        lstm.set_weights([kernel, recurrent_kernel, bias])
+
+    def predict_batch_probs(self, arr_3d):
+        """
+        arr_3d shape: (batch, time_steps=21, features=48), unscaled
+        => model.predict shape (batch, classes)
+        """
+        return self.model.predict(np.asarray(arr_3d, dtype=np.float32), verbose=0)
 
     def predict_quadrant_probs(self, arr_3d):
         """
-        arr_3d shape: (1, time_steps=21, features=48)
-        1) Flatten => shape (21,48)
-        2) scaler.transform => shape (21,48)
-        3) Reshape => (1,21,48)
-        4) model.predict => shape (6,)
+        arr_3d shape: (1, time_steps=21, features=48) => list of class probabilities
         """
-        import numpy as np
+        return self.predict_batch_probs(arr_3d)[0].tolist()
+
+class SequenceExportModel(SequenceLSTMModel):
+    """
+    Same interface as SequenceLSTMModel, served from one exported artifact through its
+    runtime (utils/model_runtimes.py): 'numpy', 'onnx', 'tflite', 'numpy_int8' or 'onnx_int8'.
+    The scaler is part of the export and TensorFlow is never imported (except by TFLite's
+    fallback interpreter).
+    """
+    def __init__(self, backend, paths=None):
+        path = (paths or sequence_model_paths())[backend]
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{backend} sequence model not found at {path}")
+        self.engine = RUNTIMES[backend](path)
+        self.backend = backend
+
+    def predict_batch_probs(self, arr_3d):
+        return self.engine.predict(arr_3d)
+
+
+# PK_MODEL_BACKEND name -> model factory taking the version's sequence_model_paths()
+BACKENDS = {
+    "keras": SequenceLSTMModel,
+    "numpy": partial(SequenceExportModel, "numpy"),
+    "onnx": partial(SequenceExportModel, "onnx"),
+    "tflite": partial(SequenceExportModel, "tflite"),
+    "numpy_int8": partial(SequenceExportModel, "numpy_int8"),
+    "onnx_int8": partial(SequenceExportModel, "onnx_int8"),
+}
+
+
+def select_backend(name=None, version=DEFAULT_VERSION):
+    """
+    Model factory for 'name' (default PK_MODEL_BACKEND) loading 'version'. 'auto' only
+    trusts the NumPy export if it was made from the version's .h5.
+    """
+    name = name or PK_MODEL_BACKEND
+    paths = sequence_model_paths(version)
+    if name in BACKENDS:
+        return partial(BACKENDS[name], paths=paths)
+    if name != "auto":
+        raise ValueError(f"Unknown PK_MODEL_BACKEND: {name} (expected auto or one of {', '.join(BACKENDS)})")
+    if os.path.exists(paths["numpy"]) and os.path.exists(paths["model"]):
+        with np.load(paths["numpy"]) as data:
+            exported_from = json.loads(str(data['meta']))['source_sha256']
+        if exported_from == file_sha256(paths["model"]):
+            return partial(BACKENDS["numpy"], paths=paths)
+        print("NumPy sequence model is stale (exported from another .h5); using Keras")
+    return partial(BACKENDS["keras"], paths=paths)
+
+
+# Backends whose loaded model is plain NumPy arrays: safe to load before fork() and share
+# copy-on-write. TensorFlow, ONNX Runtime and TFLite keep thread pools that a forked child does not inherit
+FORK_SAFE_BACKENDS = ("numpy", "numpy_int8")
+
+
+def backend_name(factory):
+    """
+    PK_MODEL_BACKEND name of a select_backend() factory.
+    """
+    return "keras" if factory.func is SequenceLSTMModel else factory.args[0]
+
+
+def load_model_version(version):
+    """
+    Loads 'version' with the configured backend; the model carries its version name
+    and class labels.
+    """
+    model = select_backend(version=version)()
+    model.version = version
+    model.classes = sequence_class_labels(sequence_model_paths(version))
+    return model
+
+# Global instance, created on first use (or by the warm-up thread) so that
+# importing the routes does not pull in TensorFlow or load the .h5.
+# A registry swap replaces it; batches already running keep the model they started with
+_sequence_LSTM_model = None
+_model_lock = threading.Lock()
+_model_state = {"status": "not_loaded", "error": None, "backend": None, "version": None}
+_swap_lock = threading.Lock()  # one background swap at a time
+_swap_state = {"status": "idle", "version": None, "error": None, "last_swap_at": None}
+_failed_versions = set()  # versions are immutable: a version that failed to load is not retried
+
+# Micro-batching knobs for /predict_kick: a forward pass runs once PK_BATCH_MAX_SIZE
+# sequences are queued or the oldest has waited PK_BATCH_MAX_WAIT_MS (latency vs throughput)
+PK_BATCH_MAX_SIZE = int(os.environ.get("PK_BATCH_MAX_SIZE", "16"))
+PK_BATCH_MAX_WAIT_MS = float(os.environ.get("PK_BATCH_MAX_WAIT_MS", "5"))
+_executor = None
+
+
+def get_sequence_model():
+    """
+    Returns the shared sequence model (active registry version, backend per PK_MODEL_BACKEND),
+    loading it on the first call. Concurrent callers wait for the same load instead of loading twice.
+    """
+    global _sequence_LSTM_model
+    if _sequence_LSTM_model is not None:
+        return _sequence_LSTM_model
+    with _model_lock:
+        if _sequence_LSTM_model is None:
+            _model_state.update(status="loading", error=None)
+            try:
+                _sequence_LSTM_model = load_model_version(active_model_version())
+            except Exception as e:
+                _model_state.update(status="error", error=str(e))
+                raise
+            _model_state.update(status="loaded", backend=_sequence_LSTM_model.backend,
+                                version=_sequence_LSTM_model.version)
+    return _sequence_LSTM_model
+
+
+def _swap_to(version):
+    global _sequence_LSTM_model
+    try:
+        _swap_state.update(status="loading", version=version, error=None)
+        model = load_model_version(version)
+        # Warm up off the request path, so the first request on the new version is not slow either
+        model.predict_batch_probs(np.zeros((1, SEQUENCE_LENGTH, NUM_FEATURES), dtype=np.float32))
+        with _model_lock:
+            _sequence_LSTM_model = model
+            _model_state.update(backend=model.backend, version=version)
+        _swap_state.update(status="idle", version=None, last_swap_at=time.time())
+        print(f"Swapped the sequence model to version {version} ({model.backend})")
+    except Exception as e:
+        _failed_versions.add(version)
+        _swap_state.update(status="error", error=str(e))
+        print(f"Could not swap the sequence model to version {version}: {e}")
+    finally:
+        _swap_lock.release()
+
+
+def check_for_new_version():
+    """
+    Starts a background swap if the registry's active version is not the one being served.
+    The current model keeps serving until the new one is loaded and warmed up.
+    Returns the version being swapped to, or None.
+    """
+    current = _sequence_LSTM_model
+    if current is None:
+        return None  # not loaded yet: the first load picks up the active version
+    version = active_model_version()
+    if version == current.version or version in _failed_versions:
+        return None
+    if not _swap_lock.acquire(blocking=False):
+        return None  # a swap is already running
+    threading.Thread(target=_swap_to, args=(version,), name="model-swap", daemon=True).start()
+    return version
+
+
+def start_registry_watcher(poll_s=PK_MODEL_REGISTRY_POLL_S):
+    """
+    Polls the registry's ACTIVE pointer every 'poll_s' seconds on a daemon thread
+    (None if polling is disabled).
+    """
+    if poll_s <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(poll_s)
+            try:
+                check_for_new_version()
+            except Exception as e:
+                print(f"Model registry check failed: {e}")
+
+    thread = threading.Thread(target=run, name="model-registry-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_inference_executor():
+    """
+    Shared MicroBatchExecutor in front of the sequence model; concurrent
+    predict_sequence() calls are batched into one forward pass.
+    """
+    global _executor
+    if _executor is None:
+        with _model_lock:
+            if _executor is None:
+                _executor = MicroBatchExecutor(
+                    lambda batch: get_sequence_model().predict_batch_probs(batch),
+                    max_batch_size=PK_BATCH_MAX_SIZE,
+                    max_wait_ms=PK_BATCH_MAX_WAIT_MS,
+                    name="sequence-lstm"
+                )
+    return _executor
+
+
+def predict_sequences(arr_3d):
+    """
+    (n, classes) probabilities for n (n, SEQUENCE_LENGTH, F) sequences with the shared model,
+    through the micro-batching executor. The first successful prediction marks the model as ready.
+    A failed prediction is raised to its caller only: readiness is lost by a failed load
+    (get_sequence_model()), not by one bad input.
+    """
+    probs = get_inference_executor().predict(arr_3d)
+    _model_state["status"] = "ready"
+    return probs
+
+
+def predict_sequence(arr_3d):
+    """
+    Quadrant probabilities for one (1, SEQUENCE_LENGTH, F) sequence, as a list.
+    """
+    return predict_sequences(arr_3d)[0].tolist()
+
+
+def warm_up():
+    """
+    Loads the model and runs one dummy (1, SEQUENCE_LENGTH, NUM_FEATURES) prediction,
+    so the first real request does not pay for graph building either.
+    """
+    if _model_state["status"] != "ready":
+        predict_sequence(np.zeros((1, SEQUENCE_LENGTH, NUM_FEATURES), dtype=np.float32))
+
+
+def preload_model():
+    """
+    Loads the served model in a prefork master (no threads are started), so the forked
+    workers share its pages copy-on-write. Only for FORK_SAFE_BACKENDS; otherwise every
+    worker loads its own copy on warm-up. Returns the backend preloaded, or None.
+    """
+    name = backend_name(select_backend(version=active_model_version()))
+    if name not in FORK_SAFE_BACKENDS:
+        print(f"Not preloading the {name} sequence model: not fork-safe, each worker loads its own")
+        return None
+    return get_sequence_model().backend
+
+
+def start_warmup():
+    """
+    Runs warm_up() on a daemon thread and returns immediately.
+    """
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def served_model_version():
+    """
+    Version answering predictions right now (the one about to be loaded if nothing is yet).
+    """
+    return _model_state["version"] or active_model_version()
+
+
+def served_model_classes():
+    """
+    Class labels of the served model's outputs (None if unknown or nothing is loaded yet).
+    """
+    model = _sequence_LSTM_model
+    return model.classes if model is not None else None
+
+
+def is_model_ready():
+    return _model_state["status"] == "ready"
+
 
-        b, t, f = arr_3d.shape  # maybe (1,21,48)
-        # Flatten
-        arr_2d = arr_3d.reshape(b*t, f)  # (21,48)
+def inference_stats():
+    """
+    Micro-batching metrics (batch sizes, queue wait, predict time); empty before the first prediction.
+    """
+    return _executor.stats() if _executor is not None else {}
 
-        # Transform
-        arr_2d_scaled = self.scaler.transform(arr_2d)
 
-        # Reshape
-        arr_3d_scaled = arr_2d_scaled.reshape(b, t, f)
+def model_status():
+    """
+    Snapshot for health checks: status is one of
+    not_loaded / loading / loaded / ready / error.
+    """
+    return dict(_model_state)
 
-        # Predict
-        probs = self.model.predict(arr_3d_scaled)[0]  # shape (6,)
-        return probs.tolist()
 
-# Create a global instance so we only load once
-sequence_LSTM_model = SequenceLSTMModel()
+def models_overview():
+    """
+    Served and active versions of each model plus the published ones, for /api/models.
+    """
+    return {
+        "sequence": {
+            **model_status(),
+            "classes": served_model_classes(),
+            "active_version": active_model_version(),
+            "swap": dict(_swap_state),
+            "versions": [{"version": m["version"], "created_at": m["created_at"]}
+                         for m in SEQUENCE_REGISTRY.versions()],
+        }
+    }
@@ -0,0 +1,228 @@
+# web_app/backend/services/pose_jobs.py
+
+"""
+/detect_pose as a background job.
+
+The route only records a pose_jobs row and queues the job; a worker of this
+process's JobQueue runs detect_pose_and_annotate() and writes the progress
+(frames done / total, annotated frames so far) to the row after every frame.
+The row is the source of truth, so status and event streams work from any
+worker process; waiting streams of this process are woken on every update
+instead of waiting for the next poll.
+
+PK_POSE_JOB_WORKERS: pose jobs running at once per process (default 2)
+PK_POSE_JOB_QUEUE_DEPTH: jobs that may wait for a worker before /detect_pose answers 429 (default 16)
+PK_POSE_JOB_POLL_S: how often an event stream re-reads a job run by another process (default 0.5)
+PK_POSE_JOB_HEARTBEAT_S: idle seconds before an event stream sends a keep-alive comment (default 15)
+PK_POSE_JOB_MAX_AGE_S: an unfinished job older than this is failed by its event stream (default 3600)
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+
+from services.db_manager import (
+    delete_pose_job,
+    get_pose_job,
+    get_unfinished_pose_jobs,
+    insert_pose_job,
+    update_pose_job,
+)
+from services.job_queue import JobQueue, QueueFullError
+from services.pose_manager import detect_pose_and_annotate
+from services.static_files import versioned_url
+
+PK_POSE_JOB_WORKERS = int(os.environ.get("PK_POSE_JOB_WORKERS", "2"))
+PK_POSE_JOB_QUEUE_DEPTH = int(os.environ.get("PK_POSE_JOB_QUEUE_DEPTH", "16"))
+PK_POSE_JOB_POLL_S = float(os.environ.get("PK_POSE_JOB_POLL_S", "0.5"))
+PK_POSE_JOB_HEARTBEAT_S = float(os.environ.get("PK_POSE_JOB_HEARTBEAT_S", "15"))
+PK_POSE_JOB_MAX_AGE_S = float(os.environ.get("PK_POSE_JOB_MAX_AGE_S", "3600"))
+
+FINISHED_STATUSES = ("done", "error")
+
+ANNOTATED_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp_annotated_frames')
+
+_job_queue = None
+_queue_lock = threading.Lock()
+_job_updated = threading.Condition()
+
+
+def _notify():
+    with _job_updated:
+        _job_updated.notify_all()
+
+
+def run_pose_job(job_id, video_id, session_id, annotate=True):
+    """
+    JobQueue worker: pose detection for one video, with progress written after each frame.
+    annotate: draw the annotated frames now (else on first request, see /annotated)
+    """
+    update_pose_job(job_id, status="running", started_at=time.time())
+    _notify()
+    annotated = []
+
+    def on_frame(done, total, ann_name):
+        if ann_name is not None:
+            annotated.append(ann_name)
+        update_pose_job(job_id, frames_done=done, frames_total=total, annotated_frames=annotated)
+        _notify()
+
+    try:
+        detect_pose_and_annotate(video_id, session_id, on_frame=on_frame, annotate=annotate)
+        update_pose_job(job_id, status="done", finished_at=time.time())
+    except Exception as e:
+        update_pose_job(job_id, status="error", error=str(e), finished_at=time.time())
+    _notify()
+
+
+def get_pose_job_queue():
+    """
+    This process's pose JobQueue, created on first use (jobs left unfinished by a
+    process that no longer exists are failed at that point).
+    """
+    global _job_queue
+    if _job_queue is None:
+        with _queue_lock:
+            if _job_queue is None:
+                fail_orphaned_jobs()
+                _job_queue = JobQueue(
+                    run_pose_job,
+                    workers=PK_POSE_JOB_WORKERS,
+                    max_queued=PK_POSE_JOB_QUEUE_DEPTH,
+                    name="pose-jobs"
+                )
+    return _job_queue
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_orphaned_jobs():
+    """
+    Queued / running jobs whose process is gone will never finish: mark them as failed.
+    """
+    for job_id, worker_pid in get_unfinished_pose_jobs():
+        if worker_pid is None or not _process_alive(worker_pid):
+            update_pose_job(job_id, status="error", error="worker process exited", finished_at=time.time())
+
+
+def fail_if_orphaned(job):
+    """
+    Fails an unfinished job whose worker process is gone, or that has outlived
+    PK_POSE_JOB_MAX_AGE_S (a hung worker, or its pid reused), and returns the row
+    as it now stands; otherwise returns 'job' unchanged.
+    """
+    if job["status"] in FINISHED_STATUSES:
+        return job
+    if job["worker_pid"] is None or not _process_alive(job["worker_pid"]):
+        error = "worker process exited"
+    elif PK_POSE_JOB_MAX_AGE_S > 0 and time.time() - job["created_at"] > PK_POSE_JOB_MAX_AGE_S:
+        error = f"job did not finish within {PK_POSE_JOB_MAX_AGE_S:g} s"
+    else:
+        return job
+    update_pose_job(job["job_id"], status="error", error=error, finished_at=time.time())
+    return get_pose_job(job["job_id"])
+
+
+def submit_pose_job(session_id, video_id, annotate=True):
+    """
+    Records and queues a pose job (annotate: as for run_pose_job); returns its job_id.
+    Raises QueueFullError if PK_POSE_JOB_QUEUE_DEPTH jobs are already waiting.
+    """
+    job_queue = get_pose_job_queue()
+    job_id = uuid.uuid4().hex
+    insert_pose_job(job_id, session_id, video_id, os.getpid(), time.time())
+    try:
+        job_queue.submit(job_id, video_id, session_id, annotate)
+    except QueueFullError:
+        delete_pose_job(job_id)
+        raise
+    return job_id
+
+
+def annotated_url(ann_name):
+    """
+    Content-versioned URL of an annotated frame (bare until a lazily drawn one exists).
+    """
+    return versioned_url('/api/annotated', ANNOTATED_FOLDER, ann_name)
+
+
+def job_summary(job):
+    """
+    The client-facing view of a pose_jobs row.
+    """
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "frames_done": job["frames_done"],
+        "frames_total": job["frames_total"],
+        "annotated_frames": [annotated_url(name) for name in job["annotated_frames"]],
+        "error": job["error"],
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def job_events(job_id):
+    """
+    Server-Sent Events for one job, until it finishes:
+      progress: {status, frames_done, frames_total} whenever it changes
+      frame:    {index, url} for every new annotated frame (partial results)
+      done:     the final job_summary()
+      failed:   {error}
+    plus a keep-alive comment every PK_POSE_JOB_HEARTBEAT_S idle seconds.
+    A job whose worker died (see fail_if_orphaned()) is failed here, so the stream
+    always ends even if no process ever creates its queue again.
+    """
+    frames_sent = 0
+    last_progress = None
+    last_sent = time.monotonic()
+    while True:
+        job = get_pose_job(job_id)
+        if job is not None:
+            job = fail_if_orphaned(job)
+        if job is None:
+            yield _sse("failed", {"error": "job not found"})
+            return
+
+        chunks = [
+            _sse("frame", {"index": i, "url": annotated_url(name)})
+            for i, name in enumerate(job["annotated_frames"][frames_sent:], start=frames_sent)
+        ]
+        frames_sent = len(job["annotated_frames"])
+        progress = {"status": job["status"], "frames_done": job["frames_done"], "frames_total": job["frames_total"]}
+        if progress != last_progress:
+            chunks.append(_sse("progress", progress))
+            last_progress = progress
+
+        if job["status"] == "done":
+            chunks.append(_sse("done", job_summary(job)))
+        elif job["status"] == "error":
+            chunks.append(_sse("failed", {"error": job["error"]}))
+
+        if chunks:
+            yield "".join(chunks)
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= PK_POSE_JOB_HEARTBEAT_S:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        if job["status"] in FINISHED_STATUSES:
+            return
+        with _job_updated:
+            _job_updated.wait(PK_POSE_JOB_POLL_S)
+
+
+def pose_job_stats():
+    return get_pose_job_queue().stats()
@@ -4,13 +4,36 @@ import os
 import cv2
 import mediapipe as mp
 import shutil
+import threading
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
 
-from services.db_manager import get_connection, insert_pose_feature
+from services.db_manager import (
+    get_connection,
+    get_frame_by_annotated_name,
+    get_frames_for_video,
+    get_pose_landmarks_for_video,
+    insert_pose_feature,
+)
+from services.feature_engineering import rows_to_landmarks
 
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-def detect_pose_and_annotate(video_id, session_id):
+# The skeleton draw_landmarks() draws, as [landmark index, landmark index] pairs
+# (for clients drawing the landmarks themselves)
+SKELETON_CONNECTIONS = sorted([min(a, b), max(a, b)] for a, b in mp_pose.POSE_CONNECTIONS)
+
+def preload_pose_assets():
+    """
+    Fetches MediaPipe Pose's model files if missing, by building (and closing) one graph,
+    so a prefork master's workers do not all download them at once. No graph is kept:
+    graphs run their own threads, which do not survive a fork, so each worker builds its own.
+    """
+    with mp_pose.Pose(static_image_mode=True):
+        pass
+
+def detect_pose_and_annotate(video_id, session_id, on_frame=None, annotate=True):
     """
     1) Finds frames for the given video_id.
     2) Uses MediaPipe Pose to detect landmarks.
@@ -18,6 +41,11 @@ def detect_pose_and_annotate(video_id, session_id):
     4) Inserts pose features in DB (pose_features table).
     5) Returns a list of annotated frame filenames to display.
 
+    on_frame: optional callable(frames_done, frames_total, annotated filename or None),
+              called after each frame (for progress reporting).
+    annotate: if False, step 3 is skipped: the annotated filenames are still returned,
+              but each image is only drawn when first requested (render_annotated_frame).
+
     Returns: List of final annotated image filenames (no path prefix).
     """
     # 1) Get all frames from DB for this video
@@ -44,54 +72,168 @@ def detect_pose_and_annotate(video_id, session_id):
 
     # 3) Initialize MediaPipe Pose once
     with mp_pose.Pose(static_image_mode=True) as pose:
-        for (frame_id, frame_path) in frames_db:
-            # 'frame_path' is something like "my_frame.png" or "sessionID_frame_001.png"
-            # The actual file is in <backend_root>/temp_frames/<frame_path>
-            temp_frames_folder = os.path.join(backend_root, 'temp_frames')
-            in_path = os.path.join(temp_frames_folder, frame_path)
-
-            if not os.path.exists(in_path):
-                # Skip if the frame is missing
-                continue
-
-            # Build the out_path in 'temp_annotated_frames/<session_id>_<frame_path>'
-            ann_name = f"{session_id}_{frame_path}"
-            out_path = os.path.join(annotated_folder, ann_name)
-
-            # 4) Run MediaPipe Pose
-            img = cv2.imread(in_path)
-            if img is None:
-                continue
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            results = pose.process(img_rgb)
-
-            # If we detect landmarks, insert into DB + draw
-            if results.pose_landmarks:
-                # Draw landmarks on a copy
-                annotated_img = img.copy()
-                mp_drawing.draw_landmarks(
-                    annotated_img,
-                    results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS
-                )
-                cv2.imwrite(out_path, annotated_img)
-
-                # For each landmark of interest, store in pose_features
-                # Or store all landmarks. Here we store all 33. 
-                for idx, lm in enumerate(results.pose_landmarks.landmark):
-                    insert_pose_feature(
-                        frame_id,
-                        mp_pose.PoseLandmark(idx).name,
-                        lm.x,
-                        lm.y,
-                        lm.z,
-                        lm.visibility
-                    )
+        for done, (frame_id, frame_path) in enumerate(frames_db, start=1):
+            ann_name = _detect_and_annotate_frame(pose, frame_id, frame_path, session_id,
+                                                  backend_root, annotated_folder, annotate)
+            if ann_name is not None:
                 # Save the final annotated filename
                 annotated_filenames.append(ann_name)
-            else:
-                # No landmarks
-                # (Optional) we can create an empty annotated or skip
-                pass
+            if on_frame is not None:
+                on_frame(done, len(frames_db), ann_name)
 
     return annotated_filenames
+
+def _detect_and_annotate_frame(pose, frame_id, frame_path, session_id, backend_root, annotated_folder, annotate=True):
+    """
+    One frame of detect_pose_and_annotate(). Returns the annotated filename, or None
+    if the frame is missing or has no pose.
+    """
+    # 'frame_path' is something like "my_frame.png" or "sessionID_frame_001.png"
+    # The actual file is in <backend_root>/temp_frames/<frame_path>
+    temp_frames_folder = os.path.join(backend_root, 'temp_frames')
+    in_path = os.path.join(temp_frames_folder, frame_path)
+
+    if not os.path.exists(in_path):
+        # Skip if the frame is missing
+        return None
+
+    # Build the out_path in 'temp_annotated_frames/<session_id>_<frame_path>'
+    ann_name = f"{session_id}_{frame_path}"
+    out_path = os.path.join(annotated_folder, ann_name)
+
+    # 4) Run MediaPipe Pose
+    img = cv2.imread(in_path)
+    if img is None:
+        return None
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    results = pose.process(img_rgb)
+
+    # If we detect landmarks, insert into DB + draw
+    if not results.pose_landmarks:
+        # No landmarks
+        # (Optional) we can create an empty annotated or skip
+        return None
+
+    # Draw landmarks on a copy
+    if annotate:
+        annotated_img = img.copy()
+        mp_drawing.draw_landmarks(
+            annotated_img,
+            results.pose_landmarks,
+            mp_pose.POSE_CONNECTIONS
+        )
+        cv2.imwrite(out_path, annotated_img)
+    elif os.path.exists(out_path):
+        # A previous run's drawing would no longer match the new landmarks
+        os.remove(out_path)
+
+    # For each landmark of interest, store in pose_features
+    # Or store all landmarks. Here we store all 33. 
+    for idx, lm in enumerate(results.pose_landmarks.landmark):
+        insert_pose_feature(
+            frame_id,
+            mp_pose.PoseLandmark(idx).name,
+            lm.x,
+            lm.y,
+            lm.z,
+            lm.visibility
+        )
+    return ann_name
+
+
+def detect_pose_in_images(images, annotate=False):
+    """
+    In-memory counterpart of detect_pose_and_annotate() for decoded BGR frames:
+    nothing is read from or written to disk or the DB.
+
+    Returns a list with one (landmarks, annotated) pair per image:
+      landmarks: (33, 4) float32 raw MediaPipe landmarks (x, y, z, visibility), or None
+                 if no pose was detected
+      annotated: the frame with the landmarks drawn on it if 'annotate' and a pose
+                 was detected, else None
+    """
+    results_list = []
+    with mp_pose.Pose(static_image_mode=True) as pose:
+        for img in images:
+            results = pose.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            if not results.pose_landmarks:
+                results_list.append((None, None))
+                continue
+
+            points = results.pose_landmarks.landmark
+            # Same landmark-name -> index mapping as the rows read back from pose_features
+            landmarks = rows_to_landmarks(
+                np.zeros(len(points), dtype=np.int64),
+                [mp_pose.PoseLandmark(idx).name for idx in range(len(points))],
+                np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in points], dtype=np.float32),
+                1
+            )[0]
+
+            annotated = None
+            if annotate:
+                annotated = img.copy()
+                mp_drawing.draw_landmarks(annotated, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+            results_list.append((landmarks, annotated))
+    return results_list
+
+
+def render_annotated_frame(frame_path, landmarks, ann_name):
+    """
+    Draws stored landmarks onto an extracted frame, exactly like the eager path of
+    detect_pose_and_annotate(), and writes it to 'temp_annotated_frames/<ann_name>'.
+    frame_path: the frame's filename under temp_frames/
+    landmarks: (33, 4) raw landmarks as read back from pose_features (NaN where missing)
+    Returns True if written, False if the frame is missing.
+    """
+    backend_root = os.path.dirname(os.path.dirname(__file__))
+    img = cv2.imread(os.path.join(backend_root, 'temp_frames', frame_path))
+    if img is None:
+        return False
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in np.nan_to_num(landmarks, nan=0.0):
+        # Missing landmarks come back as NaN: zero visibility keeps them from being drawn
+        landmark_list.landmark.add(x=float(x), y=float(y), z=float(z), visibility=float(visibility))
+    mp_drawing.draw_landmarks(img, landmark_list, mp_pose.POSE_CONNECTIONS)
+
+    # Rendered under a per-writer name and renamed: two requests may draw the same frame
+    annotated_folder = os.path.join(backend_root, 'temp_annotated_frames')
+    os.makedirs(annotated_folder, exist_ok=True)
+    out_path = os.path.join(annotated_folder, ann_name)
+    tmp_path = f"{out_path}.{os.getpid()}-{threading.get_ident()}.tmp{os.path.splitext(ann_name)[1]}"
+    cv2.imwrite(tmp_path, img)
+    os.replace(tmp_path, out_path)
+    return True
+
+
+def ensure_annotated_frame(ann_name):
+    """
+    Makes sure 'temp_annotated_frames/<ann_name>' exists, drawing it from the stored
+    landmarks if it was never rendered (or the cached drawing was removed).
+    Returns False if there is no such frame, or it has no pose.
+    """
+    backend_root = os.path.dirname(os.path.dirname(__file__))
+    if os.path.exists(os.path.join(backend_root, 'temp_annotated_frames', ann_name)):
+        return True
+    frame = get_frame_by_annotated_name(ann_name)
+    if frame is None:
+        return False
+    session_id, video_id, frame_no, frame_path = frame
+    _, _, landmarks = get_pose_landmarks_for_video(session_id, video_id, frame_no=frame_no)
+    if len(landmarks) == 0:
+        return False
+    return render_annotated_frame(frame_path, landmarks[0], ann_name)
+
+
+def ensure_annotated_frames(session_id, video_id):
+    """
+    ensure_annotated_frame() for every frame of the video that has a pose.
+    """
+    backend_root = os.path.dirname(os.path.dirname(__file__))
+    annotated_folder = os.path.join(backend_root, 'temp_annotated_frames')
+    _, frame_nos, landmarks = get_pose_landmarks_for_video(session_id, video_id)
+    posed = dict(zip(frame_nos.tolist(), landmarks))
+    for frame_no, frame_path in get_frames_for_video(video_id):
+        ann_name = f"{session_id}_{frame_path}"
+        if frame_no in posed and not os.path.exists(os.path.join(annotated_folder, ann_name)):
+            render_annotated_frame(frame_path, posed[frame_no], ann_name)
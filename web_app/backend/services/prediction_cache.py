@@ -0,0 +1,195 @@
+# web_app/backend/services/prediction_cache.py
+
+"""
+Bounded LRU cache of /predict_kick results.
+
+Entries are keyed by (feature digest, model version): the digest is a hash of the
+padded (1, SEQUENCE_LENGTH, F) array fed to the model, so identical inputs share
+an entry and a new model version never sees an old version's output.
+
+A second LRU remembers which digest each (session_id, video_id) last produced, so
+a repeated request for an unchanged video is answered without re-reading its
+engineered_features. "Unchanged" is checked against the database, not just this
+process: each entry carries the features version it was computed from
+(db_manager.get_engineered_features_version(), a COUNT / MAX over the video's rows)
+and is only used while the current version matches, so a rewrite by another
+gunicorn worker is never answered from a stale entry. Within a process, both LRUs
+are also dropped as soon as the video's frames change: services/db_manager calls
+invalidate_frames() wherever it rewrites or deletes engineered features, frames
+or sessions.
+
+PK_PREDICTION_CACHE_SIZE: max entries of each LRU (0 disables the cache)
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+PK_PREDICTION_CACHE_SIZE = int(os.environ.get("PK_PREDICTION_CACHE_SIZE", "1024"))
+
+
+def feature_digest(arr):
+    """
+    Hex digest of a feature array (dtype, shape and values).
+    """
+    arr = np.ascontiguousarray(arr, dtype=np.float32)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(arr.shape).encode())
+    h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()  # (digest, model_version) -> result
+        self._videos = OrderedDict()   # (session_id, video_id) -> (digest, frame_ids, features_version)
+        self._frame_videos = {}        # frame_id -> (session_id, video_id)
+        self._generation = 0           # bumped by every invalidate_frames()
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "video_hits": 0,
+            "digest_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidated_videos": 0,
+            "invalidated_entries": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get_for_video(self, session_id, video_id, model_version, features_version):
+        """
+        Result for the video's last digest under 'model_version' if its features are
+        still at 'features_version', or None (not counted as a miss: the caller falls
+        back to get()).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            video = self._videos.get((session_id, video_id))
+            if video is None or video[2] != features_version:
+                return None
+            result = self._entries.get((video[0], model_version))
+            if result is None:
+                return None
+            self._videos.move_to_end((session_id, video_id))
+            self._entries.move_to_end((video[0], model_version))
+            self._stats["video_hits"] += 1
+            return result
+
+    def get(self, digest, model_version):
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get((digest, model_version))
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end((digest, model_version))
+            self._stats["digest_hits"] += 1
+            return result
+
+    def put(self, digest, model_version, result):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[(digest, model_version)] = result
+            self._entries.move_to_end((digest, model_version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    @property
+    def generation(self):
+        """
+        Read before querying the features that remember_video() will describe
+        (as is their features version).
+        """
+        return self._generation
+
+    def remember_video(self, session_id, video_id, digest, frame_ids, features_version, generation):
+        """
+        Records that the video's engineered features (rows 'frame_ids', at
+        'features_version') hash to 'digest'.
+        Skipped if frames were invalidated since 'generation' was read: the features
+        hashed may already have been rewritten.
+        """
+        if not self.enabled:
+            return
+        key = (session_id, video_id)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._forget_video(key)
+            frame_ids = tuple(int(f) for f in frame_ids)
+            self._videos[key] = (digest, frame_ids, features_version)
+            for frame_id in frame_ids:
+                self._frame_videos[frame_id] = key
+            while len(self._videos) > self.max_entries:
+                self._forget_video(next(iter(self._videos)))
+
+    def _forget_video(self, key):
+        video = self._videos.pop(key, None)
+        if video is None:
+            return None
+        for frame_id in video[1]:
+            if self._frame_videos.get(frame_id) == key:
+                del self._frame_videos[frame_id]
+        return video
+
+    def invalidate_frames(self, frame_ids):
+        """
+        Drops the videos owning any of 'frame_ids' and every entry of their digests.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            keys = {self._frame_videos[int(f)] for f in frame_ids if int(f) in self._frame_videos}
+            for key in keys:
+                digest = self._forget_video(key)[0]
+                stale = [entry for entry in self._entries if entry[0] == digest]
+                for entry in stale:
+                    del self._entries[entry]
+                self._stats["invalidated_videos"] += 1
+                self._stats["invalidated_entries"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._videos.clear()
+            self._frame_videos.clear()
+
+    def stats(self):
+        """
+        Hit / miss counters since start (or the last reset_stats()) and current sizes.
+        """
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._entries)
+            s["videos"] = len(self._videos)
+        lookups = s["video_hits"] + s["digest_hits"] + s["misses"]
+        s["hits"] = s["video_hits"] + s["digest_hits"]
+        s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+        s["max_entries"] = self.max_entries
+        return s
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+
+# Shared by the routes and db_manager
+prediction_cache = PredictionCache(PK_PREDICTION_CACHE_SIZE)
+
+
+def invalidate_frames(frame_ids):
+    prediction_cache.invalidate_frames(frame_ids)
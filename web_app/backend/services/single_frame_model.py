@@ -0,0 +1,77 @@
+# web_app/backend/services/single_frame_model.py
+
+"""
+Single-frame (mid-swing) kick direction model: the RandomForest of
+development_and_training/scripts/training/train_model_single_frame.py, served from
+its compiled flat-array export (utils/numpy_forest.py) instead of the sklearn pickle.
+Neither sklearn nor the scaler .pkl is loaded; a prediction is a few vectorized
+NumPy steps per request.
+"""
+
+import os
+import threading
+import numpy as np
+
+from services.feature_engineering import NUM_FEATURES
+# development_and_training/ is on sys.path via services.feature_engineering
+from utils.numpy_forest import NumpyForestModel
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+SINGLE_FRAME_MODEL_PATH = os.path.join(
+    BASE_DIR,
+    'development_and_training',
+    'models',
+    'single_frame_models',
+    'random_forest_single_frame_model.npz'
+)
+
+_single_frame_model = None
+_model_lock = threading.Lock()
+_model_state = {"status": "not_loaded", "error": None, "backend": "numpy_forest"}
+
+
+def get_single_frame_model():
+    """
+    Returns the shared compiled forest, loading it on the first call.
+    """
+    global _single_frame_model
+    if _single_frame_model is not None:
+        return _single_frame_model
+    with _model_lock:
+        if _single_frame_model is None:
+            if not os.path.exists(SINGLE_FRAME_MODEL_PATH):
+                _model_state.update(status="error", error="compiled forest not found")
+                raise FileNotFoundError(
+                    f"Single-frame model not found at {SINGLE_FRAME_MODEL_PATH} "
+                    "(run development_and_training/scripts/training/export_single_frame_model.py)"
+                )
+            model = NumpyForestModel(SINGLE_FRAME_MODEL_PATH)
+            if model.meta['num_features'] != NUM_FEATURES:
+                _model_state.update(status="error", error="feature count mismatch")
+                raise ValueError(f"Single-frame model expects {model.meta['num_features']} "
+                                 f"features, the feature library produces {NUM_FEATURES}")
+            _single_frame_model = model
+            _model_state.update(status="ready", error=None)
+    return _single_frame_model
+
+
+def predict_single_frame(features):
+    """
+    Class probabilities for one (NUM_FEATURES,) engineered mid-swing frame.
+    Returns (probs list, class labels list), in the same order.
+    """
+    probs, classes = predict_single_frames(np.asarray(features)[np.newaxis])
+    return probs[0].tolist(), classes
+
+
+def predict_single_frames(features):
+    """
+    Class probabilities for (n, NUM_FEATURES) engineered mid-swing frames in one pass.
+    Returns ((n, classes) array, class labels list).
+    """
+    model = get_single_frame_model()
+    return model.predict_proba(np.asarray(features, dtype=np.float32)), model.classes.tolist()
+
+
+def single_frame_status():
+    return dict(_model_state)
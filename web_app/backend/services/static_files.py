@@ -0,0 +1,151 @@
+# web_app/backend/services/static_files.py
+
+"""
+Cache-friendly serving of the frame images (temp_frames/, temp_annotated_frames/).
+
+Every file gets a strong ETag from a hash of its content. The hash is kept in a
+bounded LRU keyed by path and checked against the file's mtime / size, so a
+revalidation costs one stat(). URLs the API hands out carry the hash as '?v=':
+  ?v=<current hash>: Cache-Control: private, max-age=1 year, immutable
+                     (a changed file gets a new URL, so the old one can be cached forever)
+  anything else:     Cache-Control: no-cache, i.e. revalidate with If-None-Match, answered
+                     with a 304 without opening the file
+
+Clients that explicitly accept image/webp get a WebP variant of PNG / JPEG frames, encoded once
+on first request and stored next to the original as '<filename>.webp'.
+
+PK_WEBP_VARIANTS: serve WebP variants (default 1)
+PK_WEBP_QUALITY: their quality, 1-100 (default 90)
+PK_ETAG_CACHE_SIZE: files whose content hash is remembered (default 4096)
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import cv2
+from flask import Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+PK_WEBP_VARIANTS = os.environ.get("PK_WEBP_VARIANTS", "1") == "1"
+PK_WEBP_QUALITY = int(os.environ.get("PK_WEBP_QUALITY", "90"))
+PK_ETAG_CACHE_SIZE = int(os.environ.get("PK_ETAG_CACHE_SIZE", "4096"))
+
+WEBP_SUFFIX = ".webp"
+WEBP_SOURCES = (".png", ".jpg", ".jpeg")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_LENGTH = 16
+
+_digests = OrderedDict()  # path -> (mtime_ns, size, digest)
+_digest_lock = threading.Lock()
+
+
+def file_digest(path):
+    """
+    Hex content hash of the file at 'path', or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    with _digest_lock:
+        cached = _digests.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _digests.move_to_end(path)
+            return cached[2]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        _digests.move_to_end(path)
+        while len(_digests) > max(0, PK_ETAG_CACHE_SIZE):
+            _digests.popitem(last=False)
+    return digest
+
+
+def versioned_url(url_prefix, folder, filename):
+    """
+    '<url_prefix>/<filename>?v=<content hash>', or the bare URL if the file does not
+    exist (yet), e.g. an annotated frame that is only drawn on request.
+    """
+    digest = file_digest(os.path.join(folder, filename))
+    if digest is None:
+        return f"{url_prefix}/{filename}"
+    return f"{url_prefix}/{filename}?v={digest[:VERSION_LENGTH]}"
+
+
+def variant_files(filename):
+    """
+    Names of the files derived from 'filename' by send_cached_file(), for cleanup.
+    """
+    return [filename + WEBP_SUFFIX]
+
+
+def _webp_variant(path):
+    """
+    Path of the up-to-date WebP variant of 'path', encoding it if needed; None if it
+    cannot be made.
+    """
+    webp_path = path + WEBP_SUFFIX
+    try:
+        if os.path.getmtime(webp_path) >= os.path.getmtime(path):
+            return webp_path
+    except FileNotFoundError:
+        pass
+
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    # Encoded under a per-writer name and renamed, so concurrent requests never serve half a file
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp{WEBP_SUFFIX}"
+    if not cv2.imwrite(tmp_path, img, [cv2.IMWRITE_WEBP_QUALITY, PK_WEBP_QUALITY]):
+        return None
+    os.replace(tmp_path, webp_path)
+    return webp_path
+
+
+def send_cached_file(folder, filename):
+    """
+    send_from_directory() with content-hash ETags, If-None-Match, immutable caching
+    of versioned URLs and WebP negotiation (see the module docstring).
+    """
+    path = safe_join(folder, filename)
+    if path is None:
+        abort(404)
+    digest = file_digest(path)
+    if digest is None:
+        abort(404)
+
+    # Only for clients that list image/webp itself: 'in' would also match '*/*' or 'image/*'
+    webp = (PK_WEBP_VARIANTS and os.path.splitext(filename)[1].lower() in WEBP_SOURCES
+            and any(v == "image/webp" and q > 0 for v, q in request.accept_mimetypes))
+    # The variant's ETag derives from its source's: it only changes with the source
+    etag = f"{digest}-webp" if webp else digest
+
+    if request.args.get("v") == digest[:VERSION_LENGTH]:
+        cache_control = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = "no-cache"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        served_path, mimetype = path, None
+        if webp:
+            webp_path = _webp_variant(path)
+            if webp_path is not None:
+                served_path, mimetype = webp_path, "image/webp"
+            else:
+                etag = digest
+        response = send_file(served_path, mimetype=mimetype, etag=False, conditional=False)
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    if PK_WEBP_VARIANTS:
+        response.vary.add("Accept")
+    return response
@@ -0,0 +1,52 @@
+# web_app/backend/wsgi.py
+
+"""
+WSGI entry point of the production profile (gunicorn.conf.py).
+
+With preload_app the gunicorn master imports this module once, before forking:
+the app and the fork-safe models are loaded here, and every worker shares those
+pages copy-on-write instead of loading its own copy. MediaPipe's model files are
+only fetched here: its graphs run their own threads, so each worker builds its
+own on first use. Background threads are started per worker (post_fork in
+gunicorn.conf.py).
+
+PK_PRELOAD=0 skips the preload (each worker then loads everything on warm-up).
+"""
+
+import gc
+import os
+import time
+
+from app import create_app
+from services.model_loader import preload_model
+from services.pose_manager import preload_pose_assets
+from services.single_frame_model import get_single_frame_model
+
+PK_PRELOAD = os.environ.get("PK_PRELOAD", "1") != "0"
+
+
+def preload():
+    """
+    Loads what the workers can share; a failure is reported and left to the
+    workers (they load lazily and report it on /api/ready), like the warm-up.
+    """
+    started = time.perf_counter()
+    steps = {
+        "sequence model": preload_model,
+        "single-frame model": get_single_frame_model,
+        "MediaPipe model files": preload_pose_assets,
+    }
+    for name, step in steps.items():
+        try:
+            step()
+        except Exception as e:
+            print(f"Preload of the {name} failed: {e}")
+    # Move everything loaded so far out of the GC's reach: collections in the workers
+    # would otherwise write to these objects' headers and un-share their pages
+    gc.freeze()
+    print(f"Preloaded in {time.perf_counter() - started:.1f}s (pid {os.getpid()})")
+
+
+app = create_app(background_threads=False)
+if PK_PRELOAD:
+    preload()
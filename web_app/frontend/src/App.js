@@ -1,13 +1,18 @@
 // web_app/frontend/src/App.js
 import React, { useState, useRef } from 'react';
 import GoalQuadrantOverlay from './components/GoalQuadrantOverlay';
+import SpriteFrame from './components/SpriteFrame';
+import PoseOverlay from './components/PoseOverlay';
 
 function App() {
   // ------------------ State ------------------
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploadedFilename, setUploadedFilename] = useState('');
   const [frameURLs, setFrameURLs] = useState([]);
-  const [annotatedURLs, setAnnotatedURLs] = useState([]);
+  // Contact sheet of the extracted frames (all frames in one image + tile offsets)
+  const [frameSheet, setFrameSheet] = useState(null);
+  // Detected landmarks, drawn over the extracted frames in the browser
+  const [poseData, setPoseData] = useState(null);
   const [directionProbs, setDirectionProbs] = useState([]); // 6 probabilities
   const [statusMessage, setStatusMessage] = useState('');
   const [videoURL, setVideoURL] = useState('');
@@ -48,7 +53,8 @@ function App() {
 
       // Clear old data
       setFrameURLs([]);
-      setAnnotatedURLs([]);
+      setFrameSheet(null);
+      setPoseData(null);
       setDirectionProbs([]);
 
       // Reset indices
@@ -80,7 +86,8 @@ function App() {
     setStatusMessage(`Extracting frames at ${currentTime.toFixed(2)}s...`);
 
     try {
-      const body = { filename: uploadedFilename, timestamp: currentTime };
+      // 'sprite' also returns the frames' contact sheet: the viewer then loads one image
+      const body = { filename: uploadedFilename, timestamp: currentTime, sprite: true };
       const res = await fetch('http://localhost:8098/api/extract_frames', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -93,16 +100,14 @@ function App() {
       setStatusMessage(data.message || 'Frames extracted!');
 
       // Clear annotated + directionProbs
-      setAnnotatedURLs([]);
+      setPoseData(null);
       setDirectionProbs([]);
       setCurrentAnnIndex(0);
 
-      // Build frame URLs with cache-buster
-      const now = Date.now();
-      const newFrameURLs = (data.frame_urls || []).map(url =>
-        `http://localhost:8098${url}?cb=${now}`
-      );
+      // The URLs carry a content hash (?v=), so the browser may cache them for good
+      const newFrameURLs = (data.frame_urls || []).map(url => `http://localhost:8098${url}`);
       setFrameURLs(newFrameURLs);
+      setFrameSheet(data.sprite ? { ...data.sprite, url: `http://localhost:8098${data.sprite.url}` } : null);
       setCurrentFrameIndex(0);
     } catch (err) {
       setStatusMessage(err.message);
@@ -122,28 +127,47 @@ function App() {
 
     setStatusMessage('Detecting pose...');
     try {
-      const body = { filename: uploadedFilename };
+      // annotate: false -- the skeleton is drawn here from /landmarks, not into server-side PNGs
+      const body = { filename: uploadedFilename, annotate: false };
       const res = await fetch('http://localhost:8098/api/detect_pose', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(body),
         credentials: 'include'
       });
+      if (res.status === 429) throw new Error('Server busy, please try pose detection again shortly');
       if (!res.ok) throw new Error('Pose detection failed');
 
-      const data = await res.json();
-      setStatusMessage(data.message || 'Pose detection complete.');
-
-      // Build annotated frame URLs with cache-buster
-      const now = Date.now();
-      const annURLs = (data.annotated_frames || []).map(
-        url => `http://localhost:8098${url}?cb=${now}`
-      );
-      setAnnotatedURLs(annURLs);
+      // The backend runs pose detection as a job; follow its progress over SSE
+      const job = await res.json();
+      setPoseData(null);
       setCurrentAnnIndex(0);
-
       // Clear directionProbs
       setDirectionProbs([]);
+
+      // No 'frame' listener: its annotated image URLs would make the server draw each
+      // frame on request, which is what annotate: false avoids
+      const events = new EventSource(`http://localhost:8098${job.events_url}`, { withCredentials: true });
+      events.addEventListener('progress', (e) => {
+        const { frames_done, frames_total } = JSON.parse(e.data);
+        if (frames_total) setStatusMessage(`Detecting pose... ${frames_done}/${frames_total} frames`);
+      });
+      events.addEventListener('done', async () => {
+        setStatusMessage('Pose detection complete');
+        events.close();
+        // One small JSON response instead of an annotated image per frame
+        const poseRes = await fetch(`http://localhost:8098${job.landmarks_url}`, { credentials: 'include' });
+        if (poseRes.ok) setPoseData(await poseRes.json());
+        else setStatusMessage('Could not load the detected poses');
+      });
+      events.addEventListener('failed', (e) => {
+        setStatusMessage(`Pose detection failed: ${JSON.parse(e.data).error}`);
+        events.close();
+      });
+      events.onerror = () => {
+        setStatusMessage('Lost connection to the pose detection job');
+        events.close();
+      };
     } catch (err) {
       setStatusMessage(err.message);
     }
@@ -155,8 +179,8 @@ function App() {
       alert('No uploaded file reference.');
       return;
     }
-    if (annotatedURLs.length === 0) {
-      alert('No annotated frames. Please detect pose first.');
+    if (!poseData) {
+      alert('No detected poses. Please detect pose first.');
       return;
     }
 
@@ -197,9 +221,11 @@ function App() {
   };
 
   // ---------- Single-frame navigation: annotated ----------
-  const totalAnn = annotatedURLs.length;
-  const currentAnnUrl =
-    totalAnn > 0 ? annotatedURLs[currentAnnIndex] : null;
+  const totalAnn = poseData ? poseData.frames.length : 0;
+  const currentPose = poseData ? poseData.frames[currentAnnIndex] : null;
+  // The extracted frame under the current pose: its contact-sheet tile or its own image
+  const poseTileIndex =
+    currentPose && frameSheet ? frameSheet.tiles.findIndex(t => t.frame_no === currentPose.frame_no) : -1;
 
   const handlePrevAnn = () => {
     setCurrentAnnIndex((idx) => (idx > 0 ? idx - 1 : idx));
@@ -241,7 +267,7 @@ function App() {
             </button>
             <button
               onClick={handlePredictDirection}
-              disabled={annotatedURLs.length === 0}
+              disabled={!poseData}
             >
               Predict Kick Direction
             </button>
@@ -257,7 +283,14 @@ function App() {
             <button onClick={handlePrevFrame} disabled={currentFrameIndex === 0}>
               Prev
             </button>
-            {currentFrameUrl ? (
+            {frameSheet ? (
+              <SpriteFrame
+                sheetUrl={frameSheet.url}
+                sheet={frameSheet}
+                index={currentFrameIndex}
+                alt={`Frame ${currentFrameIndex + 1}`}
+              />
+            ) : currentFrameUrl ? (
               <img
                 src={currentFrameUrl}
                 alt={`Frame ${currentFrameIndex + 1}`}
@@ -287,12 +320,24 @@ function App() {
             <button onClick={handlePrevAnn} disabled={currentAnnIndex === 0}>
               Prev
             </button>
-            {currentAnnUrl ? (
-              <img
-                src={currentAnnUrl}
-                alt={`Annotated ${currentAnnIndex + 1}`}
-                style={{ maxWidth: '600px', border: '1px solid #ccc' }}
-              />
+            {currentPose ? (
+              <div style={{ position: 'relative', lineHeight: 0 }}>
+                {poseTileIndex >= 0 ? (
+                  <SpriteFrame
+                    sheetUrl={frameSheet.url}
+                    sheet={frameSheet}
+                    index={poseTileIndex}
+                    alt={`Annotated ${currentAnnIndex + 1}`}
+                  />
+                ) : (
+                  <img
+                    src={frameURLs[currentPose.frame_no - 1]}
+                    alt={`Annotated ${currentAnnIndex + 1}`}
+                    style={{ maxWidth: '600px', border: '1px solid #ccc' }}
+                  />
+                )}
+                <PoseOverlay landmarks={currentPose.landmarks} connections={poseData.connections} />
+              </div>
             ) : (
               <div>No Annotated Frame</div>
             )}
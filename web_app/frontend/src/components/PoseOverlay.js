@@ -0,0 +1,44 @@
+// web_app/frontend/src/components/PoseOverlay.js
+import React from 'react';
+
+// Same cut-off MediaPipe's draw_landmarks uses for hiding a landmark
+const MIN_VISIBILITY = 0.5;
+
+/**
+ * Draws one frame's pose (from /api/landmarks) over whatever it is placed on, so the
+ * server does not have to render annotated images. The parent must be position: relative;
+ * landmarks are normalized to the frame, so the overlay simply stretches over it.
+ */
+function PoseOverlay({ landmarks, connections }) {
+  const visible = (lm) => lm && lm[2] >= MIN_VISIBILITY;
+  return (
+    <svg
+      viewBox="0 0 1 1"
+      preserveAspectRatio="none"
+      style={{ position: 'absolute', left: 0, top: 0, width: '100%', height: '100%' }}
+    >
+      {connections.map(([a, b]) =>
+        visible(landmarks[a]) && visible(landmarks[b]) ? (
+          <line
+            key={`${a}-${b}`}
+            x1={landmarks[a][0]} y1={landmarks[a][1]}
+            x2={landmarks[b][0]} y2={landmarks[b][1]}
+            stroke="#e0e0e0" strokeWidth={2} vectorEffect="non-scaling-stroke"
+          />
+        ) : null
+      )}
+      {/* Zero-length round-capped lines: dots that stay round when the overlay is stretched */}
+      {landmarks.map((lm, i) =>
+        visible(lm) ? (
+          <line
+            key={i}
+            x1={lm[0]} y1={lm[1]} x2={lm[0]} y2={lm[1]}
+            stroke="#ff0000" strokeWidth={5} strokeLinecap="round" vectorEffect="non-scaling-stroke"
+          />
+        ) : null
+      )}
+    </svg>
+  );
+}
+
+export default PoseOverlay;
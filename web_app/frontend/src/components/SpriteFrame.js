@@ -0,0 +1,27 @@
+// web_app/frontend/src/components/SpriteFrame.js
+import React from 'react';
+
+/**
+ * Shows one tile of a contact sheet (see /api/contact_sheet): the whole sheet is a
+ * single image download, each frame is just a different background offset.
+ */
+function SpriteFrame({ sheetUrl, sheet, index, alt }) {
+  const tile = sheet.tiles[index];
+  if (!tile) return <div>No Frame</div>;
+  return (
+    <div
+      role="img"
+      aria-label={alt}
+      style={{
+        width: `${sheet.tile_width}px`,
+        height: `${sheet.tile_height}px`,
+        backgroundImage: `url(${sheetUrl})`,
+        backgroundPosition: `-${tile.x}px -${tile.y}px`,
+        backgroundRepeat: 'no-repeat',
+        border: '1px solid #ccc',
+      }}
+    />
+  );
+}
+
+export default SpriteFrame;